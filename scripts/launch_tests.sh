@@ -7,3 +7,24 @@ export PATH="${PATH}:${SCRIPT_DIR}/../chromedriver/"
 
 python "${SCRIPT_DIR}/../src/tests/web_interactions_test.py"
 python "${SCRIPT_DIR}/../src/tests/reservation_test.py"
+python "${SCRIPT_DIR}/../src/tests/http_session_manager_test.py"
+python "${SCRIPT_DIR}/../src/tests/session_registry_test.py"
+python "${SCRIPT_DIR}/../src/tests/availability_grid_test.py"
+python "${SCRIPT_DIR}/../src/tests/cron_store_test.py"
+python "${SCRIPT_DIR}/../src/tests/cron_registry_test.py"
+python "${SCRIPT_DIR}/../src/tests/chat_states_test.py"
+python "${SCRIPT_DIR}/../src/tests/job_executor_test.py"
+python "${SCRIPT_DIR}/../src/tests/clock_sync_test.py"
+python "${SCRIPT_DIR}/../src/tests/event_bus_test.py"
+python "${SCRIPT_DIR}/../src/tests/booking_notifier_test.py"
+python "${SCRIPT_DIR}/../src/tests/retry_policy_test.py"
+python "${SCRIPT_DIR}/../src/tests/cancellation_watcher_test.py"
+python "${SCRIPT_DIR}/../src/tests/ttl_cache_test.py"
+python "${SCRIPT_DIR}/../src/tests/week_days_manager_test.py"
+python "${SCRIPT_DIR}/../src/tests/precise_scheduler_test.py"
+python "${SCRIPT_DIR}/../src/tests/browser_session_pool_test.py"
+python "${SCRIPT_DIR}/../src/tests/reservations_table_test.py"
+python "${SCRIPT_DIR}/../src/tests/background_work_test.py"
+python "${SCRIPT_DIR}/../src/tests/users_whitelist_test.py"
+python "${SCRIPT_DIR}/../src/tests/secret_loader_test.py"
+python "${SCRIPT_DIR}/../src/tests/tracing_test.py"
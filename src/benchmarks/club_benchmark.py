@@ -0,0 +1,235 @@
+#!/usr/bin/python
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import time
+from typing import Callable
+
+from bots.telegram.reservations_table import parse_reservations
+from bots.telegram.web_interactions import BACKEND_HTTP
+from bots.telegram.web_interactions import get_all_reservations
+from bots.telegram.web_interactions import get_balance
+from crons.reservation import do_reservation
+from tests.mock_club_server import MockClubServer
+from tests.mock_club_server import render_reservations_table
+from utils.browser_session_manager import BrowserSessionManager
+from utils.http_session_manager import HttpSessionManager
+from utils.secret_loader import get_secret_store
+from utils.session_registry import get_session_registry
+from utils.tracing import compute_percentile
+from utils.tracing import get_tracer
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+_TRACER = get_tracer()
+_CWD = os.path.dirname(os.path.realpath(__file__))
+_DEFAULT_OUTPUT_FILE = str(_CWD) + "/../../logs/benchmark.json"
+_PERCENTILES = (50, 95, 99)
+_RESERVATIONS_ROWS = 50
+_LARGE_TABLE_ROWS = 5000
+_GAME_START_TIME = "13:00"
+_GAME_DURATION = "60m"
+_DAYS_AHEAD = 6
+
+
+#
+# HELPER METHODS
+#
+def _point_secrets_to(server: MockClubServer) -> None:
+    # The code under benchmark reads the endpoint and credentials from the secret store
+    secret_store = get_secret_store()
+    os.environ[secret_store.get_env_var_name("web_endpoint.txt")] = server.get_endpoint()
+    os.environ[secret_store.get_env_var_name("web_username.txt")] = server.username
+    os.environ[secret_store.get_env_var_name("web_password.txt")] = server.password
+    secret_store.reload()
+
+
+def _close_sessions() -> None:
+    get_session_registry(HttpSessionManager).close()
+    get_session_registry(BrowserSessionManager).close()
+
+
+def _summarise(durations: list, failures: int) -> dict:
+    values = sorted(durations)
+    summary = {
+        "count": len(values),
+        "failures": failures,
+        "mean": statistics.mean(values) if values else 0.0,
+    }
+    for percentile in _PERCENTILES:
+        summary["p" + str(percentile)] = compute_percentile(values, percentile)
+    return summary
+
+
+def _run_scenario(name: str, iterations: int, operation: Callable, cold: bool) -> dict:
+    # operation returns whether it succeeded. Cold runs start without any logged-in session
+    _LOGGER.info("Running scenario " + name)
+    durations = []
+    failures = 0
+    for _ in range(iterations):
+        if cold:
+            _close_sessions()
+        start = time.perf_counter()
+        succeeded = operation()
+        elapsed = time.perf_counter() - start
+        if succeeded:
+            durations.append(elapsed)
+        else:
+            failures += 1
+    return _summarise(durations, failures)
+
+
+def _make_reservations(num_rows: int) -> list:  # (day, start_time, end_time, court)
+    return [
+        ("01/01/2021", "{}:00".format(8 + i % 14), "{}:00".format(9 + i % 14), str(1 + i % 10))
+        for i in range(num_rows)
+    ]
+
+
+def _make_reservation() -> bool:
+    game_day = (datetime.date.today() + datetime.timedelta(days=_DAYS_AHEAD)).strftime("%A").upper()
+    return do_reservation(
+        game_day=game_day,
+        game_start_time=_GAME_START_TIME,
+        game_duration=_GAME_DURATION,
+        disabled_for_testing=True
+    )
+
+
+def _run_benchmarks(iterations: int, skip_browser: bool) -> dict:
+    scenarios = {
+        "get_balance_cold": _run_scenario(
+            "get_balance_cold", iterations,
+            lambda: get_balance(backend=BACKEND_HTTP, use_cache=False) is not None, cold=True),
+        "get_balance_warm": _run_scenario(
+            "get_balance_warm", iterations,
+            lambda: get_balance(backend=BACKEND_HTTP, use_cache=False) is not None, cold=False),
+        "get_all_reservations_cold": _run_scenario(
+            "get_all_reservations_cold", iterations,
+            lambda: len(get_all_reservations(backend=BACKEND_HTTP, use_cache=False)) == _RESERVATIONS_ROWS,
+            cold=True),
+        "get_all_reservations_warm": _run_scenario(
+            "get_all_reservations_warm", iterations,
+            lambda: len(get_all_reservations(backend=BACKEND_HTTP, use_cache=False)) == _RESERVATIONS_ROWS,
+            cold=False),
+    }
+
+    # Offline parsing of a large table, as found on accounts with a long booking history
+    large_table = render_reservations_table(_make_reservations(_LARGE_TABLE_ROWS))
+    scenarios["parse_reservations_large"] = _run_scenario(
+        "parse_reservations_large", iterations,
+        lambda: len(parse_reservations(large_table)) == _LARGE_TABLE_ROWS, cold=False)
+
+    if skip_browser:
+        _LOGGER.info("Skipping browser scenarios")
+    elif shutil.which("chromedriver") is None:
+        _LOGGER.warning("WARN: chromedriver not found, skipping browser scenarios")
+    else:
+        scenarios["do_reservation"] = _run_scenario("do_reservation", iterations, _make_reservation, cold=True)
+
+    _close_sessions()
+    return scenarios
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list:  # (name, baseline_p50, p50)
+    regressions = []
+    for name, stats in results["scenarios"].items():
+        baseline_stats = baseline.get("scenarios", {}).get(name)
+        if baseline_stats is None or stats["count"] == 0:
+            continue
+        if stats["p50"] > baseline_stats["p50"] * (1 + threshold):
+            regressions.append((name, baseline_stats["p50"], stats["p50"]))
+    return regressions
+
+
+def _write_json(file_path: str, content: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.realpath(file_path)), exist_ok=True)
+    with open(file_path, mode='w') as f:
+        json.dump(content, f, indent=2, sort_keys=True)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock of the club website")
+    parser.add_argument("--iterations", type=int, default=10, help="Runs per scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every mock server request")
+    parser.add_argument("--occupancy", type=float, default=0.5, help="Probability of a court slot being taken")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used to draw the court occupancy")
+    parser.add_argument("--output", default=_DEFAULT_OUTPUT_FILE, help="Results file")
+    parser.add_argument("--baseline", default=None, help="Results file to compare against")
+    parser.add_argument("--save-baseline", default=None, help="Also store the results as a baseline here")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown over the baseline")
+    parser.add_argument("--skip-browser", action="store_true", help="Do not run the Selenium scenarios")
+    return parser.parse_args()
+
+
+#
+# MAIN METHOD
+#
+def main() -> int:
+    args = _parse_args()
+
+    server = MockClubServer(
+        reservations=_make_reservations(_RESERVATIONS_ROWS),
+        latency=args.latency,
+        occupancy=args.occupancy,
+        seed=args.seed
+    )
+    server.start()
+    _TRACER.set_spans_file(None)
+    _TRACER.reset()
+    try:
+        _point_secrets_to(server)
+        scenarios = _run_benchmarks(args.iterations, args.skip_browser)
+    finally:
+        server.stop()
+
+    results = {
+        "config": {
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "occupancy": args.occupancy,
+            "seed": args.seed,
+        },
+        "num_requests": server.num_requests,
+        "scenarios": scenarios,
+        "steps": _TRACER.get_summary(),
+    }
+    _write_json(args.output, results)
+    if args.save_baseline is not None:
+        _write_json(args.save_baseline, results)
+
+    print(" SCENARIO | COUNT | FAILURES | P50 | P95 | P99 (seconds)")
+    for name, stats in scenarios.items():
+        print(" {} | {} | {} | {:.3f} | {:.3f} | {:.3f}".format(name, stats["count"], stats["failures"],
+                                                                stats["p50"], stats["p95"], stats["p99"]))
+    print(_TRACER.format_summary())
+
+    if args.baseline is not None:
+        with open(args.baseline, mode='r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, baseline_p50, p50 in regressions:
+            print("REGRESSION: {} p50 {:.3f}s > baseline {:.3f}s".format(name, p50, baseline_p50))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from typing import Hashable
+from typing import Optional
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+class BackgroundWork:
+    # Bounded executor for the browser-bound operations triggered by bot commands. Requests with the same key
+    # (e.g. same user and command) share the operation already in flight instead of queueing a new one
+    _DEFAULT_MAX_WORKERS = 2
+    _DEFAULT_MAX_QUEUE_DEPTH = 8
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue_depth: Optional[int] = None):
+        self._max_queue_depth = max_queue_depth if max_queue_depth is not None \
+            else BackgroundWork._DEFAULT_MAX_QUEUE_DEPTH
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers if max_workers is not None else BackgroundWork._DEFAULT_MAX_WORKERS,
+            thread_name_prefix="BackgroundWork"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future
+
+    def get_queue_depth(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def submit(self, key: Hashable, operation: Callable) -> Optional[Future]:
+        # Returns None when the queue is full
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                _LOGGER.debug("Coalescing request %s with the one in flight", key)
+                return future
+            if len(self._in_flight) >= self._max_queue_depth:
+                _LOGGER.warning("WARN: Background work queue is full, rejecting request %s", key)
+                return None
+
+            future = self._executor.submit(operation)
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda _: self._done(key, future))
+        return future
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _done(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+
+import logging
+import threading
+from typing import Callable
+from typing import Optional
+
+from crons.booking_result import BOOKING_RESULT_TOPIC
+from crons.booking_result import BookingResult
+from utils.event_bus import EventBus
+from utils.event_bus import get_event_bus
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+def format_booking_results(results: list) -> str:
+    lines = ["Reservation cron results:"]
+    for result in results:
+        game = result.game_day.capitalize()
+        if result.game_date is not None:
+            game += " " + result.game_date.strftime("%d/%m")
+        game += " " + result.game_start_time + " (" + result.game_duration + ")"
+        if result.cron_id is not None:
+            game += " [cron " + str(result.cron_id) + "]"
+
+        if result.is_fallback():
+            lines.append("- Booked fallback " + result.booked_start_time + " (" + result.booked_duration + ") for "
+                         + game + " on court " + str(result.court) + " in {:.2f}s".format(result.duration or 0.0))
+        elif result.is_success():
+            lines.append("- Booked " + game + " on court " + str(result.court)
+                         + " in {:.2f}s".format(result.duration or 0.0))
+        else:
+            lines.append("- !!!!ALERT!!!! Could not book " + game + ": " + str(result.error))
+        if result.attempts > 1:
+            lines.append("  Attempts: " + str(result.attempts))
+        if result.step_timings:
+            lines.append("  Steps: " + ", ".join(
+                "{} {:.2f}s".format(step, seconds) for step, seconds in result.step_timings))
+
+    if any(result.is_success() for result in results):
+        lines.append("Type /show_reservations to see the full list of reservations.")
+    return "\n".join(lines)
+
+
+class BookingNotifier:
+    # Pushes the booking results published on the event bus to the chat owning the cron. The results of one chat
+    # arriving within batch_window seconds of the first one are sent together in a single message
+    _DEFAULT_BATCH_WINDOW = 2.0
+
+    def __init__(self,
+                 send_message: Callable[[int, str], None],
+                 batch_window: Optional[float] = None,
+                 event_bus: Optional[EventBus] = None):
+        self._send_message = send_message
+        self._batch_window = batch_window if batch_window is not None else BookingNotifier._DEFAULT_BATCH_WINDOW
+        self._event_bus = event_bus if event_bus is not None else get_event_bus()
+
+        self._lock = threading.Lock()
+        self._pending = {}  # chat_id -> [BookingResult]
+        self._timers = {}  # chat_id -> threading.Timer
+
+    def start(self) -> None:
+        self._event_bus.subscribe(BOOKING_RESULT_TOPIC, self._on_result)
+
+    def stop(self) -> None:
+        # Sends whatever is still waiting for its batch window
+        self._event_bus.unsubscribe(BOOKING_RESULT_TOPIC, self._on_result)
+        with self._lock:
+            timers = list(self._timers.values())
+            chat_ids = list(self._pending)
+        for timer in timers:
+            timer.cancel()
+        for chat_id in chat_ids:
+            self._flush(chat_id)
+
+    def _on_result(self, result: BookingResult) -> None:
+        # Runs on the cron job thread, so sending is left to a timer
+        if result.chat_id is None:
+            _LOGGER.info("Booking result without owning chat: %s", result)
+            return
+
+        with self._lock:
+            self._pending.setdefault(result.chat_id, []).append(result)
+            if result.chat_id not in self._timers:
+                timer = threading.Timer(self._batch_window, self._flush, args=(result.chat_id,))
+                timer.daemon = True
+                self._timers[result.chat_id] = timer
+                timer.start()
+
+    def _flush(self, chat_id: int) -> None:
+        with self._lock:
+            results = self._pending.pop(chat_id, [])
+            self._timers.pop(chat_id, None)
+        if not results:
+            return
+
+        try:
+            self._send_message(chat_id, format_booking_results(results))
+        except Exception as e:
+            _LOGGER.error("ERROR: Cannot notify %s booking results to chat %s", len(results), chat_id)
+            _LOGGER.error(e)
@@ -0,0 +1,42 @@
+#!/usr/bin/python
+
+import threading
+from typing import Optional
+
+from utils.secret_loader import get_account
+
+
+class ChatState:
+    # Conversation state of one chat
+    __slots__ = ("chat_id", "is_activated", "creation_cron_info", "selected_cron_id", "balance_alert")
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.is_activated = False
+        self.creation_cron_info = None
+        # Cron picked in the first step of the conversations editing one cron
+        self.selected_cron_id = None
+        self.balance_alert = None
+
+    def get_account(self) -> Optional[str]:
+        # Club account the chat works with, None being the shared one
+        return get_account(self.chat_id)
+
+
+class ChatStates:
+    # Per-chat state, created on the first message of every chat
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}  # chat_id -> ChatState
+
+    def get(self, chat_id: int) -> ChatState:
+        state = self._states.get(chat_id)
+        if state is None:
+            with self._lock:
+                state = self._states.setdefault(chat_id, ChatState(chat_id))
+        return state
+
+    def get_all(self) -> list:  # ChatState
+        with self._lock:
+            return list(self._states.values())
@@ -1,10 +1,32 @@
 #!/usr/bin/python
 
+import datetime
 import logging
+import threading
+import time
+from typing import Optional
 
 import schedule
 
-from crons.reservation import do_reservation
+from bots.telegram.cron_registry import CronJob
+from bots.telegram.cron_registry import CronRegistry
+from bots.telegram.cron_store import CronStore
+from bots.telegram.web_interactions import invalidate_cache
+from crons.booking_result import BOOKING_RESULT_TOPIC
+from crons.booking_result import BookingResult
+from crons.cancellation_watcher import CancellationWatcher
+from crons.reservation import book
+from crons.retry_policy import RetryPolicy
+from crons.retry_policy import format_fallbacks
+from crons.retry_policy import parse_fallbacks
+from utils.browser_session_pool import BrowserSessionPool
+from utils.event_bus import get_event_bus
+from utils.job_executor import get_max_parallel_browsers
+from utils.precise_scheduler import PreciseScheduler
+from utils.secret_loader import get_account
+from utils.week_days_manager import compute_lead_schedule
+from utils.week_days_manager import compute_next_run
+from utils.week_days_manager import compute_previous_run
 from utils.week_days_manager import compute_run_day
 
 #
@@ -19,80 +41,426 @@ logging.basicConfig(
 # STATIC ATTRIBUTES
 #
 _LOGGER = logging.getLogger(__name__)
+_RUN_TIME = "00:01"
+# In strike mode the job starts this long before the opening instant to have the booking ready for the final submit
+_STRIKE_LEAD_TIME = 60.0
+# A missed run is only caught up while its game is still ahead (the cron runs 6 days before the game)
+_CATCH_UP_WINDOW = datetime.timedelta(days=6)
+# Crons of different users fire at the same instant and must not wait for each other. The jobs actually running at
+# once are further bounded by the browsers the host can afford
+_DEFAULT_MAX_CONCURRENT_JOBS = 8
 _DAYS_TO_JOB = {
-    "monday": schedule.every().monday,
-    "tuesday": schedule.every().tuesday,
-    "wednesday": schedule.every().wednesday,
-    "thursday": schedule.every().thursday,
-    "friday": schedule.every().friday,
-    "saturday": schedule.every().saturday,
-    "sunday": schedule.every().sunday
+    "monday": lambda: schedule.every().monday,
+    "tuesday": lambda: schedule.every().tuesday,
+    "wednesday": lambda: schedule.every().wednesday,
+    "thursday": lambda: schedule.every().thursday,
+    "friday": lambda: schedule.every().friday,
+    "saturday": lambda: schedule.every().saturday,
+    "sunday": lambda: schedule.every().sunday
 }
 
 
 class CronInteractions:
 
-    def __init__(self):
-        self._active_crons = []
+    def __init__(self,
+                 session_pool: BrowserSessionPool = None,
+                 race_courts: int = 1,
+                 cron_store: CronStore = None,
+                 max_concurrent_jobs: int = _DEFAULT_MAX_CONCURRENT_JOBS,
+                 opening_time: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 watcher: Optional[CancellationWatcher] = None):
+        self._crons = CronRegistry()
+        self._lock = threading.Lock()
+        self._race_courts = race_courts
+        # With opening_time ("HH:MM:SS" on the club server clock), bookings run in strike mode: prepared ahead and
+        # submitted at that exact instant. Otherwise they start at _RUN_TIME
+        self._opening_time = opening_time
+        self._run_time = opening_time if opening_time is not None else _RUN_TIME
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._watcher = watcher if watcher is not None else CancellationWatcher(on_booked=_on_watch_booked)
+        # One pool per club account, session_pool being the one of the shared account
+        self._session_pool = session_pool if session_pool is not None else BrowserSessionPool()
+        self._session_pools = {self._session_pool.get_account(): self._session_pool}
+        self._cron_store = cron_store if cron_store is not None else CronStore()
+        self._scheduler = PreciseScheduler(
+            max_workers=max_concurrent_jobs,
+            get_priority=self._get_job_priority,
+            get_capacity=self._get_job_capacity
+        )
 
-    def get_active_crons(self) -> []:
-        res = []
-        for job_info in self._active_crons:
-            exportable_job_info = (job_info[0], job_info[2], job_info[3])
-            res.append(exportable_job_info)
-        return res
+    def start(self) -> None:
+        self._load()
+        self._scheduler.start()
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._watcher.stop()
+        self._scheduler.stop()
+        self._cron_store.close()
+        with self._lock:
+            session_pools = list(self._session_pools.values())
+        for session_pool in session_pools:
+            session_pool.close()
+
+    def get_next_run_times(self) -> list:  # (game_day, game_start_time, game_duration, next_run)
+        return [(c.game_day, c.game_start_time, c.game_duration, c.job.next_run) for c in self._crons.get_all()]
+
+    def get_next_crons(self, chat_id: Optional[int] = None) -> (Optional[datetime.datetime], list):  # (time, [CronJob])
+        now = datetime.datetime.now()
+        if chat_id is None:
+            return self._crons.get_next_fire_time(now), self._crons.get_next(now)
+
+        crons = self._crons.get_by_chat(chat_id)
+        if not crons:
+            return None, []
+        next_run = min(cron_job.job.next_run for cron_job in crons)
+        return next_run, [cron_job for cron_job in crons if cron_job.job.next_run == next_run]
+
+    def get_jitters(self) -> list:  # (job, scheduled_time, jitter_in_seconds)
+        return self._scheduler.get_jitters()
+
+    def get_skews(self) -> list:  # (job_name, priority, scheduled_time, skew_in_seconds)
+        return self._scheduler.get_skews()
+
+    def get_active_crons(self, chat_id: Optional[int] = None) -> list:
+        # (cron_id, game_day, game_start_time, game_duration, priority, fallbacks, watch)
+        crons = self._crons.get_all() if chat_id is None else self._crons.get_by_chat(chat_id)
+        return [
+            (c.cron_id, c.game_day, c.game_start_time, c.game_duration, c.priority, c.fallbacks, c.watch)
+            for c in crons
+        ]
+
+    def get_watches(self, chat_id: Optional[int] = None) -> list:  # Watch
+        return self._watcher.get_watches(chat_id=chat_id)
 
     def get_num_active_crons(self) -> int:
-        return len(self._active_crons)
+        return len(self._crons)
 
-    def clear(self) -> None:
+    def has_cron(self, cron_id: int, chat_id: Optional[int] = None) -> bool:
+        # With chat_id, only the crons owned by that chat are considered
+        cron_job = self._crons.get(cron_id)
+        return cron_job is not None and (chat_id is None or cron_job.chat_id == chat_id)
+
+    def clear(self, chat_id: Optional[int] = None) -> None:
         try:
-            for job_id in range(self.get_num_active_crons()):
-                schedule.cancel_job(self._active_crons[job_id][4])
-            self._active_crons.clear()
+            with self._lock:
+                for cron_job in self._crons.clear(chat_id=chat_id):
+                    schedule.cancel_job(cron_job.job)
+                    schedule.cancel_job(cron_job.warm_up_job)
+                self._cron_store.clear(chat_id=chat_id)
+                self._watcher.clear(chat_id=chat_id)
+            self._scheduler.wake()
             _LOGGER.debug("All reservation crons erased")
         except Exception as e:
             _LOGGER.error("Internal error while clearing all reservation crons")
             _LOGGER.error(e)
 
-    def cron_create(self, game_day: str, game_start_time: str, game_duration: str) -> None:
+    def cron_create(self,
+                    game_day: str,
+                    game_start_time: str,
+                    game_duration: str,
+                    chat_id: Optional[int] = None,
+                    priority: int = 0,
+                    fallbacks: Optional[list] = None,
+                    watch: bool = False) -> int:
         try:
-            run_day = compute_run_day(game_day)
+            # Validate before storing
+            compute_run_day(game_day)
+            with self._lock:
+                cron_id = self._cron_store.add(
+                    game_day,
+                    game_start_time,
+                    game_duration,
+                    chat_id=chat_id,
+                    priority=priority,
+                    fallbacks=format_fallbacks(fallbacks) if fallbacks else None,
+                    watch=watch
+                )
+                self._register(cron_id, chat_id, game_day, game_start_time, game_duration, priority, fallbacks, watch)
+            self._scheduler.wake()
 
-            job = _DAYS_TO_JOB[run_day].at("00:01").do(
-                do_reservation,
+            _LOGGER.debug(
+                "Reservation Cron created: Id = %s, GameDay = %s, GameStartTime = %s, GameDuration = %s",
+                cron_id,
+                game_day,
+                game_start_time,
+                game_duration
+            )
+            return cron_id
+        except Exception as e:
+            _LOGGER.error("Internal error while creating reservation cron")
+            _LOGGER.error(e)
+            raise e
+
+    def _register(self,
+                  cron_id: int,
+                  chat_id: Optional[int],
+                  game_day: str,
+                  game_start_time: str,
+                  game_duration: str,
+                  priority: int,
+                  fallbacks: Optional[list],
+                  watch: bool) -> None:
+        run_day = compute_run_day(game_day)
+
+        job_day, job_time = run_day, self._run_time
+        if self._opening_time is not None:
+            job_day, job_time = compute_lead_schedule(run_day, self._opening_time, _STRIKE_LEAD_TIME)
+        job = _DAYS_TO_JOB[job_day]().at(job_time).do(
+            self._run_reservation,
+            cron_id,
+            chat_id,
+            game_day=game_day,
+            game_start_time=game_start_time,
+            game_duration=game_duration
+        )
+
+        # Log in before the booking window opens so that the job does not pay the browser start-up
+        warm_up_day, warm_up_time = compute_lead_schedule(
+            run_day,
+            self._run_time,
+            self._session_pool.get_lead_time()
+        )
+        warm_up_job = _DAYS_TO_JOB[warm_up_day]().at(warm_up_time).do(self._warm_up, cron_id)
+
+        self._crons.add(CronJob(
+            cron_id,
+            chat_id,
+            run_day,
+            self._run_time,
+            game_day,
+            game_start_time,
+            game_duration,
+            job,
+            warm_up_job,
+            priority,
+            fallbacks,
+            watch
+        ))
+
+    def _load(self) -> None:
+        # Registers the stored crons and runs the ones whose fire time passed while the bot was down
+        start = time.perf_counter()
+        now = datetime.datetime.now()
+        missed = []
+        stored_crons = self._cron_store.load_all()
+        for stored_cron in stored_crons:
+            cron_id, chat_id, game_day, game_start_time, game_duration, priority, created_at, last_fired, fallbacks, \
+                watch = stored_cron
+            try:
+                self._register(
+                    cron_id,
+                    chat_id,
+                    game_day,
+                    game_start_time,
+                    game_duration,
+                    priority,
+                    parse_fallbacks(fallbacks),
+                    bool(watch)
+                )
+            except Exception as e:
+                _LOGGER.error("Cannot restore reservation cron with id = %s", cron_id)
+                _LOGGER.error(e)
+                continue
+
+            previous_run = compute_previous_run(compute_run_day(game_day), self._run_time, now)
+            handled_at = datetime.datetime.fromtimestamp(max(created_at, last_fired or 0))
+            if handled_at < previous_run and now - previous_run < _CATCH_UP_WINDOW:
+                missed.append((priority, cron_id, chat_id, game_day, game_start_time, game_duration))
+        self._scheduler.wake()
+        _LOGGER.info(
+            "Restored %s reservation crons in %.3fs",
+            len(self._crons),
+            time.perf_counter() - start
+        )
+
+        # Highest priority first, as they would have fired
+        missed.sort(key=lambda missed_cron: -missed_cron[0])
+        for _, cron_id, chat_id, game_day, game_start_time, game_duration in missed:
+            _LOGGER.info("Catching up missed reservation cron with id = %s", cron_id)
+            self._scheduler.submit(
+                self._run_reservation,
+                cron_id,
+                chat_id,
                 game_day=game_day,
                 game_start_time=game_start_time,
                 game_duration=game_duration
             )
 
-            job_info = (run_day, game_day, game_start_time, game_duration, job)
-            self._active_crons.append(job_info)
+    def _get_session_pool(self, account: Optional[str]) -> BrowserSessionPool:
+        with self._lock:
+            if account not in self._session_pools:
+                self._session_pools[account] = BrowserSessionPool(
+                    lead_time=self._session_pool.get_lead_time(),
+                    account=account
+                )
+            return self._session_pools[account]
+
+    def _get_job_priority(self, job: schedule.Job) -> int:
+        cron_job = self._crons.get_by_job(job)
+        return cron_job.priority if cron_job is not None else 0
+
+    def _get_job_capacity(self) -> int:
+        # Every job drives race_courts browsers
+        return max(1, self._get_max_parallel_browsers() // self._race_courts)
+
+    def _get_max_parallel_browsers(self) -> int:
+        # The sessions already warmed up in the pools are the ones the jobs will use, so their memory must not be
+        # counted against the cap a second time
+        with self._lock:
+            session_pools = list(self._session_pools.values())
+        return get_max_parallel_browsers(sum(pool.get_num_started_sessions() for pool in session_pools))
+
+    def _warm_up(self, cron_id: int) -> None:
+        # The crons of one account firing at the same instant share its pool: every warm up job tops the pool up to
+        # the sessions all of them need, so that the first one to run does the work and the others find it done.
+        # The account is resolved when the job runs so that credentials added in the meantime are used
+        cron_job = self._crons.get(cron_id)
+        if cron_job is None:
+            return
+        account = _get_account(cron_job.chat_id)
+        num_crons = len([
+            c for c in self._crons.get_by_run_day(cron_job.run_day)
+            if c.run_time == cron_job.run_time and _get_account(c.chat_id) == account
+        ])
+        num_sessions = min(num_crons * self._race_courts, self._get_max_parallel_browsers())
+        self._get_session_pool(account).warm_up(num_sessions=num_sessions)
+
+    def _get_strike_time(self, game_day: str) -> Optional[datetime.datetime]:
+        # Opening instant this run strikes at, None when not in strike mode or when the opening has already passed
+        # (e.g. a missed run being caught up) so that the booking starts right away
+        if self._opening_time is None:
+            return None
+        now = datetime.datetime.now()
+        strike_time = compute_next_run(compute_run_day(game_day), self._opening_time, now)
+        if (strike_time - now).total_seconds() > 2 * _STRIKE_LEAD_TIME:
+            return None
+        return strike_time
+
+    def _run_reservation(self, cron_id: int, chat_id: Optional[int], **kwargs) -> None:
+        strike_time = self._get_strike_time(kwargs["game_day"])
+        try:
+            # A strike counts as run at the opening instant so that a restart right after it does not catch it up
+            self._cron_store.mark_fired(cron_id, strike_time.timestamp() if strike_time is not None else None)
+        except Exception as e:
+            _LOGGER.warning("WARN: Cannot record run of reservation cron with id = %s", cron_id)
+            _LOGGER.warning(e)
+
+        # Read when the job runs so that fallbacks changed after the cron was created are used
+        cron_job = self._crons.get(cron_id)
+        account = _get_account(chat_id)
+        result = book(
+            session_pool=self._get_session_pool(account),
+            race_courts=self._race_courts,
+            account=account,
+            strike_time=strike_time,
+            fallbacks=cron_job.fallbacks if cron_job is not None else None,
+            retry_policy=self._retry_policy,
+            **kwargs
+        )
+        if result.is_success():
+            # Balance and reservations have changed
+            invalidate_cache(account)
+        elif cron_job is not None and cron_job.watch and result.game_date is not None:
+            self._watcher.watch(
+                cron_id,
+                chat_id,
+                account,
+                kwargs["game_day"],
+                result.game_date,
+                [(kwargs["game_start_time"], kwargs["game_duration"])] + cron_job.fallbacks
+            )
+
+        result.cron_id = cron_id
+        result.chat_id = chat_id
+        get_event_bus().publish(BOOKING_RESULT_TOPIC, result)
+
+    def cron_set_priority(self, cron_id: int, priority: int) -> None:
+        try:
+            with self._lock:
+                cron_job = self._crons.get(cron_id)
+                if cron_job is None:
+                    raise Exception("ERROR: Invalid cron id " + str(cron_id))
+                self._cron_store.set_priority(cron_id, priority)
+                cron_job.priority = priority
 
             _LOGGER.debug(
-                "Reservation Cron created: GameDay = %s, GameStartTime = %s, GameDuration = %s",
-                game_day,
-                game_start_time,
-                game_duration
+                "Reservation Cron with id = %s set to priority %s",
+                cron_id,
+                priority
             )
         except Exception as e:
-            _LOGGER.error("Internal error while creating reservation cron")
+            _LOGGER.error("Internal error while setting reservation cron priority")
+            _LOGGER.error(e)
+            raise e
+
+    def cron_set_fallbacks(self, cron_id: int, fallbacks: list) -> None:
+        # fallbacks are (game_start_time, game_duration), an empty list removes them
+        try:
+            with self._lock:
+                cron_job = self._crons.get(cron_id)
+                if cron_job is None:
+                    raise Exception("ERROR: Invalid cron id " + str(cron_id))
+                self._cron_store.set_fallbacks(cron_id, format_fallbacks(fallbacks) if fallbacks else None)
+                cron_job.fallbacks = list(fallbacks)
+
+            _LOGGER.debug(
+                "Reservation Cron with id = %s set to fallbacks %s",
+                cron_id,
+                format_fallbacks(fallbacks)
+            )
+        except Exception as e:
+            _LOGGER.error("Internal error while setting reservation cron fallbacks")
             _LOGGER.error(e)
             raise e
 
-    def cron_delete(self, job_id: int) -> None:
+    def cron_set_watch(self, cron_id: int, watch: bool) -> None:
+        # Turning the watch off also stops the ongoing one, if any
         try:
-            if job_id < 0 or job_id >= len(self._active_crons):
-                raise Exception("ERROR: Invalid cron id to delete")
+            with self._lock:
+                cron_job = self._crons.get(cron_id)
+                if cron_job is None:
+                    raise Exception("ERROR: Invalid cron id " + str(cron_id))
+                self._cron_store.set_watch(cron_id, watch)
+                cron_job.watch = watch
+                if not watch:
+                    self._watcher.unwatch(cron_id)
 
-            schedule.cancel_job(self._active_crons[job_id][4])
-            self._active_crons.pop(job_id)
+            _LOGGER.debug(
+                "Reservation Cron with id = %s set to watch %s",
+                cron_id,
+                watch
+            )
+        except Exception as e:
+            _LOGGER.error("Internal error while setting reservation cron watch")
+            _LOGGER.error(e)
+            raise e
+
+    def cron_delete(self, cron_id: int) -> None:
+        try:
+            with self._lock:
+                cron_job = self._crons.remove(cron_id)
+                schedule.cancel_job(cron_job.job)
+                schedule.cancel_job(cron_job.warm_up_job)
+                self._cron_store.delete(cron_id)
+                self._watcher.unwatch(cron_id)
+            self._scheduler.wake()
 
             _LOGGER.debug(
                 "Reservation Cron with id = %s erased",
-                job_id
+                cron_id
             )
         except Exception as e:
             _LOGGER.error("Internal error while deleting reservation cron")
             _LOGGER.error(e)
             raise e
+
+
+def _get_account(chat_id: Optional[int]) -> Optional[str]:
+    return get_account(chat_id) if chat_id is not None else None
+
+
+def _on_watch_booked(result: BookingResult) -> None:
+    # Balance and reservations have changed
+    invalidate_cache(result.account)
@@ -0,0 +1,169 @@
+#!/usr/bin/python
+
+import bisect
+import datetime
+import threading
+from typing import Optional
+
+import schedule
+
+#
+# STATIC ATTRIBUTES
+#
+_NUM_TO_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_SECONDS_PER_DAY = 24 * 3600
+_SECONDS_PER_WEEK = 7 * _SECONDS_PER_DAY
+
+
+def _get_week_offset(day: str, run_time: str) -> int:
+    # Seconds from Monday 00:00 to day at run_time ("HH:MM" or "HH:MM:SS")
+    fields = [int(field) for field in run_time.split(":")] + [0]
+    return _NUM_TO_DAYS.index(day.lower()) * _SECONDS_PER_DAY + fields[0] * 3600 + fields[1] * 60 + fields[2]
+
+
+class CronJob:
+    # One reservation cron and the schedule jobs that run it
+    __slots__ = (
+        "cron_id", "chat_id", "run_day", "run_time", "game_day", "game_start_time", "game_duration", "job",
+        "warm_up_job", "priority", "fallbacks", "watch"
+    )
+
+    def __init__(self,
+                 cron_id: int,
+                 chat_id: Optional[int],
+                 run_day: str,
+                 run_time: str,
+                 game_day: str,
+                 game_start_time: str,
+                 game_duration: str,
+                 job: Optional[schedule.Job] = None,
+                 warm_up_job: Optional[schedule.Job] = None,
+                 priority: int = 0,
+                 fallbacks: Optional[list] = None,
+                 watch: bool = False):
+        self.cron_id = cron_id
+        self.chat_id = chat_id
+        self.run_day = run_day
+        self.run_time = run_time
+        self.game_day = game_day
+        self.game_start_time = game_start_time
+        self.game_duration = game_duration
+        self.job = job
+        self.warm_up_job = warm_up_job
+        # Among the crons firing at the same instant, the ones with a higher priority start first
+        self.priority = priority
+        # (game_start_time, game_duration) booked in order when the requested slot is taken
+        self.fallbacks = fallbacks if fallbacks is not None else []
+        # Whether a failed run keeps watching for cancellations until the game
+        self.watch = watch
+
+    def get_week_offset(self) -> int:
+        return _get_week_offset(self.run_day, self.run_time)
+
+
+class CronRegistry:
+    # Crons keyed by their stable id, with secondary indexes by run day, game day, owning chat and schedule job. Fire
+    # times are kept sorted by their offset within the week so that the next cron to fire is found with a binary search
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._crons = {}  # cron_id -> CronJob
+        self._by_run_day = {}  # run_day -> {cron_id: CronJob}
+        self._by_game_day = {}  # game_day -> {cron_id: CronJob}
+        self._by_chat = {}  # chat_id -> {cron_id: CronJob}
+        self._by_job = {}  # job or warm_up_job -> CronJob
+        self._fire_times = []  # sorted (week_offset, cron_id)
+
+    def __len__(self) -> int:
+        return len(self._crons)
+
+    def __contains__(self, cron_id: int) -> bool:
+        return cron_id in self._crons
+
+    def add(self, cron_job: CronJob) -> None:
+        with self._lock:
+            if cron_job.cron_id in self._crons:
+                raise Exception("ERROR: Duplicated cron id " + str(cron_job.cron_id))
+            self._crons[cron_job.cron_id] = cron_job
+            self._by_run_day.setdefault(cron_job.run_day, {})[cron_job.cron_id] = cron_job
+            self._by_game_day.setdefault(cron_job.game_day.lower(), {})[cron_job.cron_id] = cron_job
+            self._by_chat.setdefault(cron_job.chat_id, {})[cron_job.cron_id] = cron_job
+            for job in (cron_job.job, cron_job.warm_up_job):
+                if job is not None:
+                    self._by_job[job] = cron_job
+            bisect.insort(self._fire_times, (cron_job.get_week_offset(), cron_job.cron_id))
+
+    def remove(self, cron_id: int) -> CronJob:
+        with self._lock:
+            cron_job = self._crons.pop(cron_id, None)
+            if cron_job is None:
+                raise Exception("ERROR: Invalid cron id " + str(cron_id))
+            self._discard(self._by_run_day, cron_job.run_day, cron_id)
+            self._discard(self._by_game_day, cron_job.game_day.lower(), cron_id)
+            self._discard(self._by_chat, cron_job.chat_id, cron_id)
+            self._by_job.pop(cron_job.job, None)
+            self._by_job.pop(cron_job.warm_up_job, None)
+            position = bisect.bisect_left(self._fire_times, (cron_job.get_week_offset(), cron_id))
+            del self._fire_times[position]
+            return cron_job
+
+    def clear(self, chat_id: Optional[int] = None) -> list:  # Removed CronJob
+        # Removes every cron, or only the ones of chat_id when given
+        with self._lock:
+            cron_ids = list(self._crons) if chat_id is None else list(self._by_chat.get(chat_id, {}))
+            return [self.remove(cron_id) for cron_id in cron_ids]
+
+    def get(self, cron_id: int) -> Optional[CronJob]:
+        return self._crons.get(cron_id)
+
+    def get_all(self) -> list:  # CronJob sorted by id
+        with self._lock:
+            return [self._crons[cron_id] for cron_id in sorted(self._crons)]
+
+    def get_by_run_day(self, run_day: str) -> list:  # CronJob sorted by id
+        return self._get_indexed(self._by_run_day, run_day.lower())
+
+    def get_by_game_day(self, game_day: str) -> list:  # CronJob sorted by id
+        return self._get_indexed(self._by_game_day, game_day.lower())
+
+    def get_by_chat(self, chat_id: Optional[int]) -> list:  # CronJob sorted by id
+        return self._get_indexed(self._by_chat, chat_id)
+
+    def get_by_job(self, job: schedule.Job) -> Optional[CronJob]:
+        # job is either the reservation job or the warm up job of the cron
+        return self._by_job.get(job)
+
+    def get_next(self, now: datetime.datetime) -> list:  # CronJob firing next after now (the same instant)
+        with self._lock:
+            if not self._fire_times:
+                return []
+            now_offset = _get_week_offset(_NUM_TO_DAYS[now.weekday()], now.strftime("%H:%M:%S"))
+            position = bisect.bisect_right(self._fire_times, (now_offset, float("inf")))
+            next_offset = self._fire_times[position % len(self._fire_times)][0]
+            first = bisect.bisect_left(self._fire_times, (next_offset, -1))
+            last = bisect.bisect_right(self._fire_times, (next_offset, float("inf")))
+            return [self._crons[cron_id] for _, cron_id in self._fire_times[first:last]]
+
+    def get_next_fire_time(self, now: datetime.datetime) -> Optional[datetime.datetime]:
+        next_crons = self.get_next(now)
+        if not next_crons:
+            return None
+        week_start = (now - datetime.timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        fire_time = week_start + datetime.timedelta(seconds=next_crons[0].get_week_offset())
+        if fire_time <= now:
+            fire_time += datetime.timedelta(seconds=_SECONDS_PER_WEEK)
+        return fire_time
+
+    def _get_indexed(self, index: dict, key) -> list:
+        with self._lock:
+            crons = index.get(key, {})
+            return [crons[cron_id] for cron_id in sorted(crons)]
+
+    @staticmethod
+    def _discard(index: dict, key, cron_id: int) -> None:
+        crons = index.get(key)
+        if crons is None:
+            return
+        crons.pop(cron_id, None)
+        if not crons:
+            del index[key]
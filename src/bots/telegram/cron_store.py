@@ -0,0 +1,149 @@
+#!/usr/bin/python
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+_CWD = os.path.dirname(os.path.realpath(__file__))
+_DEFAULT_DB_FILE = str(_CWD) + "/../../../data/crons.db"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER,
+    game_day TEXT NOT NULL,
+    game_start_time TEXT NOT NULL,
+    game_duration TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_fired REAL,
+    fallbacks TEXT,
+    watch INTEGER NOT NULL DEFAULT 0
+)
+"""
+_MIGRATIONS = {
+    # column -> statement adding it to databases created before the column existed
+    "chat_id": "ALTER TABLE crons ADD COLUMN chat_id INTEGER",
+    "priority": "ALTER TABLE crons ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+    "fallbacks": "ALTER TABLE crons ADD COLUMN fallbacks TEXT",
+    "watch": "ALTER TABLE crons ADD COLUMN watch INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class CronStore:
+    # Durable copy of the reservation crons. SQLite runs in WAL mode so that every write is a short append that
+    # survives a crash, and the whole table is read with a single query at startup. AUTOINCREMENT guarantees that the
+    # ids are never reused, so they can be shown to the users as stable cron ids
+
+    def __init__(self, db_file: Optional[str] = _DEFAULT_DB_FILE):
+        self._db_file = db_file
+
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def add(self,
+            game_day: str,
+            game_start_time: str,
+            game_duration: str,
+            chat_id: Optional[int] = None,
+            priority: int = 0,
+            fallbacks: Optional[str] = None,
+            watch: bool = False) -> int:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                cursor = connection.execute(
+                    "INSERT INTO crons (chat_id, game_day, game_start_time, game_duration, priority, created_at, "
+                    "fallbacks, watch) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (chat_id, game_day, game_start_time, game_duration, priority, time.time(), fallbacks, int(watch))
+                )
+            return cursor.lastrowid
+
+    def delete(self, cron_id: int) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM crons WHERE id = ?", (cron_id,))
+
+    def clear(self, chat_id: Optional[int] = None) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                if chat_id is None:
+                    connection.execute("DELETE FROM crons")
+                else:
+                    connection.execute("DELETE FROM crons WHERE chat_id = ?", (chat_id,))
+
+    def set_priority(self, cron_id: int, priority: int) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE crons SET priority = ? WHERE id = ?", (priority, cron_id))
+
+    def set_fallbacks(self, cron_id: int, fallbacks: Optional[str]) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE crons SET fallbacks = ? WHERE id = ?", (fallbacks, cron_id))
+
+    def set_watch(self, cron_id: int, watch: bool) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE crons SET watch = ? WHERE id = ?", (int(watch), cron_id))
+
+    def mark_fired(self, cron_id: int, fired_at: Optional[float] = None) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "UPDATE crons SET last_fired = ? WHERE id = ?",
+                    (fired_at if fired_at is not None else time.time(), cron_id)
+                )
+
+    def load_all(self) -> list:
+        # (cron_id, chat_id, game_day, game_start_time, game_duration, priority, created_at, last_fired, fallbacks,
+        # watch)
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, chat_id, game_day, game_start_time, game_duration, priority, created_at, last_fired, "
+                "fallbacks, watch FROM crons ORDER BY id"
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self._db_file != ":memory:":
+                os.makedirs(os.path.dirname(os.path.realpath(self._db_file)), exist_ok=True)
+            connection = sqlite3.connect(self._db_file, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Durable enough in WAL mode: a power loss may drop the last commits but never corrupts the database
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(crons)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    connection.execute(statement)
+            connection.commit()
+            self._connection = connection
+            _LOGGER.info("Cron store opened at " + str(self._db_file))
+        return self._connection
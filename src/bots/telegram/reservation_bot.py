@@ -1,24 +1,39 @@
 #!/usr/bin/python
 
+import asyncio
 import logging
+import signal
 from enum import IntEnum
 from enum import unique
-
-from telegram.ext import CallbackContext
+from typing import Callable
+from typing import Optional
+
+from telegram import ReplyKeyboardMarkup
+from telegram import ReplyKeyboardRemove
+from telegram import Update
+from telegram.ext import Application
+from telegram.ext import ApplicationBuilder
 from telegram.ext import CommandHandler
+from telegram.ext import ContextTypes
 from telegram.ext import ConversationHandler
-from telegram.ext import Dispatcher
-from telegram.ext import Filters
 from telegram.ext import MessageHandler
-from telegram.ext import Updater
-from telegram.replykeyboardmarkup import ReplyKeyboardMarkup
-from telegram.replykeyboardremove import ReplyKeyboardRemove
-from telegram.update import Update
+from telegram.ext import filters
 
+from bots.telegram.background_work import BackgroundWork
+from bots.telegram.booking_notifier import BookingNotifier
+from bots.telegram.chat_states import ChatStates
 from bots.telegram.cron_interactions import CronInteractions
+from bots.telegram.users_whitelist import UsersWhitelist
 from bots.telegram.web_interactions import get_all_reservations
 from bots.telegram.web_interactions import get_balance
+from bots.telegram.web_interactions import invalidate_cache
+from crons.retry_policy import format_fallbacks
+from crons.retry_policy import parse_fallbacks
+from utils.secret_loader import get_secret_file_path
+from utils.secret_loader import get_secret_store
 from utils.secret_loader import load_from_secret_file
+from utils.secret_loader import load_optional_secret
+from utils.tracing import get_tracer
 
 #
 # Enable logging
@@ -40,16 +55,23 @@ BOT_VERSION = "0.0.1"
 _LOGGER = logging.getLogger(__name__)
 _MIN_ALERT = 1
 _MAX_ALERT = 40
+_MIN_PRIORITY = 0
+_MAX_PRIORITY = 10
+_WATCH_VALUES = {"on": True, "off": False}
+_NUM_SKEWS_SHOWN = 5
 
-_IS_ACTIVATED = False
-_CRON_INTERACTIONS = CronInteractions()
-_CREATION_CRON_INFO = None
-_BALANCE_ALERT = None
+_CHAT_STATES = ChatStates()
+# Strike mode is enabled with the opening instant of the booking window ("HH:MM:SS" on the club clock)
+_CRON_INTERACTIONS = CronInteractions(opening_time=load_optional_secret("booking_opening_time.txt"))
+_BACKGROUND_WORK = BackgroundWork()
+_USERS_WHITELIST = UsersWhitelist(get_secret_file_path("telegram_users_whitelist.txt"))
 
 #
 # CONSTANTS
 #
 _INACTIVE_MSG = "Bot is inactive. Please activate it using the /start command"
+_WORKING_MSG = "Working on it..."
+_BUSY_MSG = "I am too busy right now. Please try again in a few minutes"
 _AVAILABLE_TIMES = [str(h) + ":" + str(m) for h in range(8, 23) for m in ["00", "30"]]
 _AVAILABLE_DURATIONS = ["60m", "90m", "120m"]
 
@@ -77,12 +99,19 @@ class CmdStatus(IntEnum):
     RESERVATION_FAILED = 16
     SHOW_BALANCE_ALERT = 17
     UNAUTHORISED_USER = 18
+    STATS = 19
+    SET_RESERVATION_CRON_PRIORITY = 20
+    SET_RESERVATION_CRON_PRIORITY_VALUE = 21
+    SET_RESERVATION_CRON_FALLBACKS = 22
+    SET_RESERVATION_CRON_FALLBACKS_VALUE = 23
+    SET_RESERVATION_CRON_WATCH = 24
+    SET_RESERVATION_CRON_WATCH_VALUE = 25
 
 
-def show_help(update: Update, _: CallbackContext) -> int:
+async def show_help(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     _LOGGER.debug("Received new request: help")
 
-    update.message.reply_text(
+    await update.message.reply_text(
         "/help : Displays this help message\n"
         + "/version : Displays the ReservationBot version\n"
         + "/start : Activates the ReservationBot\n"
@@ -93,37 +122,42 @@ def show_help(update: Update, _: CallbackContext) -> int:
         + "/show_balance : Shows the account balance\n"
         + "/setup_reservation_cron : Helper to setup a new reservation cron job\n"
         + "/remove_reservation_cron : Helper to remove a reservation cron job\n"
+        + "/set_reservation_cron_priority : Helper to choose which reservation cron jobs start first\n"
+        + "/set_reservation_cron_fallbacks : Helper to set the slots booked when a cron's one is taken\n"
+        + "/set_reservation_cron_watch : Helper to keep watching for cancellations when a cron fails\n"
         + "/setup_balance_alert : Helper to setup an account balance alert\n"
         + "/remove_balance_alert : Helper to remove the account balance alert\n"
+        + "/stats : Shows the booking latency statistics per step\n"
     )
     return CmdStatus.HELP.value
 
 
-def version(update: Update, _: CallbackContext) -> int:
+async def version(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global BOT_NAME
     global BOT_VERSION
 
     _LOGGER.debug("Received new request: version")
 
-    update.message.reply_text(
+    await update.message.reply_text(
         str(BOT_NAME) + " version " + str(BOT_VERSION)
     )
     return CmdStatus.VERSION.value
 
 
-def start(update: Update, _: CallbackContext) -> int:
+async def start(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global BOT_NAME
     global BOT_VERSION
-    global _IS_ACTIVATED
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.info("Bot started: Name = %s, Version = %s", str(BOT_NAME), str(BOT_VERSION))
 
-    _IS_ACTIVATED = True
+    state.is_activated = True
 
-    update.message.reply_text(
+    await update.message.reply_text(
         "Hi! My name is "
         + str(BOT_NAME)
         + ". I will handle the paddle tennis reservations for you.\n"
@@ -132,376 +166,748 @@ def start(update: Update, _: CallbackContext) -> int:
     return CmdStatus.START.value
 
 
-def stop(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-
-    if not _authenticate(update):
+async def stop(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.info("Bot stopped")
 
-    _IS_ACTIVATED = False
+    state.is_activated = False
 
-    update.message.reply_text(
+    await update.message.reply_text(
         "I am now inactive. Cron jobs will still be executed though.\n"
         + "Type /start to enable me again"
     )
     return CmdStatus.STOP.value
 
 
-def reset(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
+async def reset(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global _CRON_INTERACTIONS
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.info("Bot reset")
 
-    prev_is_activated = _IS_ACTIVATED
-    _IS_ACTIVATED = False
+    prev_is_activated = state.is_activated
+    state.is_activated = False
 
     _LOGGER.debug("Erasing all crons...")
-    _CRON_INTERACTIONS.clear()
+    _CRON_INTERACTIONS.clear(chat_id=state.chat_id)
 
-    _IS_ACTIVATED = prev_is_activated
+    state.is_activated = prev_is_activated
 
-    update.message.reply_text(
+    await update.message.reply_text(
         "All my data has been reset!"
     )
     return CmdStatus.RESET.value
 
 
-def show_reservation_crons(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
+async def show_reservation_crons(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global _CRON_INTERACTIONS
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: show_reservation_crons")
 
-    if _IS_ACTIVATED:
-        update.message.reply_text(
+    if state.is_activated:
+        next_fire_time, next_crons = _CRON_INTERACTIONS.get_next_crons(chat_id=state.chat_id)
+        watches = _CRON_INTERACTIONS.get_watches(chat_id=state.chat_id)
+        await update.message.reply_text(
             "Active cron jobs:\n"
-            + " ID | GAME DAY | GAME START TIME | GAME DURATION \n"
-            + "\n".join(
-                [" " + str(cron_id) + "       " + str(game_day) + "                  " + str(
-                    game_start_time) + "                  " + str(
-                    game_duration) for cron_id, (game_day, game_start_time, game_duration) in
-                 enumerate(_CRON_INTERACTIONS.get_active_crons())],
-            ),
+            + _format_crons(_CRON_INTERACTIONS.get_active_crons(chat_id=state.chat_id))
+            + ("\nNext run: " + next_fire_time.strftime("%A %d/%m %H:%M") + " (ids "
+               + ", ".join(str(cron_job.cron_id) for cron_job in next_crons) + ")" if next_crons else "")
+            + ("\n" + _format_watches(watches) if watches else ""),
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SHOW_RESERVATION_CRONS.value
 
 
-def show_reservations(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-
-    if not _authenticate(update):
+async def show_reservations(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
-    _LOGGER.debug("Received new request: show_reservations")
+    state = _CHAT_STATES.get(update.effective_chat.id)
 
-    if _IS_ACTIVATED:
-        reservations = get_all_reservations()
+    _LOGGER.debug("Received new request: show_reservations")
 
-        update.message.reply_text(
-            "Reservations:\n"
-            + " GAME DAY | GAME START TIME | GAME END TIME | LOCATION \n"
-            + "\n".join(
-                [str(game_day) + " " + str(game_start_time) + " " + str(game_end_time) + " " + str(game_field) for
-                 game_day, game_start_time, game_end_time, game_field in reservations])
+    if state.is_activated:
+        account = state.get_account()
+        await _reply_in_background(
+            update,
+            context,
+            "show_reservations",
+            lambda: get_all_reservations(account=account),
+            _format_reservations
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SHOW_RESERVATIONS.value
 
 
-def show_balance(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-
-    if not _authenticate(update):
+async def show_balance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
-    _LOGGER.debug("Received new request: show_balance")
+    state = _CHAT_STATES.get(update.effective_chat.id)
 
-    if _IS_ACTIVATED:
-        balance = get_balance()
+    _LOGGER.debug("Received new request: show_balance")
 
-        update.message.reply_text(
-            "Current Balance: " + str(balance)
+    if state.is_activated:
+        account = state.get_account()
+        await _reply_in_background(
+            update,
+            context,
+            "show_balance",
+            lambda: get_balance(account=account),
+            lambda balance: "Current Balance: " + str(balance)
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SHOW_BALANCE.value
 
 
-def show_balance_alert(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _BALANCE_ALERT
-
-    if not _authenticate(update):
+async def show_balance_alert(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: show_balance_alert")
 
-    if _IS_ACTIVATED:
-        if _BALANCE_ALERT:
-            update.message.reply_text(
-                "Current Balance Alert set to : " + str(_BALANCE_ALERT) + " euros"
+    if state.is_activated:
+        if state.balance_alert:
+            await update.message.reply_text(
+                "Current Balance Alert set to : " + str(state.balance_alert) + " euros"
             )
         else:
-            update.message.reply_text("Balance Alert is not set")
+            await update.message.reply_text("Balance Alert is not set")
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SHOW_BALANCE_ALERT.value
 
 
-def setup_reservation_cron(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
-
-    if not _authenticate(update):
+async def setup_reservation_cron(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_reservation_cron")
 
-    if _IS_ACTIVATED:
-        _CREATION_CRON_INFO = dict()
+    if state.is_activated:
+        state.creation_cron_info = dict()
         reply_keyboard = [["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]]
-        update.message.reply_text(
+        await update.message.reply_text(
             "Alright! Lets setup a reservation.\n"
             + "When do you want to play?",
             reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SETUP_RESERVATION_CRON.value
 
 
-def setup_reservation_cron_start_time(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
-
-    if not _authenticate(update):
+async def setup_reservation_cron_start_time(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_reservation_cron_start_time")
 
-    if _IS_ACTIVATED:
-        if _CREATION_CRON_INFO is None:
-            update.message.reply_text("Error: Please set up the game day first or restart the whole process")
+    if state.is_activated:
+        if state.creation_cron_info is None:
+            await update.message.reply_text("Error: Please set up the game day first or restart the whole process")
         else:
-            _CREATION_CRON_INFO["day"] = update.message.text
+            state.creation_cron_info["day"] = update.message.text
 
             reply_keyboard = [_AVAILABLE_TIMES]
-            update.message.reply_text(
+            await update.message.reply_text(
                 "When should the game start?",
                 reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
             )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SETUP_RESERVATION_CRON_START_TIME.value
 
 
-def setup_reservation_cron_game_time(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
-
-    if not _authenticate(update):
+async def setup_reservation_cron_game_time(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_reservation_cron_game_time")
 
-    if _IS_ACTIVATED:
-        if _CREATION_CRON_INFO is None:
-            update.message.reply_text("Error: Please set up the game day and time first or restart the whole process")
+    if state.is_activated:
+        if state.creation_cron_info is None:
+            await update.message.reply_text(
+                "Error: Please set up the game day and time first or restart the whole process"
+            )
         else:
-            _CREATION_CRON_INFO["start_time"] = update.message.text
+            state.creation_cron_info["start_time"] = update.message.text
 
             reply_keyboard = [_AVAILABLE_DURATIONS]
-            update.message.reply_text(
+            await update.message.reply_text(
                 "How many time do you want to play?",
                 reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
             )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SETUP_RESERVATION_CRON_GAME_TIME.value
 
 
-def setup_reservation_cron_complete(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
+async def setup_reservation_cron_complete(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global _CRON_INTERACTIONS
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_reservation_cron_complete")
 
-    if _IS_ACTIVATED:
-        if _CREATION_CRON_INFO is None:
-            update.message.reply_text(
+    if state.is_activated:
+        if state.creation_cron_info is None:
+            await update.message.reply_text(
                 "Error: Please set up the game day, time, and duration first or restart the whole process"
             )
         else:
-            _CREATION_CRON_INFO["duration"] = update.message.text
+            state.creation_cron_info["duration"] = update.message.text
 
-            game_day = _CREATION_CRON_INFO["day"]
-            game_start_time = _CREATION_CRON_INFO["start_time"]
-            game_duration = _CREATION_CRON_INFO["duration"]
+            game_day = state.creation_cron_info["day"]
+            game_start_time = state.creation_cron_info["start_time"]
+            game_duration = state.creation_cron_info["duration"]
             try:
-                _CRON_INTERACTIONS.cron_create(
+                cron_id = _CRON_INTERACTIONS.cron_create(
                     game_day=game_day,
                     game_start_time=game_start_time,
-                    game_duration=game_duration
+                    game_duration=game_duration,
+                    chat_id=state.chat_id
                 )
             except Exception:
-                update.message.reply_text("Error: Internal exception creating job")
+                await update.message.reply_text("Error: Internal exception creating job")
             else:
-                _CREATION_CRON_INFO = None
-                update.message.reply_text(
-                    "Your reservation cron has been created!\n"
+                state.creation_cron_info = None
+                await update.message.reply_text(
+                    "Your reservation cron has been created with id " + str(cron_id) + "!\n"
                     + "Every " + game_day
                     + " at " + game_start_time
                     + " for " + game_duration,
                     reply_markup=ReplyKeyboardRemove()
                 )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return ConversationHandler.END
 
 
-def setup_reservation_cron_cancel(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
-
-    if not _authenticate(update):
+async def setup_reservation_cron_cancel(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Cancelled setup_reservation_cron")
 
-    if _IS_ACTIVATED:
-        _CREATION_CRON_INFO = None
-        update.message.reply_text(
+    if state.is_activated:
+        state.creation_cron_info = None
+        await update.message.reply_text(
             "We have cancelled your new reservation. Nothing was updated.",
             reply_markup=ReplyKeyboardRemove()
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return ConversationHandler.END
 
 
-def remove_reservation_cron(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
+async def remove_reservation_cron(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global _CRON_INTERACTIONS
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: remove_reservation_cron")
 
-    if _IS_ACTIVATED:
-        reply_keyboard = [[str(i) for i in range(_CRON_INTERACTIONS.get_num_active_crons())]]
-        update.message.reply_text(
+    if state.is_activated:
+        crons = _CRON_INTERACTIONS.get_active_crons(chat_id=state.chat_id)
+        reply_keyboard = [[str(cron[0]) for cron in crons]]
+        await update.message.reply_text(
             "Select the id you want to remove:\n"
-            + " ID | GAME DAY | GAME START TIME | GAME DURATION \n"
-            + "\n".join(
-                [" " + str(cron_id) + "       " + str(game_day) + "                  " + str(
-                    game_start_time) + "                  " + str(
-                    game_duration) for cron_id, (game_day, game_start_time, game_duration) in
-                 enumerate(_CRON_INTERACTIONS.get_active_crons())],
-            ),
+            + _format_crons(crons),
             reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.REMOVE_RESERVATION_CRON.value
 
 
-def remove_reservation_cron_complete(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
+async def remove_reservation_cron_complete(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     global _CRON_INTERACTIONS
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: remove_reservation_cron_complete")
 
-    if _IS_ACTIVATED:
+    if state.is_activated:
         try:
             cron_id = update.message.text
             cron_id = int(cron_id)
         except Exception:
             cron_id = None
-        if cron_id is None or not (0 <= cron_id < _CRON_INTERACTIONS.get_num_active_crons()):
-            update.message.reply_text(
-                "Error: Invalid cron id. Value must be between 0 and "
-                + str(_CRON_INTERACTIONS.get_num_active_crons())
+        if cron_id is None or not _CRON_INTERACTIONS.has_cron(cron_id, chat_id=state.chat_id):
+            await update.message.reply_text(
+                "Error: Invalid cron id. Type /show_reservation_crons to see the active ones"
             )
         else:
             try:
                 _CRON_INTERACTIONS.cron_delete(cron_id)
             except Exception:
-                update.message.reply_text(
+                await update.message.reply_text(
                     "ERROR: Internal error creating cron with id " + str(cron_id),
                     reply_markup=ReplyKeyboardRemove()
                 )
             else:
-                update.message.reply_text(
+                await update.message.reply_text(
                     "Cron with id " + str(cron_id) + " has been erased",
                     reply_markup=ReplyKeyboardRemove()
                 )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return ConversationHandler.END
 
 
-def remove_reservation_cron_cancel(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
-
-    if not _authenticate(update):
+async def remove_reservation_cron_cancel(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Cancelled remove_reservation_cron")
 
-    if _IS_ACTIVATED:
-        _CREATION_CRON_INFO = None
-        update.message.reply_text(
+    if state.is_activated:
+        state.creation_cron_info = None
+        await update.message.reply_text(
             "Removing reservation cron process aborted. Nothing was updated.",
             reply_markup=ReplyKeyboardRemove()
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return ConversationHandler.END
+
+
+async def set_reservation_cron_priority(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_priority")
+
+    if state.is_activated:
+        state.selected_cron_id = None
+        crons = _CRON_INTERACTIONS.get_active_crons(chat_id=state.chat_id)
+        reply_keyboard = [[str(cron[0]) for cron in crons]]
+        await update.message.reply_text(
+            "Select the id whose priority you want to set:\n"
+            + _format_crons(crons),
+            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return CmdStatus.SET_RESERVATION_CRON_PRIORITY.value
+
+
+async def set_reservation_cron_priority_value(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_priority_value")
+
+    if state.is_activated:
+        try:
+            cron_id = update.message.text
+            cron_id = int(cron_id)
+        except Exception:
+            cron_id = None
+        if cron_id is None or not _CRON_INTERACTIONS.has_cron(cron_id, chat_id=state.chat_id):
+            await update.message.reply_text(
+                "Error: Invalid cron id. Type /show_reservation_crons to see the active ones",
+                reply_markup=ReplyKeyboardRemove()
+            )
+            return ConversationHandler.END
+
+        state.selected_cron_id = cron_id
+        await update.message.reply_text(
+            "Please provide the new priority. Crons firing at the same time start by highest priority.\n"
+            + "(just an integer number between "
+            + str(_MIN_PRIORITY)
+            + " and "
+            + str(_MAX_PRIORITY)
+            + ")",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return CmdStatus.SET_RESERVATION_CRON_PRIORITY_VALUE.value
+
+
+async def set_reservation_cron_priority_complete(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_priority_complete")
+
+    if state.is_activated:
+        try:
+            new_value = update.message.text
+            new_value = int(new_value)
+        except Exception:
+            new_value = None
+        if state.selected_cron_id is None:
+            await update.message.reply_text("Error: Please select the cron first or restart the whole process")
+        elif new_value is None or not (_MIN_PRIORITY <= new_value <= _MAX_PRIORITY):
+            await update.message.reply_text(
+                "Error: Priority value should be an integer between "
+                + str(_MIN_PRIORITY)
+                + " and "
+                + str(_MAX_PRIORITY)
+            )
+        else:
+            cron_id = state.selected_cron_id
+            state.selected_cron_id = None
+            try:
+                _CRON_INTERACTIONS.cron_set_priority(cron_id, new_value)
+            except Exception:
+                await update.message.reply_text(
+                    "ERROR: Internal error setting priority of cron with id " + str(cron_id)
+                )
+            else:
+                await update.message.reply_text(
+                    "Priority of cron with id " + str(cron_id) + " has been set to " + str(new_value)
+                )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return ConversationHandler.END
+
+
+async def set_reservation_cron_priority_cancel(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Cancelled set_reservation_cron_priority")
+
+    if state.is_activated:
+        state.selected_cron_id = None
+        await update.message.reply_text(
+            "Setting reservation cron priority process aborted. Nothing was updated.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return ConversationHandler.END
 
 
-def setup_balance_alert(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
+async def set_reservation_cron_fallbacks(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
 
-    if not _authenticate(update):
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_fallbacks")
+
+    if state.is_activated:
+        state.selected_cron_id = None
+        crons = _CRON_INTERACTIONS.get_active_crons(chat_id=state.chat_id)
+        reply_keyboard = [[str(cron[0]) for cron in crons]]
+        await update.message.reply_text(
+            "Select the id whose fallbacks you want to set:\n"
+            + _format_crons(crons),
+            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return CmdStatus.SET_RESERVATION_CRON_FALLBACKS.value
+
+
+async def set_reservation_cron_fallbacks_value(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_fallbacks_value")
+
+    if state.is_activated:
+        try:
+            cron_id = update.message.text
+            cron_id = int(cron_id)
+        except Exception:
+            cron_id = None
+        if cron_id is None or not _CRON_INTERACTIONS.has_cron(cron_id, chat_id=state.chat_id):
+            await update.message.reply_text(
+                "Error: Invalid cron id. Type /show_reservation_crons to see the active ones",
+                reply_markup=ReplyKeyboardRemove()
+            )
+            return ConversationHandler.END
+
+        state.selected_cron_id = cron_id
+        await update.message.reply_text(
+            "Please provide the fallbacks in order of preference. They are booked when the slot of the cron is taken."
+            + "\n(comma separated start times and durations, e.g. 13:30 60m, 14:00 90m. Type none to remove them)",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return CmdStatus.SET_RESERVATION_CRON_FALLBACKS_VALUE.value
+
+
+async def set_reservation_cron_fallbacks_complete(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_fallbacks_complete")
+
+    if state.is_activated:
+        try:
+            text = update.message.text
+            fallbacks = [] if text.strip().lower() == "none" else parse_fallbacks(text)
+        except Exception:
+            fallbacks = None
+        if state.selected_cron_id is None:
+            await update.message.reply_text("Error: Please select the cron first or restart the whole process")
+        elif fallbacks is None:
+            await update.message.reply_text(
+                "Error: Fallbacks should look like 13:30 60m, 14:00 90m (start times between 8:00 and 22:30, "
+                + "durations 60m, 90m or 120m)"
+            )
+        else:
+            cron_id = state.selected_cron_id
+            state.selected_cron_id = None
+            try:
+                _CRON_INTERACTIONS.cron_set_fallbacks(cron_id, fallbacks)
+            except Exception:
+                await update.message.reply_text(
+                    "ERROR: Internal error setting fallbacks of cron with id " + str(cron_id)
+                )
+            else:
+                await update.message.reply_text(
+                    "Fallbacks of cron with id " + str(cron_id) + " have been set to "
+                    + (format_fallbacks(fallbacks) or "none")
+                )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return ConversationHandler.END
+
+
+async def set_reservation_cron_fallbacks_cancel(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Cancelled set_reservation_cron_fallbacks")
+
+    if state.is_activated:
+        state.selected_cron_id = None
+        await update.message.reply_text(
+            "Setting reservation cron fallbacks process aborted. Nothing was updated.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return ConversationHandler.END
+
+
+async def set_reservation_cron_watch(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_watch")
+
+    if state.is_activated:
+        state.selected_cron_id = None
+        crons = _CRON_INTERACTIONS.get_active_crons(chat_id=state.chat_id)
+        reply_keyboard = [[str(cron[0]) for cron in crons]]
+        await update.message.reply_text(
+            "Select the id whose cancellation watch you want to set:\n"
+            + _format_crons(crons),
+            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return CmdStatus.SET_RESERVATION_CRON_WATCH.value
+
+
+async def set_reservation_cron_watch_value(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_watch_value")
+
+    if state.is_activated:
+        try:
+            cron_id = update.message.text
+            cron_id = int(cron_id)
+        except Exception:
+            cron_id = None
+        if cron_id is None or not _CRON_INTERACTIONS.has_cron(cron_id, chat_id=state.chat_id):
+            await update.message.reply_text(
+                "Error: Invalid cron id. Type /show_reservation_crons to see the active ones",
+                reply_markup=ReplyKeyboardRemove()
+            )
+            return ConversationHandler.END
+
+        state.selected_cron_id = cron_id
+        reply_keyboard = [list(_WATCH_VALUES)]
+        await update.message.reply_text(
+            "Should the cron keep watching for cancellations when its booking fails? A freed-up slot matching the "
+            + "cron or its fallbacks is booked until the game starts.",
+            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return CmdStatus.SET_RESERVATION_CRON_WATCH_VALUE.value
+
+
+async def set_reservation_cron_watch_complete(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Received new request: set_reservation_cron_watch_complete")
+
+    if state.is_activated:
+        new_value = _WATCH_VALUES.get(update.message.text.strip().lower())
+        if state.selected_cron_id is None:
+            await update.message.reply_text(
+                "Error: Please select the cron first or restart the whole process",
+                reply_markup=ReplyKeyboardRemove()
+            )
+        elif new_value is None:
+            await update.message.reply_text(
+                "Error: Watch value should be one of " + ", ".join(_WATCH_VALUES),
+                reply_markup=ReplyKeyboardRemove()
+            )
+        else:
+            cron_id = state.selected_cron_id
+            state.selected_cron_id = None
+            try:
+                _CRON_INTERACTIONS.cron_set_watch(cron_id, new_value)
+            except Exception:
+                await update.message.reply_text(
+                    "ERROR: Internal error setting watch of cron with id " + str(cron_id),
+                    reply_markup=ReplyKeyboardRemove()
+                )
+            else:
+                await update.message.reply_text(
+                    "Cancellation watch of cron with id " + str(cron_id) + " has been turned "
+                    + _format_watch(new_value),
+                    reply_markup=ReplyKeyboardRemove()
+                )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return ConversationHandler.END
+
+
+async def set_reservation_cron_watch_cancel(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
+    _LOGGER.debug("Cancelled set_reservation_cron_watch")
+
+    if state.is_activated:
+        state.selected_cron_id = None
+        await update.message.reply_text(
+            "Setting reservation cron watch process aborted. Nothing was updated.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    else:
+        await update.message.reply_text(_INACTIVE_MSG)
+
+    return ConversationHandler.END
+
+
+async def setup_balance_alert(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_balance_alert")
 
-    if _IS_ACTIVATED:
-        update.message.reply_text(
+    if state.is_activated:
+        await update.message.reply_text(
             "Please provide the minimum amount at which we should alert you.\n"
             + "(just an integer number between "
             + str(_MIN_ALERT)
@@ -510,117 +916,106 @@ def setup_balance_alert(update: Update, _: CallbackContext) -> int:
             + ")"
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.SETUP_BALANCE_ALERT.value
 
 
-def setup_balance_alert_complete(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _BALANCE_ALERT
-
-    if not _authenticate(update):
+async def setup_balance_alert_complete(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_balance_alert_complete")
 
-    if _IS_ACTIVATED:
+    if state.is_activated:
         try:
             new_value = update.message.text
             new_value = int(new_value)
         except Exception:
             new_value = None
         if new_value is None or not (_MIN_ALERT <= new_value <= _MAX_ALERT):
-            update.message.reply_text(
+            await update.message.reply_text(
                 "Error: Balance alert value should be an integer between "
                 + str(_MIN_ALERT)
                 + " and "
                 + str(_MAX_ALERT)
             )
         else:
-            _BALANCE_ALERT = new_value
-            update.message.reply_text("Balance alerting has been set to " + str(_BALANCE_ALERT))
+            state.balance_alert = new_value
+            await update.message.reply_text("Balance alerting has been set to " + str(state.balance_alert))
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return ConversationHandler.END
 
 
-def setup_balance_alert_cancel(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _CREATION_CRON_INFO
-
-    if not _authenticate(update):
+async def setup_balance_alert_cancel(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Cancelled setup_balance_alert")
 
-    if _IS_ACTIVATED:
-        update.message.reply_text(
+    if state.is_activated:
+        await update.message.reply_text(
             "Setting up balance alert process aborted. Nothing was updated.",
             reply_markup=ReplyKeyboardRemove()
         )
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return ConversationHandler.END
 
 
-def remove_balance_alert(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _BALANCE_ALERT
-
-    if not _authenticate(update):
+async def remove_balance_alert(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: setup_balance_alert")
 
-    if _IS_ACTIVATED:
-        global _BALANCE_ALERT
-        _BALANCE_ALERT = None
-        update.message.reply_text("Balance alerting has been deactivated")
+    if state.is_activated:
+        state.balance_alert = None
+        await update.message.reply_text("Balance alerting has been deactivated")
     else:
-        update.message.reply_text(_INACTIVE_MSG)
+        await update.message.reply_text(_INACTIVE_MSG)
 
     return CmdStatus.REMOVE_BALANCE_ALERT.value
 
 
-def reservation_done(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-    global _BALANCE_ALERT
-
-    if not _authenticate(update):
+async def reservation_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
+    state = _CHAT_STATES.get(update.effective_chat.id)
+
     _LOGGER.debug("Received new request: reservation_done")
 
-    balance = get_balance()
-    if _BALANCE_ALERT is not None and balance < float(_BALANCE_ALERT):
-        update.message.reply_text(
-            "!!!!ALERT!!!! Your remaining balance is under the limits\n"
-            "A new reservation has been done.\n"
-            + "- Current balance: " + str(balance) + "\n"
-            + "Type /show_reservations to see the full list of reservations.\n"
-        )
-    else:
-        update.message.reply_text(
-            "A new reservation has been done.\n"
-            + "- Current balance: " + str(balance) + "\n"
-            + "Type /show_reservations to see the full list of reservations.\n"
-        )
+    account = state.get_account()
+    balance_alert = state.balance_alert
+    invalidate_cache(account)
+    await _reply_in_background(
+        update,
+        context,
+        "reservation_done",
+        lambda: get_balance(account=account),
+        lambda balance: _format_reservation_done(balance, balance_alert)
+    )
 
     return CmdStatus.RESERVATION_DONE.value
 
 
-def reservation_failed(update: Update, _: CallbackContext) -> int:
-    global _IS_ACTIVATED
-
-    if not _authenticate(update):
+async def reservation_failed(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await _authenticate(update):
         return CmdStatus.UNAUTHORISED_USER
 
     _LOGGER.debug("Received new request: reservation_failed")
 
-    update.message.reply_text(
+    await update.message.reply_text(
         "!!!!ALERT!!!! One of your reservation cron jobs failed\n"
         + "This is probably due to insufficient funds or because all fields are occupied"
     )
@@ -628,8 +1023,26 @@ def reservation_failed(update: Update, _: CallbackContext) -> int:
     return CmdStatus.RESERVATION_FAILED.value
 
 
-def unknown(update: Update, context: CallbackContext) -> None:
-    context.bot.send_message(
+async def stats(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    global _CRON_INTERACTIONS
+
+    if not await _authenticate(update):
+        return CmdStatus.UNAUTHORISED_USER
+
+    _LOGGER.debug("Received new request: stats")
+
+    await update.message.reply_text(
+        "Booking latency statistics:\n"
+        + get_tracer().format_summary()
+        + "\nLast job start skews:\n"
+        + _format_skews(_CRON_INTERACTIONS.get_skews()[-_NUM_SKEWS_SHOWN:])
+    )
+
+    return CmdStatus.STATS.value
+
+
+async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text="Sorry, I didn't understand that command."
     )
@@ -638,23 +1051,88 @@ def unknown(update: Update, context: CallbackContext) -> None:
 #
 # Internal helpers
 #
-def _load_users_whitelist() -> list:
-    valid_users = []
-    loaded_users = load_from_secret_file("telegram_users_whitelist.txt")
-    for user in loaded_users.split():
-        strip_user = str(user.strip())
-        valid_users.append(strip_user)
-    return valid_users
+def _format_crons(crons: list) -> str:
+    return " ID | GAME DAY | GAME START TIME | GAME DURATION | PRIORITY | FALLBACKS | WATCH \n" \
+        + "\n".join(
+            [" " + str(cron_id) + "       " + str(game_day) + "                  " + str(
+                game_start_time) + "                  " + str(game_duration) + "                  " + str(
+                priority) + "                  " + (format_fallbacks(fallbacks) or "-") + "                  "
+             + _format_watch(watch) for
+             cron_id, game_day, game_start_time, game_duration, priority, fallbacks, watch in crons])
+
+
+def _format_watch(watch: bool) -> str:
+    return next(name for name, value in _WATCH_VALUES.items() if value == watch)
+
 
+def _format_watches(watches: list) -> str:
+    return "\n".join(
+        ["Watching cancellations for " + watch.game_date.strftime("%d/%m") + " (id " + str(watch.cron_id) + ")"
+         for watch in watches])
 
-def _authenticate(update: Update) -> bool:
+
+def _format_skews(skews: list) -> str:
+    if not skews:
+        return "No job has run yet"
+    return "\n".join(
+        [scheduled_time.strftime("%d/%m %H:%M:%S") + " priority " + str(priority) + ": "
+         + "{:.3f}s".format(skew) for _, priority, scheduled_time, skew in skews])
+
+
+def _format_reservations(reservations: list) -> str:
+    return "Reservations:\n" \
+        + " GAME DAY | GAME START TIME | GAME END TIME | LOCATION \n" \
+        + "\n".join(
+            [r.day + " " + r.start_time + " " + r.end_time + " " + r.court for r in reservations])
+
+
+def _format_reservation_done(balance: float, balance_alert: Optional[int]) -> str:
+    if balance_alert is not None and balance is not None and balance < float(balance_alert):
+        return "!!!!ALERT!!!! Your remaining balance is under the limits\n" \
+            + "A new reservation has been done.\n" \
+            + "- Current balance: " + str(balance) + "\n" \
+            + "Type /show_reservations to see the full list of reservations.\n"
+    return "A new reservation has been done.\n" \
+        + "- Current balance: " + str(balance) + "\n" \
+        + "Type /show_reservations to see the full list of reservations.\n"
+
+
+async def _reply_in_background(update: Update,
+                               context: ContextTypes.DEFAULT_TYPE,
+                               command: str,
+                               operation: Callable,
+                               format_result: Callable) -> None:
+    # Answers right away and edits the answer once the (slow, browser-bound) operation finishes on the background
+    # work executor, so that neither the event loop nor the updates of other chats wait for it
+    message = await update.message.reply_text(_WORKING_MSG)
+
+    future = _BACKGROUND_WORK.submit((update.effective_chat.id, command), operation)
+    if future is None:
+        await message.edit_text(_BUSY_MSG)
+        return
+
+    async def reply() -> None:
+        try:
+            text = format_result(await asyncio.wrap_future(future))
+        except Exception as e:
+            _LOGGER.error("ERROR: Background request %s failed", command)
+            _LOGGER.error(e)
+            text = "Error: Internal exception processing " + str(command)
+        try:
+            await message.edit_text(text)
+        except Exception as e:
+            _LOGGER.error("ERROR: Cannot send result of %s", command)
+            _LOGGER.error(e)
+
+    context.application.create_task(reply(), update=update)
+
+
+async def _authenticate(update: Update) -> bool:
     chat_id = str(update.effective_chat.id)
     _LOGGER.debug("Authenticating message from chat id " + chat_id)
 
-    users_whitelist = _load_users_whitelist()
-    _LOGGER.debug("List: " + str(users_whitelist))
-    if chat_id not in users_whitelist:
-        update.message.reply_text(
+    if not _USERS_WHITELIST.is_authorised(chat_id):
+        await update.message.reply_text(
             "Your user is not authorised.\n"
             + "Please contact the administrator.\n"
         )
@@ -663,100 +1141,177 @@ def _authenticate(update: Update) -> bool:
     return True
 
 
-def _add_handlers(dispatcher: Dispatcher) -> None:
+def _reload_secrets() -> None:
+    get_secret_store().request_reload()
+    _USERS_WHITELIST.request_reload()
+
+
+def _add_handlers(application: Application) -> None:
     help_handler = CommandHandler("help", show_help)
-    dispatcher.add_handler(help_handler)
+    application.add_handler(help_handler)
     version_handler = CommandHandler("version", version)
-    dispatcher.add_handler(version_handler)
+    application.add_handler(version_handler)
     start_handler = CommandHandler("start", start)
-    dispatcher.add_handler(start_handler)
+    application.add_handler(start_handler)
     stop_handler = CommandHandler("stop", stop)
-    dispatcher.add_handler(stop_handler)
+    application.add_handler(stop_handler)
     reset_handler = CommandHandler("reset", reset)
-    dispatcher.add_handler(reset_handler)
+    application.add_handler(reset_handler)
 
     show_reservation_crons_handler = CommandHandler("show_reservation_crons", show_reservation_crons)
-    dispatcher.add_handler(show_reservation_crons_handler)
+    application.add_handler(show_reservation_crons_handler)
     show_reservations_handler = CommandHandler("show_reservations", show_reservations)
-    dispatcher.add_handler(show_reservations_handler)
+    application.add_handler(show_reservations_handler)
     show_balance_handler = CommandHandler("show_balance", show_balance)
-    dispatcher.add_handler(show_balance_handler)
+    application.add_handler(show_balance_handler)
     show_balance_alert_handler = CommandHandler("show_balance_alert", show_balance_alert)
-    dispatcher.add_handler(show_balance_alert_handler)
+    application.add_handler(show_balance_alert_handler)
 
     setup_reservation_cron_handler = ConversationHandler(
         entry_points=[CommandHandler("setup_reservation_cron", setup_reservation_cron)],
         states={
             CmdStatus.SETUP_RESERVATION_CRON.value: [
-                MessageHandler(Filters.text & ~Filters.command, setup_reservation_cron_start_time)],
+                MessageHandler(filters.TEXT & ~filters.COMMAND, setup_reservation_cron_start_time)],
             CmdStatus.SETUP_RESERVATION_CRON_START_TIME.value: [
-                MessageHandler(Filters.text & ~Filters.command, setup_reservation_cron_game_time)],
+                MessageHandler(filters.TEXT & ~filters.COMMAND, setup_reservation_cron_game_time)],
             CmdStatus.SETUP_RESERVATION_CRON_GAME_TIME.value: [
-                MessageHandler(Filters.text & ~Filters.command, setup_reservation_cron_complete)],
+                MessageHandler(filters.TEXT & ~filters.COMMAND, setup_reservation_cron_complete)],
         },
         fallbacks=[CommandHandler("cancel", setup_reservation_cron_cancel)],
     )
-    dispatcher.add_handler(setup_reservation_cron_handler)
+    application.add_handler(setup_reservation_cron_handler)
 
     remove_reservation_cron_handler = ConversationHandler(
         entry_points=[CommandHandler("remove_reservation_cron", remove_reservation_cron)],
         states={
             CmdStatus.REMOVE_RESERVATION_CRON.value: [
-                MessageHandler(Filters.text & ~Filters.command, remove_reservation_cron_complete)],
+                MessageHandler(filters.TEXT & ~filters.COMMAND, remove_reservation_cron_complete)],
         },
         fallbacks=[CommandHandler("cancel", remove_reservation_cron_cancel)],
     )
-    dispatcher.add_handler(remove_reservation_cron_handler)
+    application.add_handler(remove_reservation_cron_handler)
+
+    set_reservation_cron_priority_handler = ConversationHandler(
+        entry_points=[CommandHandler("set_reservation_cron_priority", set_reservation_cron_priority)],
+        states={
+            CmdStatus.SET_RESERVATION_CRON_PRIORITY.value: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_reservation_cron_priority_value)],
+            CmdStatus.SET_RESERVATION_CRON_PRIORITY_VALUE.value: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_reservation_cron_priority_complete)],
+        },
+        fallbacks=[CommandHandler("cancel", set_reservation_cron_priority_cancel)],
+    )
+    application.add_handler(set_reservation_cron_priority_handler)
+
+    set_reservation_cron_fallbacks_handler = ConversationHandler(
+        entry_points=[CommandHandler("set_reservation_cron_fallbacks", set_reservation_cron_fallbacks)],
+        states={
+            CmdStatus.SET_RESERVATION_CRON_FALLBACKS.value: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_reservation_cron_fallbacks_value)],
+            CmdStatus.SET_RESERVATION_CRON_FALLBACKS_VALUE.value: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_reservation_cron_fallbacks_complete)],
+        },
+        fallbacks=[CommandHandler("cancel", set_reservation_cron_fallbacks_cancel)],
+    )
+    application.add_handler(set_reservation_cron_fallbacks_handler)
+
+    set_reservation_cron_watch_handler = ConversationHandler(
+        entry_points=[CommandHandler("set_reservation_cron_watch", set_reservation_cron_watch)],
+        states={
+            CmdStatus.SET_RESERVATION_CRON_WATCH.value: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_reservation_cron_watch_value)],
+            CmdStatus.SET_RESERVATION_CRON_WATCH_VALUE.value: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, set_reservation_cron_watch_complete)],
+        },
+        fallbacks=[CommandHandler("cancel", set_reservation_cron_watch_cancel)],
+    )
+    application.add_handler(set_reservation_cron_watch_handler)
 
     setup_balance_alert_handler = ConversationHandler(
         entry_points=[CommandHandler("setup_balance_alert", setup_balance_alert)],
         states={
             CmdStatus.SETUP_BALANCE_ALERT.value: [
-                MessageHandler(Filters.text & ~Filters.command, setup_balance_alert_complete)],
+                MessageHandler(filters.TEXT & ~filters.COMMAND, setup_balance_alert_complete)],
         },
         fallbacks=[CommandHandler("cancel", setup_balance_alert_cancel)],
     )
-    dispatcher.add_handler(setup_balance_alert_handler)
+    application.add_handler(setup_balance_alert_handler)
 
     remove_balance_alert_handler = CommandHandler("remove_balance_alert", remove_balance_alert)
-    dispatcher.add_handler(remove_balance_alert_handler)
+    application.add_handler(remove_balance_alert_handler)
 
+    stats_handler = CommandHandler("stats", stats)
+    application.add_handler(stats_handler)
 
-def _add_handlers_for_cron_commands(dispatcher: Dispatcher) -> None:
+
+def _add_handlers_for_cron_commands(application: Application) -> None:
     reservation_done_handler = CommandHandler("reservation_done", reservation_done)
-    dispatcher.add_handler(reservation_done_handler)
+    application.add_handler(reservation_done_handler)
     reservation_failed_handler = CommandHandler("reservation_failed", reservation_failed)
-    dispatcher.add_handler(reservation_failed_handler)
+    application.add_handler(reservation_failed_handler)
 
 
-def _add_unknown_command_handler(dispatcher: Dispatcher) -> None:
-    unknown_handler = MessageHandler(Filters.command, unknown)
-    dispatcher.add_handler(unknown_handler)
+def _add_unknown_command_handler(application: Application) -> None:
+    unknown_handler = MessageHandler(filters.COMMAND, unknown)
+    application.add_handler(unknown_handler)
 
 
 #
 # MAIN
 #
+async def _post_init(application: Application) -> None:
+    # Runs on the event loop of the application before it starts polling
+    loop = asyncio.get_running_loop()
+
+    def send_message(chat_id: int, text: str) -> None:
+        # Called from the cron job threads, the message is sent by the event loop
+        asyncio.run_coroutine_threadsafe(application.bot.send_message(chat_id=chat_id, text=text), loop).result()
+
+    # Push the results of the cron jobs to the chats owning them
+    booking_notifier = BookingNotifier(send_message)
+    booking_notifier.start()
+    application.bot_data["booking_notifier"] = booking_notifier
+
+    # Start the cron jobs scheduler. Its jobs drive blocking browsers, so they keep running on their own workers
+    await loop.run_in_executor(None, _CRON_INTERACTIONS.start)
+
+
+async def _post_stop(application: Application) -> None:
+    # Runs while the bot can still send messages, so that the notifier flushes its last results
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _CRON_INTERACTIONS.stop)
+    await loop.run_in_executor(None, application.bot_data["booking_notifier"].stop)
+
+
+async def _post_shutdown(_: Application) -> None:
+    _BACKGROUND_WORK.shutdown()
+
+
 def main() -> None:
     token = load_from_secret_file("telegram_bot_token.txt")
-    updater = Updater(token)
+    # Updates are handled one at a time, which keeps the conversations consistent. Handlers never block the event loop:
+    # the browser-bound work runs on the background work executor
+    application = ApplicationBuilder() \
+        .token(token) \
+        .post_init(_post_init) \
+        .post_stop(_post_stop) \
+        .post_shutdown(_post_shutdown) \
+        .build()
 
     # Add commands handlers
-    _add_handlers(updater.dispatcher)
+    _add_handlers(application)
 
     # Add cron commands handlers
-    _add_handlers_for_cron_commands(updater.dispatcher)
+    _add_handlers_for_cron_commands(application)
 
     # Add unknown command handler
-    _add_unknown_command_handler(updater.dispatcher)
+    _add_unknown_command_handler(application)
 
-    # Start the Bot
-    updater.start_polling()
+    # Reload the secrets and the users whitelist on SIGHUP
+    signal.signal(signal.SIGHUP, lambda signum, frame: _reload_secrets())
 
-    # Run the bot until you press Ctrl-C or the process receives SIGINT,
-    # SIGTERM or SIGABRT. This should be used most of the time, since
-    # start_polling() is non-blocking and will stop the bot gracefully.
-    updater.idle()
+    # Run the bot until you press Ctrl-C or the process receives SIGINT, SIGTERM or SIGABRT
+    application.run_polling()
 
 
 #
@@ -0,0 +1,94 @@
+#!/usr/bin/python
+
+from html.parser import HTMLParser
+
+#
+# STATIC ATTRIBUTES
+#
+_NUM_CELLS = 4
+_COURT_SUFFIXES = ("Videopista", "- UnoPadel")
+
+
+class Reservation:
+    # One row of the reservations table
+    __slots__ = ("day", "start_time", "end_time", "court")
+
+    def __init__(self, day: str, start_time: str, end_time: str, court: str):
+        self.day = day
+        self.start_time = start_time
+        self.end_time = end_time
+        self.court = court
+
+    def __iter__(self):
+        # Unpacks as (day, start_time, end_time, court)
+        return iter((self.day, self.start_time, self.end_time, self.court))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Reservation):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return "Reservation(day={!r}, start_time={!r}, end_time={!r}, court={!r})".format(*self)
+
+
+class _ReservationsParser(HTMLParser):
+    # Streams the GridView rows keeping only the text of the current row. Header rows only have <th> cells and are
+    # skipped. Cells may omit their closing tag
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.reservations = []
+
+        self._cells = None
+        self._text = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "tr":
+            self._close_row()
+            self._cells = []
+        elif tag == "td" and self._cells is not None:
+            self._close_cell()
+            self._text = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "td":
+            self._close_cell()
+        elif tag in ("tr", "table"):
+            self._close_row()
+
+    def handle_data(self, data: str) -> None:
+        if self._text is not None:
+            self._text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._close_row()
+
+    def _close_cell(self) -> None:
+        if self._text is not None:
+            self._cells.append("".join(self._text))
+            self._text = None
+
+    def _close_row(self) -> None:
+        self._close_cell()
+        cells = self._cells
+        self._cells = None
+        if cells is None or len(cells) < _NUM_CELLS:
+            return
+
+        start_time, _, end_time = cells[2].partition("-")
+        court = cells[3]
+        for suffix in _COURT_SUFFIXES:
+            court = court.replace(suffix, "")
+        self.reservations.append(Reservation(cells[1].strip(), start_time.strip(), end_time.strip(), court.strip()))
+
+
+def parse_reservations(reservations_html_table: str) -> list:  # Reservation
+    parser = _ReservationsParser()
+    parser.feed(reservations_html_table)
+    parser.close()
+    return parser.reservations
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+class UsersWhitelist:
+    # Authorised chat ids are loaded once into a frozenset. The file is only read again when its inode, size or
+    # modification time change (checked at most every check_interval seconds) or when a reload is requested
+    _DEFAULT_CHECK_INTERVAL = 5.0
+
+    def __init__(self, file_path: str, check_interval: Optional[float] = None):
+        self._file_path = file_path
+        self._check_interval = check_interval if check_interval is not None \
+            else UsersWhitelist._DEFAULT_CHECK_INTERVAL
+
+        self._lock = threading.Lock()
+        self._users = frozenset()
+        self._signature = None
+        self._last_check = None
+        self._reload_requested = True
+
+    def is_authorised(self, chat_id: str) -> bool:
+        self._refresh()
+        return chat_id in self._users
+
+    def request_reload(self) -> None:
+        # Safe to call from a signal handler
+        self._reload_requested = True
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if not self._reload_requested and self._last_check is not None \
+                and now - self._last_check < self._check_interval:
+            return
+
+        with self._lock:
+            self._last_check = now
+            try:
+                stat = os.stat(self._file_path)
+            except OSError as e:
+                _LOGGER.error("ERROR: Cannot access users whitelist")
+                _LOGGER.error(e)
+                return
+
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if not self._reload_requested and signature == self._signature:
+                return
+
+            self._reload_requested = False
+            with open(self._file_path, mode='r') as f:
+                self._users = frozenset(user.strip() for user in f.read().split())
+            self._signature = signature
+            _LOGGER.info("Users whitelist loaded: %s users", len(self._users))
@@ -1,11 +1,16 @@
 #!/usr/bin/python
 
 import logging
+from typing import Optional
 
-from bs4 import BeautifulSoup
 from selenium import webdriver
 
+from bots.telegram.reservations_table import parse_reservations
 from utils.browser_session_manager import BrowserSessionManager
+from utils.http_session_manager import HttpSessionManager
+from utils.session_registry import get_session_registry
+from utils.tracing import get_tracer
+from utils.ttl_cache import TTLCache
 
 #
 # Enable logging
@@ -19,124 +24,164 @@ logging.basicConfig(
 # STATIC ATTRIBUTES
 #
 _LOGGER = logging.getLogger(__name__)
+_TRACER = get_tracer()
+_RESERVATIONS_TABLE_ID = "ctl00_ctl00_ContentPlaceHolderContenido_ContentPlaceHolderContenido_GridView1"
+_BALANCE_CELL_ID = \
+    "ctl00_ctl00_ContentPlaceHolderContenido_ContentPlaceHolderContenido_GridViewListado_ctl02_LabelSaldoPosterior"
+
+BACKEND_HTTP = "http"
+BACKEND_SELENIUM = "selenium"
+_DEFAULT_BACKEND = BACKEND_HTTP
+
+_BALANCE_TTL = 60.0
+_BALANCE_STALE_TTL = 600.0
+_RESERVATIONS_TTL = 300.0
+_RESERVATIONS_STALE_TTL = 3600.0
+_BALANCE_CACHE = TTLCache(ttl=_BALANCE_TTL, stale_ttl=_BALANCE_STALE_TTL)
+_RESERVATIONS_CACHE = TTLCache(ttl=_RESERVATIONS_TTL, stale_ttl=_RESERVATIONS_STALE_TTL)
 
 
 #
 # HELPER METHODS
 #
 
-def _navigate_intranet(browser_session_manager: BrowserSessionManager) -> None:
+def _navigate_intranet(browser_session_manager) -> None:  # BrowserSessionManager or HttpSessionManager
     browser_session_manager.navigate(
         "ctl00_ctl00_LinkButtonAcessoIntranet"
     )
 
 
-def _navigate_balance_control(browser_session_manager: BrowserSessionManager) -> None:
+def _navigate_balance_control(browser_session_manager) -> None:  # BrowserSessionManager or HttpSessionManager
     browser_session_manager.navigate(
         "ctl00_ctl00_ContentPlaceHolderContenido_WUCMenuLateralIzquierdaIntranet_LabelMenuControlSaldo"
     )
 
 
-def _navigate_reservations(browser_session_manager: BrowserSessionManager) -> None:
+def _navigate_reservations(browser_session_manager) -> None:  # BrowserSessionManager or HttpSessionManager
     browser_session_manager.navigate(
         "ctl00_ctl00_ContentPlaceHolderContenido_WUCMenuLateralIzquierdaIntranet_LabelMenuReservas"
     )
 
 
-def _get_reservations(browser: webdriver.Chrome) -> list:  # (day, start_time, end_time, field)
-    cell = browser.find_element_by_id(
-        "ctl00_ctl00_ContentPlaceHolderContenido_ContentPlaceHolderContenido_GridView1"
-    )
-    reservations_html_table = cell.get_attribute("innerHTML")
-    soup = BeautifulSoup(reservations_html_table)
-    reservations = []
-    for row in soup.find_all("tr")[1:]:
-        td_entries = row.find_all("td")
-        game_day = _format_game_day(td_entries[1].renderContents())
-        game_start_time, game_end_time = _format_times_values(td_entries[2].renderContents())
-        game_field = _format_field_value(td_entries[3].renderContents())
-        reservations.append((game_day, game_start_time, game_end_time, game_field))
+def _get_reservations(browser: webdriver.Chrome) -> list:  # Reservation
+    cell = browser.find_element_by_id(_RESERVATIONS_TABLE_ID)
+    return parse_reservations(cell.get_attribute("innerHTML"))
 
-    return reservations
 
+def _get_balance(browser: webdriver.Chrome) -> float:
+    cell = browser.find_element_by_id(_BALANCE_CELL_ID)
+    return _parse_balance(cell.get_attribute("innerHTML"))
 
-def _format_game_day(raw_input: bytes) -> str:
-    game_day = str(raw_input)
-    game_day = game_day[2:-1]  # erase b' and '
-    game_day = game_day.strip()
-    return game_day
 
+def _parse_balance(balance: str) -> float:
+    balance = balance.strip().replace(",", ".")
+    balance = float(balance)
 
-def _format_times_values(raw_input: bytes) -> (str, str):
-    times = str(raw_input)
-    times = times[2:-1]  # erase b' and '
-    times = times.strip()
-    game_start_time, game_end_time = times.split("-")
-    game_start_time = str(game_start_time).strip()
-    game_end_time = str(game_end_time).strip()
-    return game_start_time, game_end_time
+    return balance
 
 
-def _format_field_value(raw_input: bytes) -> str:
-    field = str(raw_input)
-    field = field[2:-1]  # erase b' and '
-    field = field.replace("Videopista", "")
-    field = field.replace("- UnoPadel", "")
-    field = field.strip()
-    return field
+def _get_all_reservations_selenium(browser_session_manager: BrowserSessionManager) -> list:
+    with _TRACER.span("navigate_intranet", backend=BACKEND_SELENIUM):
+        _navigate_intranet(browser_session_manager)
+    with _TRACER.span("navigate_reservations", backend=BACKEND_SELENIUM):
+        _navigate_reservations(browser_session_manager)
+    with _TRACER.span("parse_reservations", backend=BACKEND_SELENIUM):
+        return _get_reservations(browser_session_manager.get_browser())
 
 
-def _get_balance(browser: webdriver.Chrome) -> float:
-    cell = browser.find_element_by_id(
-        "ctl00_ctl00_ContentPlaceHolderContenido_ContentPlaceHolderContenido_GridViewListado_ctl02_LabelSaldoPosterior"
-    )
-    balance = cell.get_attribute("innerHTML")
-    balance = balance.strip().replace(",", ".")
-    balance = float(balance)
+def _get_all_reservations_http(http_session_manager: HttpSessionManager) -> list:
+    with _TRACER.span("navigate_intranet", backend=BACKEND_HTTP):
+        _navigate_intranet(http_session_manager)
+    with _TRACER.span("navigate_reservations", backend=BACKEND_HTTP):
+        _navigate_reservations(http_session_manager)
+    with _TRACER.span("parse_reservations", backend=BACKEND_HTTP):
+        return parse_reservations(http_session_manager.get_element_html(_RESERVATIONS_TABLE_ID))
 
-    return balance
+
+def _get_balance_selenium(browser_session_manager: BrowserSessionManager) -> float:
+    with _TRACER.span("navigate_intranet", backend=BACKEND_SELENIUM):
+        _navigate_intranet(browser_session_manager)
+    with _TRACER.span("navigate_balance", backend=BACKEND_SELENIUM):
+        _navigate_balance_control(browser_session_manager)
+    with _TRACER.span("parse_balance", backend=BACKEND_SELENIUM):
+        return _get_balance(browser_session_manager.get_browser())
+
+
+def _get_balance_http(http_session_manager: HttpSessionManager) -> float:
+    with _TRACER.span("navigate_intranet", backend=BACKEND_HTTP):
+        _navigate_intranet(http_session_manager)
+    with _TRACER.span("navigate_balance", backend=BACKEND_HTTP):
+        _navigate_balance_control(http_session_manager)
+    with _TRACER.span("parse_balance", backend=BACKEND_HTTP):
+        return _parse_balance(http_session_manager.get_element_html(_BALANCE_CELL_ID))
+
+
+def _run_with_backend(backend: Optional[str], account: Optional[str], http_operation, selenium_operation):
+    # Operations run on the shared logged-in sessions of the account. Without an explicit backend, a live browser
+    # session (e.g. the one handed over by the last booking) is preferred over opening a new HTTP one
+    http_sessions = get_session_registry(HttpSessionManager, account)
+    browser_sessions = get_session_registry(BrowserSessionManager, account)
+    if backend is None:
+        backend = BACKEND_SELENIUM if browser_sessions.has_session() and not http_sessions.has_session() \
+            else _DEFAULT_BACKEND
+
+    if backend == BACKEND_HTTP:
+        try:
+            return http_sessions.run(http_operation)
+        except Exception as e:
+            _LOGGER.warning("WARN: HTTP backend failed, falling back to Selenium")
+            _LOGGER.warning(e)
+    elif backend != BACKEND_SELENIUM:
+        raise Exception("ERROR: Invalid backend " + str(backend))
+
+    return browser_sessions.run(selenium_operation)
 
 
 #
 # PUBLIC METHODS
 #
-def get_all_reservations() -> list:  # (day, start_time, end_time, field)
+def get_all_reservations(backend: Optional[str] = None,
+                         use_cache: Optional[bool] = True,
+                         account: Optional[str] = None) -> list:  # Reservation
     _LOGGER.debug("Retrieving reservations")
 
-    browser_session_manager = BrowserSessionManager()
+    def load() -> list:
+        return _run_with_backend(backend, account, _get_all_reservations_http, _get_all_reservations_selenium)
+
     reservations = []
     try:
-        browser_session_manager.login()
-
-        _navigate_intranet(browser_session_manager)
-        _navigate_reservations(browser_session_manager)
-        reservations = _get_reservations(browser_session_manager.get_browser())
+        reservations = _RESERVATIONS_CACHE.get((account, backend), load) if use_cache else load()
     except Exception as e:
         _LOGGER.error("ERROR: Cannot retrieve reservations")
         _LOGGER.error(e)
     finally:
-        browser_session_manager.quit()
         _LOGGER.debug("Retrieving reservation DONE")
 
     return reservations
 
 
-def get_balance() -> float:
+def get_balance(backend: Optional[str] = None,
+                use_cache: Optional[bool] = True,
+                account: Optional[str] = None) -> float:
     _LOGGER.debug("Retrieving balance")
 
-    browser_session_manager = BrowserSessionManager()
+    def load() -> float:
+        return _run_with_backend(backend, account, _get_balance_http, _get_balance_selenium)
+
     balance = None
     try:
-        browser_session_manager.login()
-
-        _navigate_intranet(browser_session_manager)
-        _navigate_balance_control(browser_session_manager)
-        balance = _get_balance(browser_session_manager.get_browser())
+        balance = _BALANCE_CACHE.get((account, backend), load) if use_cache else load()
     except Exception as e:
         _LOGGER.error("ERROR: Cannot retrieve reservations")
         _LOGGER.error(e)
     finally:
-        browser_session_manager.quit()
         _LOGGER.debug("Retrieving balance DONE")
 
     return balance
+
+
+def invalidate_cache(account: Optional[str] = None) -> None:
+    # Must be called whenever the account changes (e.g. after a reservation)
+    for backend in (None, BACKEND_HTTP, BACKEND_SELENIUM):
+        _BALANCE_CACHE.invalidate((account, backend))
+        _RESERVATIONS_CACHE.invalidate((account, backend))
@@ -0,0 +1,169 @@
+# !/usr/bin/python
+
+import datetime
+import threading
+from html.parser import HTMLParser
+from typing import Optional
+
+from selenium import webdriver
+
+#
+# STATIC ATTRIBUTES
+#
+_GRID_ID = "CuerpoTabla"
+# Every court has one child per half-hour slot after its label: nth-child(2) is :00 and nth-child(3) is :30
+_FIRST_SLOT_POSITION = 2
+_SLOTS_PER_HOUR = 2
+_GRID_CACHE_SIZE = 16
+_GRID_CACHE = {}  # date -> AvailabilityGrid
+_GRID_CACHE_LOCK = threading.Lock()
+
+
+def get_slot_index(hour_index: int, minute_index: int) -> int:
+    # hour_index and minute_index follow the nth-child positions of the grid (both 1-based)
+    return (hour_index - 1) * _SLOTS_PER_HOUR + minute_index - _FIRST_SLOT_POSITION
+
+
+def get_slot_position(slot: int) -> (int, int):  # (hour_index, minute_index)
+    hour, half = divmod(slot, _SLOTS_PER_HOUR)
+    return hour + 1, half + _FIRST_SLOT_POSITION
+
+
+class _GridParser(HTMLParser):
+    # Streams the #CuerpoTabla markup (one <g> per hour, one <g> per court inside it) into one bitmask per court
+    # where bit i is set when half-hour slot i is free (drawn as a <rect>)
+
+    def __init__(self):
+        super().__init__()
+        self.courts = []
+        self.num_slots = 0
+
+        self._depth = 0
+        self._hour = 0
+        self._court = 0
+        self._position = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self._depth += 1
+        if self._depth == 2:
+            self._hour += 1
+            self._court = 0
+            self.num_slots = self._hour * _SLOTS_PER_HOUR
+        elif self._depth == 3:
+            self._court += 1
+            self._position = 0
+            if len(self.courts) < self._court:
+                self.courts.append(0)
+        elif self._depth == 4:
+            self._position += 1
+            half = self._position - _FIRST_SLOT_POSITION
+            if tag == "rect" and 0 <= half < _SLOTS_PER_HOUR:
+                self.courts[self._court - 1] |= 1 << ((self._hour - 1) * _SLOTS_PER_HOUR + half)
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._depth -= 1
+
+
+class AvailabilityGrid:
+    # Free half-hour slots of every court for one day, stored as one integer bitmask per court so that checking a
+    # whole duration is a single mask operation
+
+    def __init__(self, courts: list, num_slots: int):
+        self._courts = courts
+        self._num_slots = num_slots
+
+    def get_num_courts(self) -> int:
+        return len(self._courts)
+
+    def get_num_slots(self) -> int:
+        return self._num_slots
+
+    def get_free_starts(self, court: int, num_slots: int) -> int:
+        # Bitmask of the slots where num_slots contiguous free slots start
+        if not 0 < court <= len(self._courts):
+            return 0
+        free = self._courts[court - 1]
+        starts = free
+        for shift in range(1, num_slots):
+            starts &= free >> shift
+        return starts
+
+    def is_free(self, court: int, slot: int, num_slots: int) -> bool:
+        return slot >= 0 and (self.get_free_starts(court, num_slots) >> slot) & 1 == 1
+
+    def has_freed_slots(self, previous: "AvailabilityGrid") -> bool:
+        # Whether any slot is free now but was not in previous. Slots being taken never make a booking possible
+        for court, free in enumerate(self._courts):
+            previous_free = previous._courts[court] if court < len(previous._courts) else 0
+            if free & ~previous_free:
+                return True
+        return False
+
+    def find_free_courts(self,
+                         slot: int,
+                         num_slots: int,
+                         court_priority: list,
+                         max_courts: Optional[int] = None) -> list:
+        free_courts = []
+        for court in court_priority:
+            if self.is_free(court, slot, num_slots):
+                free_courts.append(court)
+                if max_courts is not None and len(free_courts) >= max_courts:
+                    break
+        return free_courts
+
+    def suggest_alternatives(self,
+                             slot: int,
+                             num_slots: int,
+                             court_priority: list,
+                             max_suggestions: Optional[int] = 3) -> list:  # (slot, court)
+        # Closest start slots to the requested one (earlier first on ties), best court first for every start
+        starts = [self.get_free_starts(court, num_slots) for court in court_priority]
+        any_start = 0
+        for court_starts in starts:
+            any_start |= court_starts
+
+        candidates = [s for s in range(self._num_slots) if (any_start >> s) & 1 and s != slot]
+        candidates.sort(key=lambda s: (abs(s - slot), s))
+        suggestions = []
+        for candidate in candidates[:max_suggestions]:
+            position = next(i for i, court_starts in enumerate(starts) if (court_starts >> candidate) & 1)
+            suggestions.append((candidate, court_priority[position]))
+        return suggestions
+
+
+def parse_grid(grid_html: str) -> AvailabilityGrid:
+    # grid_html is the outerHTML of #CuerpoTabla
+    parser = _GridParser()
+    parser.feed(grid_html)
+    parser.close()
+    return AvailabilityGrid(parser.courts, parser.num_slots)
+
+
+def read_availability_grid(browser: webdriver.Chrome, date: Optional[datetime.date] = None) -> AvailabilityGrid:
+    # Single DOM read for the whole grid. The result is cached for the given date
+    grid = parse_grid(browser.find_element_by_id(_GRID_ID).get_attribute("outerHTML"))
+    if date is not None:
+        with _GRID_CACHE_LOCK:
+            _GRID_CACHE.pop(date, None)
+            _GRID_CACHE[date] = grid
+            while len(_GRID_CACHE) > _GRID_CACHE_SIZE:
+                del _GRID_CACHE[next(iter(_GRID_CACHE))]
+    return grid
+
+
+def get_cached_grid(date: datetime.date) -> Optional[AvailabilityGrid]:
+    with _GRID_CACHE_LOCK:
+        return _GRID_CACHE.get(date)
+
+
+def get_slot_css_selector(hour_index: int, court: int, minute_index: int) -> str:
+    return "#CuerpoTabla>g:nth-child({})>g:nth-child({})>rect:nth-child({})".format(
+        hour_index,
+        court,
+        minute_index
+    )
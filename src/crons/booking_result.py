@@ -0,0 +1,55 @@
+# !/usr/bin/python
+
+from typing import Optional
+
+#
+# STATIC ATTRIBUTES
+#
+BOOKING_RESULT_TOPIC = "booking_result"
+
+
+class BookingResult:
+    # Outcome of one booking, published on BOOKING_RESULT_TOPIC. court is None when the booking failed, in which case
+    # error tells why. booked_start_time and booked_duration differ from the requested ones when a fallback was booked.
+    # step_timings is a list of (step, seconds) in the order the steps finished
+    __slots__ = (
+        "game_day", "game_date", "game_start_time", "game_duration", "account", "court", "booked_start_time",
+        "booked_duration", "attempts", "error", "step_timings", "duration", "cron_id", "chat_id"
+    )
+
+    def __init__(self,
+                 game_day: str,
+                 game_start_time: str,
+                 game_duration: str,
+                 account: Optional[str] = None):
+        self.game_day = game_day
+        self.game_date = None
+        self.game_start_time = game_start_time
+        self.game_duration = game_duration
+        self.account = account
+        self.court = None
+        self.booked_start_time = None
+        self.booked_duration = None
+        self.attempts = 0
+        self.error = None
+        self.step_timings = []
+        self.duration = None
+        # Set by the cron that ran the booking, to route the result to its owner
+        self.cron_id = None
+        self.chat_id = None
+
+    def is_success(self) -> bool:
+        return self.court is not None and self.error is None
+
+    def is_fallback(self) -> bool:
+        return self.is_success() and self.booked_start_time is not None and \
+            (self.booked_start_time, self.booked_duration) != (self.game_start_time, self.game_duration)
+
+    def __repr__(self) -> str:
+        return "BookingResult(game_day={}, game_start_time={}, game_duration={}, court={}, error={})".format(
+            self.game_day,
+            self.game_start_time,
+            self.game_duration,
+            self.court,
+            self.error
+        )
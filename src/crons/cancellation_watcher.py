@@ -0,0 +1,273 @@
+# !/usr/bin/python
+
+import datetime
+import logging
+import threading
+import time
+from typing import Callable
+from typing import Optional
+
+from crons.booking_result import BOOKING_RESULT_TOPIC
+from crons.booking_result import BookingResult
+from crons.reservation import book_shown_game_day
+from crons.reservation import find_free_option
+from crons.reservation import read_game_day_grid
+from utils.browser_session_manager import BrowserSessionManager
+from utils.event_bus import EventBus
+from utils.event_bus import get_event_bus
+from utils.session_registry import get_session_registry
+from utils.tracing import get_tracer
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+_TRACER = get_tracer()
+_MAX_SLEEP_TIME = 60.0
+
+
+def _run_in_shared_session(account: Optional[str], operation: Callable):
+    return get_session_registry(BrowserSessionManager, account).run(operation)
+
+
+class Watch:
+    # One cron waiting for any of its options, (game_start_time, game_duration) by preference, to free up on game_date
+    __slots__ = ("cron_id", "chat_id", "account", "game_day", "game_date", "options", "deadline")
+
+    def __init__(self,
+                 cron_id: int,
+                 chat_id: Optional[int],
+                 account: Optional[str],
+                 game_day: str,
+                 game_date: datetime.date,
+                 options: list):
+        self.cron_id = cron_id
+        self.chat_id = chat_id
+        self.account = account
+        self.game_day = game_day
+        self.game_date = game_date
+        self.options = options
+        # Nothing can be booked once the earliest option has started
+        self.deadline = min(
+            datetime.datetime.combine(game_date, datetime.datetime.strptime(game_start_time, "%H:%M").time())
+            for game_start_time, _ in options
+        )
+
+    def get_key(self) -> tuple:
+        return self.account, self.game_date
+
+
+class CancellationWatcher:
+    # Polls the grid of the dates being watched and books a watched option as soon as it frees up. All the watches of
+    # one account run on its shared logged-in session and the watches of one date share every grid read, so a tick
+    # costs one reload per (account, date) however many crons are watching. Consecutive snapshots are diffed and the
+    # options are only matched when some slot has freed up. The interval of a date is reset to min_interval when its
+    # grid changes and grows up to max_interval while it stays quiet
+    _DEFAULT_MIN_INTERVAL = 20.0
+    _DEFAULT_MAX_INTERVAL = 180.0
+    _DEFAULT_BACKOFF = 1.5
+
+    def __init__(self,
+                 min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None,
+                 backoff: Optional[float] = None,
+                 disabled_for_testing: bool = False,
+                 event_bus: Optional[EventBus] = None,
+                 run_in_session: Optional[Callable] = None,
+                 read_grid: Optional[Callable] = None,
+                 book_slot: Optional[Callable] = None,
+                 on_booked: Optional[Callable[[BookingResult], None]] = None):
+        self._min_interval = min_interval if min_interval is not None else CancellationWatcher._DEFAULT_MIN_INTERVAL
+        self._max_interval = max_interval if max_interval is not None else CancellationWatcher._DEFAULT_MAX_INTERVAL
+        self._backoff = backoff if backoff is not None else CancellationWatcher._DEFAULT_BACKOFF
+        self._disabled_for_testing = disabled_for_testing
+        self._event_bus = event_bus if event_bus is not None else get_event_bus()
+        # run_in_session(account, operation) runs operation(session) on a logged-in session of the account
+        self._run_in_session = run_in_session if run_in_session is not None else _run_in_shared_session
+        self._read_grid = read_grid if read_grid is not None else read_game_day_grid
+        self._book_slot = book_slot if book_slot is not None else book_shown_game_day
+        # Called with every successful booking before it is published
+        self._on_booked = on_booked
+
+        self._lock = threading.Lock()
+        self._watches = {}  # cron_id -> Watch
+        self._snapshots = {}  # (account, game_date) -> AvailabilityGrid
+        self._intervals = {}  # (account, game_date) -> seconds
+        self._next_polls = {}  # (account, game_date) -> time.monotonic()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="CancellationWatcher", daemon=True)
+        self._thread.start()
+        _LOGGER.info("Cancellation watcher started")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        _LOGGER.info("Cancellation watcher stopped")
+
+    def watch(self,
+              cron_id: int,
+              chat_id: Optional[int],
+              account: Optional[str],
+              game_day: str,
+              game_date: datetime.date,
+              options: list) -> None:
+        # Replaces any previous watch of the cron. A date not watched yet is polled right away
+        watch = Watch(cron_id, chat_id, account, game_day, game_date, list(options))
+        with self._lock:
+            self._watches[cron_id] = watch
+            self._next_polls.setdefault(watch.get_key(), time.monotonic())
+            self._intervals.setdefault(watch.get_key(), self._min_interval)
+        self._wake_event.set()
+        _LOGGER.info("Watching cancellations on %s for reservation cron with id = %s", game_date, cron_id)
+
+    def unwatch(self, cron_id: int) -> bool:
+        with self._lock:
+            return self._remove(cron_id) is not None
+
+    def clear(self, chat_id: Optional[int] = None) -> None:
+        with self._lock:
+            for watch in list(self._watches.values()):
+                if chat_id is None or watch.chat_id == chat_id:
+                    self._remove(watch.cron_id)
+
+    def is_watching(self, cron_id: int) -> bool:
+        with self._lock:
+            return cron_id in self._watches
+
+    def get_watches(self, chat_id: Optional[int] = None) -> list:  # Watch
+        with self._lock:
+            return [w for w in self._watches.values() if chat_id is None or w.chat_id == chat_id]
+
+    def poll_due(self) -> None:
+        # One tick: drops the expired watches and polls the dates whose interval has elapsed
+        now = datetime.datetime.now()
+        with self._lock:
+            expired = [self._remove(w.cron_id) for w in list(self._watches.values()) if w.deadline <= now]
+            monotonic_now = time.monotonic()
+            due_keys = [key for key, next_poll in self._next_polls.items() if next_poll <= monotonic_now]
+        for watch in expired:
+            _LOGGER.info("Watch of reservation cron with id = %s expired", watch.cron_id)
+            result = BookingResult(watch.game_day, *watch.options[0], account=watch.account)
+            result.game_date = watch.game_date
+            result.error = "ERROR: No court freed up before the game"
+            self._publish(watch, result)
+        for key in due_keys:
+            self._poll(key)
+
+    def _remove(self, cron_id: int) -> Optional[Watch]:
+        # Must be called with the lock held. Dates left without watches stop being polled
+        watch = self._watches.pop(cron_id, None)
+        if watch is not None and not any(w.get_key() == watch.get_key() for w in self._watches.values()):
+            self._snapshots.pop(watch.get_key(), None)
+            self._intervals.pop(watch.get_key(), None)
+            self._next_polls.pop(watch.get_key(), None)
+        return watch
+
+    def _loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.poll_due()
+            except Exception as e:
+                _LOGGER.error("ERROR: Cancellation watcher tick failed")
+                _LOGGER.error(e)
+
+            with self._lock:
+                next_poll = min(self._next_polls.values(), default=None)
+            idle_seconds = _MAX_SLEEP_TIME if next_poll is None else min(next_poll - time.monotonic(), _MAX_SLEEP_TIME)
+            if idle_seconds > 0:
+                self._wake_event.wait(idle_seconds)
+            self._wake_event.clear()
+
+    def _poll(self, key: tuple) -> None:
+        account, game_date = key
+        with self._lock:
+            watches = [w for w in self._watches.values() if w.get_key() == key]
+            previous = self._snapshots.get(key)
+        if not watches:
+            return
+
+        # Kept across the runs of operation: the session runner runs it again after a re-login, which must not book a
+        # watch twice
+        booked = []  # (Watch, BookingResult)
+
+        def operation(session) -> tuple:  # (AvailabilityGrid, freed)
+            grid = self._read_grid(session, game_date)
+            if previous is not None and not grid.has_freed_slots(previous):
+                return grid, False
+
+            booked_cron_ids = {watch.cron_id for watch, _ in booked}
+            for watch in watches:
+                if watch.cron_id in booked_cron_ids or find_free_option(grid, watch.options) is None:
+                    continue
+                start = time.perf_counter()
+                result = BookingResult(watch.game_day, *watch.options[0], account=account)
+                result.game_date = game_date
+                result.attempts = 1
+                try:
+                    with _TRACER.span("watch_booking", cron_id=watch.cron_id):
+                        result.court, result.booked_start_time, result.booked_duration = self._book_slot(
+                            session,
+                            watch.game_day,
+                            game_date,
+                            watch.options,
+                            self._disabled_for_testing
+                        )
+                    result.duration = time.perf_counter() - start
+                    booked.append((watch, result))
+                except Exception as e:
+                    # Someone else was faster, the watch goes on
+                    _LOGGER.warning("WARN: Cannot book freed slot for reservation cron with id = %s", watch.cron_id)
+                    _LOGGER.warning(e)
+                # Booking leaves the grid page, which the remaining watches need
+                grid = self._read_grid(session, game_date)
+            return grid, True
+
+        try:
+            with _TRACER.span("watch_poll", game_date=game_date.isoformat(), watches=len(watches)):
+                grid, freed = self._run_in_session(account, operation)
+        except Exception as e:
+            _LOGGER.warning("WARN: Cannot poll the grid of %s", game_date)
+            _LOGGER.warning(e)
+            grid, freed = previous, False
+
+        with self._lock:
+            for watch, _ in booked:
+                self._remove(watch.cron_id)
+            if key in self._next_polls:
+                interval = self._min_interval if freed else \
+                    min(self._intervals[key] * self._backoff, self._max_interval)
+                self._intervals[key] = interval
+                self._next_polls[key] = time.monotonic() + interval
+                if grid is not None:
+                    self._snapshots[key] = grid
+        for watch, result in booked:
+            if self._on_booked is not None:
+                try:
+                    self._on_booked(result)
+                except Exception as e:
+                    _LOGGER.warning("WARN: Cannot run booking callback of reservation cron with id = %s", watch.cron_id)
+                    _LOGGER.warning(e)
+            self._publish(watch, result)
+
+    def _publish(self, watch: Watch, result: BookingResult) -> None:
+        result.cron_id = watch.cron_id
+        result.chat_id = watch.chat_id
+        self._event_bus.publish(BOOKING_RESULT_TOPIC, result)
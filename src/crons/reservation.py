@@ -1,10 +1,29 @@
 # !/usr/bin/python
 
+import datetime
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+from selenium.webdriver.common.by import By
+
+from crons.availability_grid import AvailabilityGrid
+from crons.availability_grid import get_slot_css_selector
+from crons.availability_grid import get_slot_index
+from crons.availability_grid import get_slot_position
+from crons.availability_grid import read_availability_grid
+from crons.booking_result import BookingResult
+from crons.retry_policy import RetryableError
+from crons.retry_policy import RetryPolicy
 from utils.browser_session_manager import BrowserSessionManager
+from utils.browser_session_pool import BrowserSessionPool
+from utils.clock_sync import get_clock_sync
+from utils.clock_sync import sleep_until
+from utils.session_registry import get_session_registry
+from utils.tracing import get_tracer
+from utils.week_days_manager import compute_game_date
 
 #
 # Enable logging
@@ -18,7 +37,24 @@ logging.basicConfig(
 # STATIC ATTRIBUTES
 #
 _LOGGER = logging.getLogger(__name__)
-_SLOW_TYPE_SLEEP_TIME = 1
+_TRACER = get_tracer()
+_SESSION_POOL_TIMEOUT = 30.0
+_DAY_ADVANCE_TIMEOUT = 5.0
+_GRID_TIMEOUT = 10.0
+_DURATION_TIMEOUT = 5.0
+_DATE_JUMP_TIMEOUT = 5.0
+_PREVIOUS_DAY_XPATH = "//*[@id='tablaReserva']/div[2]/div[2]/div[1]/div[3]/input[1]"
+_DATE_INPUT_XPATH = "//*[@id='tablaReserva']/div[2]/div[2]/div[1]/div[3]/input[2]"
+_NEXT_DAY_XPATH = "//*[@id='tablaReserva']/div[2]/div[2]/div[1]/div[3]/input[3]"
+_GRID_DATE_FORMAT = "%d/%m/%Y"
+# Setting the value programmatically does not fire the change event that posts the new date back
+_SET_DATE_SCRIPT = """
+var input = arguments[0];
+input.value = arguments[1];
+input.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+_GRID_FIRST_ROW_CSS = "#CuerpoTabla>g"
+_DURATION_BUTTONS_XPATH = "//*[@id='groupButtons']/*[name()='g']"
 _HOUR_TO_INDEX = {
     "8": 1,
     "9": 2,
@@ -46,6 +82,12 @@ _DURATION_TO_CODE = {
     "90m": 2,
     "120m": 3
 }
+_DURATION_TO_SLOTS = {
+    "60m": 2,
+    "90m": 3,
+    "120m": 4
+}
+_MAX_SUGGESTIONS = 3
 _CSS_DURATION_TO_CODE = {
     "60' Minutos": 1,
     "90' Minutos": 2,
@@ -55,69 +97,212 @@ _CSS_DURATION_TO_CODE = {
 #
 # HELPER METHODS
 #
-def _book(browser_session_manager: BrowserSessionManager,
-          game_day: str,
-          game_start_time: str,
-          game_duration: str,
-          disabled_for_testing: bool) -> None:
-    # Move to reservations tab
-    browser_session_manager.navigate(
-        "ctl00_ctl00_ContentPlaceHolderContenido_WUCMenuLateralIzquierdaIntranet_LiBuscadorReservas"
+def _get_grid_date(browser_session_manager: BrowserSessionManager) -> Optional[datetime.date]:
+    date_input = browser_session_manager.wait_for_presence(By.XPATH, _DATE_INPUT_XPATH, timeout=_GRID_TIMEOUT)
+    try:
+        return datetime.datetime.strptime(date_input.get_attribute("value").strip(), _GRID_DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def _jump_to_date(browser_session_manager: BrowserSessionManager, game_date: datetime.date) -> None:
+    grid_row = browser_session_manager.wait_for_presence(By.CSS_SELECTOR, _GRID_FIRST_ROW_CSS, timeout=_GRID_TIMEOUT)
+    date_input = browser_session_manager.wait_for_presence(By.XPATH, _DATE_INPUT_XPATH, timeout=_GRID_TIMEOUT)
+    browser_session_manager.get_browser().execute_script(
+        _SET_DATE_SCRIPT,
+        date_input,
+        game_date.strftime(_GRID_DATE_FORMAT)
     )
+    # The grid is redrawn once the new day is loaded
+    browser_session_manager.wait_for_staleness(grid_row, timeout=_DATE_JUMP_TIMEOUT)
 
-    # Move to game_day (no need to check since cron is being executed 6 days before)
-    browser = browser_session_manager.get_browser()
-    next_button = browser.find_element_by_xpath("//*[@id='tablaReserva']/div[2]/div[2]/div[1]/div[3]/input[3]")
-    for _ in range(6):
-        next_button.click()
-        time.sleep(_SLOW_TYPE_SLEEP_TIME)
 
-    # Select game_start_time
-    game_hour, game_minute = game_start_time.split(":")
-    game_hour_index = _HOUR_TO_INDEX[game_hour]
-    game_minute_index = _MINUTE_TO_INDEX[game_minute]
-
-    i = 0
-    reservation_done = False
-    court = None
-    while i < len(_COURT_PRIORITY) and not reservation_done:
-        court = _COURT_PRIORITY[i]
-        game_day_css_id = "#CuerpoTabla>g:nth-child({})>g:nth-child({})>rect:nth-child({})".format(
-            game_hour_index,
-            court,
-            game_minute_index
+def _step_to_date(browser_session_manager: BrowserSessionManager,
+                  game_date: datetime.date,
+                  grid_date: datetime.date) -> None:
+    # Fallback when the date cannot be typed: one postback per day with the previous/next buttons
+    days = (game_date - grid_date).days
+    button_xpath = _NEXT_DAY_XPATH if days > 0 else _PREVIOUS_DAY_XPATH
+    for day in range(abs(days)):
+        with _TRACER.span("day_advance", day=day + 1):
+            grid_row = browser_session_manager.wait_for_presence(
+                By.CSS_SELECTOR,
+                _GRID_FIRST_ROW_CSS,
+                timeout=_GRID_TIMEOUT
+            )
+            day_button = browser_session_manager.wait_for_clickable(By.XPATH, button_xpath, timeout=_GRID_TIMEOUT)
+            day_button.click()
+            browser_session_manager.wait_for_staleness(grid_row, timeout=_DAY_ADVANCE_TIMEOUT)
+
+
+def _open_game_day(browser_session_manager: BrowserSessionManager, game_date: datetime.date) -> None:
+    # Move to reservations tab
+    with _TRACER.span("navigate"):
+        browser_session_manager.navigate(
+            "ctl00_ctl00_ContentPlaceHolderContenido_WUCMenuLateralIzquierdaIntranet_LiBuscadorReservas"
         )
+
+    # Move to game_day
+    with _TRACER.span("date_jump", game_date=game_date.isoformat()):
+        grid_date = _get_grid_date(browser_session_manager)
+        if grid_date != game_date:
+            try:
+                _jump_to_date(browser_session_manager, game_date)
+                grid_date = _get_grid_date(browser_session_manager)
+            except Exception as e:
+                _LOGGER.debug("WARN: Cannot jump to " + str(game_date) + ". Moving day by day...")
+                _LOGGER.debug(e)
+                grid_date = _get_grid_date(browser_session_manager)
+            if grid_date is not None and grid_date != game_date:
+                _step_to_date(browser_session_manager, game_date, grid_date)
+                grid_date = _get_grid_date(browser_session_manager)
+
+    # Never search for slots on a different day than the requested one
+    if grid_date != game_date:
+        raise Exception("ERROR: Reservation grid shows " + str(grid_date) + " instead of " + str(game_date))
+    browser_session_manager.wait_for_presence(By.CSS_SELECTOR, _GRID_FIRST_ROW_CSS, timeout=_GRID_TIMEOUT)
+
+
+def _get_slot_indexes(game_start_time: str) -> (int, int):
+    game_hour, game_minute = game_start_time.split(":")
+    return _HOUR_TO_INDEX[game_hour], _MINUTE_TO_INDEX[game_minute]
+
+
+def _get_start_time(slot: int) -> str:
+    hour_index, minute_index = get_slot_position(slot)
+    game_hour = next(hour for hour, index in _HOUR_TO_INDEX.items() if index == hour_index)
+    game_minute = next(minute for minute, index in _MINUTE_TO_INDEX.items() if index == minute_index)
+    return game_hour + ":" + game_minute
+
+
+def _find_slot(browser_session_manager: BrowserSessionManager,
+               game_date: datetime.date,
+               options: list) -> (str, str, list):  # (game_start_time, game_duration, free_courts)
+    # options are (game_start_time, game_duration) by preference, the requested one first. The grid is read once and
+    # every option is checked against its bitmasks, so falling back costs no round trip to the club
+    with _TRACER.span("grid_snapshot"):
+        grid = read_availability_grid(browser_session_manager.get_browser(), game_date)
+    slot_option = find_free_option(grid, options)
+    if slot_option is not None:
+        if slot_option[:2] != options[0]:
+            _LOGGER.info("Falling back to %s (%s)", slot_option[0], slot_option[1])
+        return slot_option
+
+    game_start_time, game_duration = options[0]
+    slot = get_slot_index(*_get_slot_indexes(game_start_time))
+    num_slots = _DURATION_TO_SLOTS[game_duration]
+    alternatives = grid.suggest_alternatives(slot, num_slots, _COURT_PRIORITY, max_suggestions=_MAX_SUGGESTIONS)
+    raise RetryableError(
+        "ERROR: There is not any timeslot available for your reservation. Alternatives: " +
+        ", ".join(_get_start_time(s) + " (court " + str(court) + ")" for s, court in alternatives)
+    )
+
+
+def _select_slot(browser_session_manager: BrowserSessionManager, game_start_time: str, courts: list) -> int:
+    game_hour_index, game_minute_index = _get_slot_indexes(game_start_time)
+    browser = browser_session_manager.get_browser()
+    for court in courts:
         try:
-            slot_button = browser.find_element_by_css_selector(game_day_css_id)
-            slot_button.click()
-            time.sleep(_SLOW_TYPE_SLEEP_TIME)
-            reservation_done = True
+            with _TRACER.span("slot_search", court=court):
+                slot_button = browser.find_element_by_css_selector(
+                    get_slot_css_selector(game_hour_index, court, game_minute_index)
+                )
+                slot_button.click()
+            return court
         except Exception:
             _LOGGER.debug("WARN: Cannot make reservation at " + str(court) + ". Retrying...")
-            i += 1
-            reservation_done = False
 
-    if not reservation_done:
-        raise Exception("ERROR: There is not any timeslot available for your reservation")
+    raise RetryableError("ERROR: There is not any timeslot available for your reservation")
+
+
+def _select_duration(browser_session_manager: BrowserSessionManager, game_duration: str) -> None:
+    with _TRACER.span("duration_pick", duration=game_duration):
+        _click_duration(browser_session_manager, game_duration)
+
 
-    # Select game_duration
+def _click_duration(browser_session_manager: BrowserSessionManager, game_duration: str) -> None:
     duration_code = _DURATION_TO_CODE[game_duration]
-    available_time_buttons = browser.find_elements_by_xpath("//*[@id='groupButtons']/*[name()='g']")
+    browser_session_manager.wait_for_presence(By.XPATH, _DURATION_BUTTONS_XPATH, timeout=_DURATION_TIMEOUT)
+    available_time_buttons = browser_session_manager.get_browser().find_elements_by_xpath(_DURATION_BUTTONS_XPATH)
     available_duration_codes = [_CSS_DURATION_TO_CODE[b.text.strip()] for b in available_time_buttons]
     duration_button = available_time_buttons[available_duration_codes.index(duration_code)]
     duration_button.click()
-    time.sleep(_SLOW_TYPE_SLEEP_TIME)
 
-    # Make reservation
-    browser_session_manager.navigate(
-        "ctl00_ContentPlaceHolderContenido_ButtonPagoSaldo"
-    )
-    if not disabled_for_testing:
+
+def _pay(browser_session_manager: BrowserSessionManager) -> None:
+    with _TRACER.span("payment"):
         browser_session_manager.navigate(
-            "ctl00_ContentPlaceHolderContenido_ButtonConfirmar"
+            "ctl00_ContentPlaceHolderContenido_ButtonPagoSaldo"
         )
 
-    # Log success
+
+def _confirm(browser_session_manager: BrowserSessionManager, disabled_for_testing: bool) -> None:
+    if not disabled_for_testing:
+        with _TRACER.span("confirm"):
+            browser_session_manager.navigate(
+                "ctl00_ContentPlaceHolderContenido_ButtonConfirmar"
+            )
+
+
+def _select_option(browser_session_manager: BrowserSessionManager,
+                   game_date: datetime.date,
+                   options: list,
+                   position: int = 0) -> (int, str, str):  # (court, game_start_time, game_duration)
+    # Selects the first option with free courts, starting from its position-th free court
+    game_start_time, game_duration, free_courts = _find_slot(browser_session_manager, game_date, options)
+    court = _select_slot(browser_session_manager, game_start_time, free_courts[position:])
+    _select_duration(browser_session_manager, game_duration)
+    return court, game_start_time, game_duration
+
+
+def _prepare_slot(browser_session_manager: BrowserSessionManager,
+                  game_date: datetime.date,
+                  options: list,
+                  position: int = 0) -> Optional[tuple]:  # (court, game_start_time, game_duration)
+    # Selects the slot and the duration ahead of a strike. Returns None when the day cannot be booked yet (the window
+    # opens at the strike), in which case the grid is read again once it has fired
+    try:
+        return _select_option(browser_session_manager, game_date, options, position)
+    except Exception as e:
+        _LOGGER.debug("WARN: Cannot select the slot ahead of the strike. Selecting it afterwards...")
+        _LOGGER.debug(e)
+        return None
+
+
+def _choose(browser_session_manager: BrowserSessionManager,
+            game_date: datetime.date,
+            options: list,
+            strike_at: Optional[float],
+            position: int = 0) -> tuple:  # (court, game_start_time, game_duration)
+    # Opens the game day and selects a slot, striking at strike_at when given. Every call reloads the day, which
+    # refreshes the grid within the same logged-in session
+    try:
+        _open_game_day(browser_session_manager, game_date)
+        choice = None
+        if strike_at is not None:
+            # Everything up to the payment is done ahead so that only the final submit is left at the opening instant
+            choice = _prepare_slot(browser_session_manager, game_date, options, position)
+            _wait_for_strike(strike_at)
+            if choice is None:
+                _open_game_day(browser_session_manager, game_date)
+        if choice is None:
+            choice = _select_option(browser_session_manager, game_date, options, position)
+        return choice
+    except RetryableError:
+        raise
+    except Exception as e:
+        # Nothing has been paid yet, so the same session can safely try again
+        raise RetryableError(str(e)) from e
+
+
+def _wait_for_strike(strike_at: float) -> None:
+    # strike_at is the local time.time() of the opening instant, already corrected by the server clock offset
+    with _TRACER.span("strike_wait"):
+        lateness = sleep_until(strike_at)
+    _LOGGER.info("Strike fired %.1fms after the opening instant", lateness * 1000)
+
+
+def _log_reservation(game_day: str, game_start_time: str, game_duration: str, court: int) -> None:
     _LOGGER.info(
         "Reservation: GameDay = %s, GameStartTime = %s, GameDuration = %s, Court = %s",
         game_day,
@@ -127,14 +312,240 @@ def _book(browser_session_manager: BrowserSessionManager,
     )
 
 
+def _book(browser_session_manager: BrowserSessionManager,
+          game_day: str,
+          game_date: datetime.date,
+          options: list,
+          disabled_for_testing: bool,
+          strike_at: Optional[float],
+          retry_policy: RetryPolicy) -> tuple:  # (court, game_start_time, game_duration)
+    def attempt(number: int) -> tuple:
+        with _TRACER.span("attempt", number=number):
+            choice = _choose(browser_session_manager, game_date, options, strike_at if number == 1 else None)
+            _pay(browser_session_manager)
+            _confirm(browser_session_manager, disabled_for_testing)
+            return choice
+
+    court, game_start_time, game_duration = retry_policy.run(attempt)
+    _log_reservation(game_day, game_start_time, game_duration, court)
+    return court, game_start_time, game_duration
+
+
+def _book_race(browser_session_managers: list,
+               game_day: str,
+               game_date: datetime.date,
+               options: list,
+               disabled_for_testing: bool,
+               strike_at: Optional[float],
+               retry_policy: RetryPolicy) -> tuple:  # (court, game_start_time, game_duration)
+    # Every session goes for a different candidate court and the first one reaching the payment page confirms.
+    # The remaining sessions are cancelled before confirming so that only one court is booked
+    winner_lock = threading.Lock()
+    winner = []
+    cancelled = threading.Event()
+
+    def race(position: int, number: int) -> Optional[tuple]:
+        browser_session_manager = browser_session_managers[position]
+        choice = _choose(browser_session_manager, game_date, options, strike_at if number == 1 else None, position)
+        if cancelled.is_set():
+            return None
+
+        _pay(browser_session_manager)
+        with winner_lock:
+            if winner:
+                return None
+            winner.append(position)
+            cancelled.set()
+        _confirm(browser_session_manager, disabled_for_testing)
+        return choice
+
+    def attempt(number: int) -> tuple:
+        with _TRACER.span("attempt", number=number):
+            with ThreadPoolExecutor(max_workers=len(browser_session_managers)) as executor:
+                futures = [
+                    executor.submit(_TRACER.bind(race), position, number)
+                    for position in range(len(browser_session_managers))
+                ]
+
+            choices = []
+            errors = []
+            for future in futures:
+                try:
+                    choice = future.result()
+                    if choice is not None:
+                        choices.append(choice)
+                except Exception as e:
+                    _LOGGER.debug("WARN: Booking race candidate failed")
+                    _LOGGER.debug(e)
+                    errors.append(e)
+
+            if choices:
+                return choices[0]
+            if winner:
+                raise Exception("ERROR: The reservation could not be confirmed")
+            if errors and isinstance(errors[0], RetryableError):
+                raise errors[0]
+            raise RetryableError("ERROR: There is not any timeslot available for your reservation")
+
+    court, game_start_time, game_duration = retry_policy.run(attempt)
+    _log_reservation(game_day, game_start_time, game_duration, court)
+    return court, game_start_time, game_duration
+
+
+def _get_session(session_pool: Optional[BrowserSessionPool], account: Optional[str]) -> BrowserSessionManager:
+    browser_session_manager = None
+    if session_pool is not None:
+        with _TRACER.span("session_acquire"):
+            browser_session_manager = session_pool.acquire(timeout=_SESSION_POOL_TIMEOUT)
+    if browser_session_manager is None:
+        _LOGGER.debug("No pre-warmed session available, starting a new one")
+        with _TRACER.span("session_create"):
+            browser_session_manager = BrowserSessionManager(account=account)
+        try:
+            with _TRACER.span("login"):
+                browser_session_manager.login()
+        except Exception as e:
+            browser_session_manager.quit()
+            raise e
+    return browser_session_manager
+
+
+def _reserve(game_day: str,
+             game_date: datetime.date,
+             options: list,
+             disabled_for_testing: bool,
+             session_pool: Optional[BrowserSessionPool],
+             race_courts: int,
+             account: Optional[str],
+             strike_time: Optional[datetime.datetime],
+             retry_policy: RetryPolicy) -> tuple:  # (court, game_start_time, game_duration)
+    strike_at = None
+    if strike_time is not None:
+        # strike_time is read on the club server clock
+        with _TRACER.span("clock_sync"):
+            strike_at = get_clock_sync().to_local_time(strike_time.timestamp())
+    browser_session_managers = []
+    try:
+        if race_courts > 1:
+            with ThreadPoolExecutor(max_workers=race_courts) as executor:
+                get_session = _TRACER.bind(_get_session)
+                futures = [executor.submit(get_session, session_pool, account) for _ in range(race_courts)]
+            for future in futures:
+                try:
+                    browser_session_managers.append(future.result())
+                except Exception as e:
+                    _LOGGER.warning("WARN: Cannot start booking race session")
+                    _LOGGER.warning(e)
+            if not browser_session_managers:
+                raise Exception("ERROR: Cannot start any browser session")
+            choice = _book_race(
+                browser_session_managers,
+                game_day,
+                game_date,
+                options,
+                disabled_for_testing,
+                strike_at,
+                retry_policy
+            )
+        else:
+            browser_session_managers.append(_get_session(session_pool, account))
+            choice = _book(
+                browser_session_managers[0],
+                game_day,
+                game_date,
+                options,
+                disabled_for_testing,
+                strike_at,
+                retry_policy
+            )
+    except Exception as e:
+        _LOGGER.error("ERROR: Internal error while performing reservation")
+        _LOGGER.error(e)
+        for browser_session_manager in browser_session_managers:
+            browser_session_manager.quit()
+        raise e
+
+    # Keep the logged-in session for the balance and reservation queries that usually follow a booking
+    get_session_registry(BrowserSessionManager, account).adopt(browser_session_managers[0])
+    for browser_session_manager in browser_session_managers[1:]:
+        browser_session_manager.quit()
+    return choice
+
+
+def _get_game_date(game_day: str, strike_time: Optional[datetime.datetime]) -> datetime.date:
+    # The strike is prepared ahead of the opening, which may still be the previous day, so the game is counted from the
+    # opening instant
+    today = strike_time.date() if strike_time is not None else datetime.date.today()
+    return compute_game_date(game_day, today)
+
+
+def _get_step_timings(records: list) -> list:  # (step, seconds)
+    # Steps run by several race sessions keep their slowest duration
+    step_timings = {}
+    for record in records:
+        step_timings[record["name"]] = max(step_timings.get(record["name"], 0.0), record["duration"])
+    return list(step_timings.items())
+
+
 #
-# MAIN METHOD
+# MAIN METHODS
 #
-def do_reservation(
+def find_free_option(grid: AvailabilityGrid, options: list) -> Optional[tuple]:
+    # First (game_start_time, game_duration) option with free courts, as (game_start_time, game_duration, free_courts)
+    for game_start_time, game_duration in options:
+        slot = get_slot_index(*_get_slot_indexes(game_start_time))
+        free_courts = grid.find_free_courts(slot, _DURATION_TO_SLOTS[game_duration], _COURT_PRIORITY)
+        if free_courts:
+            return game_start_time, game_duration, free_courts
+    return None
+
+
+def read_game_day_grid(browser_session_manager: BrowserSessionManager, game_date: datetime.date) -> AvailabilityGrid:
+    # Reloads game_date in a logged-in session and reads its grid. When the session already shows that day, posting the
+    # same date back is the only request made
+    try:
+        if _get_grid_date(browser_session_manager) != game_date:
+            raise Exception("ERROR: Reservation grid is not showing " + str(game_date))
+        with _TRACER.span("date_jump", game_date=game_date.isoformat()):
+            _jump_to_date(browser_session_manager, game_date)
+        if _get_grid_date(browser_session_manager) != game_date:
+            raise Exception("ERROR: Reservation grid is not showing " + str(game_date))
+    except Exception as e:
+        _LOGGER.debug("WARN: Cannot reload " + str(game_date) + ". Opening it again...")
+        _LOGGER.debug(e)
+        _open_game_day(browser_session_manager, game_date)
+    with _TRACER.span("grid_snapshot"):
+        return read_availability_grid(browser_session_manager.get_browser(), game_date)
+
+
+def book_shown_game_day(browser_session_manager: BrowserSessionManager,
+                        game_day: str,
+                        game_date: datetime.date,
+                        options: list,
+                        disabled_for_testing: Optional[bool] = False) -> tuple:
+    # Books the first of the (game_start_time, game_duration) options free in the day the session is showing, e.g.
+    # right after read_game_day_grid. Returns (court, game_start_time, game_duration)
+    court, game_start_time, game_duration = _select_option(browser_session_manager, game_date, options)
+    _pay(browser_session_manager)
+    _confirm(browser_session_manager, disabled_for_testing)
+    _log_reservation(game_day, game_start_time, game_duration, court)
+    return court, game_start_time, game_duration
+
+
+def book(
         game_day: str,
         game_start_time: str,
         game_duration: str,
-        disabled_for_testing: Optional[bool] = False) -> None:
+        disabled_for_testing: Optional[bool] = False,
+        session_pool: Optional[BrowserSessionPool] = None,
+        race_courts: Optional[int] = 1,
+        account: Optional[str] = None,
+        strike_time: Optional[datetime.datetime] = None,
+        fallbacks: Optional[list] = None,
+        retry_policy: Optional[RetryPolicy] = None) -> BookingResult:
+    # With strike_time, the booking is prepared right away and its final submit waits for that instant. fallbacks are
+    # (game_start_time, game_duration) tried in order when the requested slot is taken. Never raises: failures are
+    # described by the returned result
     _LOGGER.info(
         "Making reservation for game_day=%s, game_start_time=%s, game_duration=%s",
         game_day,
@@ -142,17 +553,63 @@ def do_reservation(
         game_duration
     )
 
+    result = BookingResult(game_day, game_start_time, game_duration, account=account)
+    start = time.perf_counter()
     try:
-        browser_session_manager = BrowserSessionManager()
-        try:
-            browser_session_manager.login()
-            _book(browser_session_manager, game_day, game_start_time, game_duration, disabled_for_testing)
-        except Exception as e:
-            _LOGGER.error("ERROR: Internal error while performing reservation")
-            _LOGGER.error(e)
-            raise e
-        finally:
-            browser_session_manager.quit()
+        result.game_date = _get_game_date(game_day, strike_time)
+        with _TRACER.span(
+                "reservation",
+                game_day=game_day,
+                game_start_time=game_start_time,
+                game_duration=game_duration,
+                race_courts=race_courts,
+                account=account,
+                strike_time=strike_time.isoformat() if strike_time is not None else None
+        ):
+            with _TRACER.collect() as records:
+                try:
+                    result.court, result.booked_start_time, result.booked_duration = _reserve(
+                        game_day,
+                        result.game_date,
+                        [(game_start_time, game_duration)] + list(fallbacks or []),
+                        disabled_for_testing,
+                        session_pool,
+                        race_courts,
+                        account,
+                        strike_time,
+                        retry_policy if retry_policy is not None else RetryPolicy()
+                    )
+                finally:
+                    result.step_timings = _get_step_timings(records)
+                    result.attempts = sum(1 for record in records if record["name"] == "attempt")
         _LOGGER.info("Reservation DONE")
-    except Exception:
+    except Exception as e:
         _LOGGER.error("ERROR: Reservation failed")
+        result.error = str(e)
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def do_reservation(
+        game_day: str,
+        game_start_time: str,
+        game_duration: str,
+        disabled_for_testing: Optional[bool] = False,
+        session_pool: Optional[BrowserSessionPool] = None,
+        race_courts: Optional[int] = 1,
+        account: Optional[str] = None,
+        strike_time: Optional[datetime.datetime] = None,
+        fallbacks: Optional[list] = None,
+        retry_policy: Optional[RetryPolicy] = None) -> bool:
+    return book(
+        game_day,
+        game_start_time,
+        game_duration,
+        disabled_for_testing=disabled_for_testing,
+        session_pool=session_pool,
+        race_courts=race_courts,
+        account=account,
+        strike_time=strike_time,
+        fallbacks=fallbacks,
+        retry_policy=retry_policy
+    ).is_success()
@@ -0,0 +1,97 @@
+# !/usr/bin/python
+
+import logging
+import random
+import time
+from typing import Callable
+from typing import Optional
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+_AVAILABLE_MINUTES = ("00", "30")
+_AVAILABLE_DURATIONS = ("60m", "90m", "120m")
+_MIN_HOUR = 8
+_MAX_HOUR = 22
+
+
+class RetryableError(Exception):
+    # Failure that left nothing half done (e.g. no free court yet), so the same session can safely try again
+    pass
+
+
+class RetryPolicy:
+    # Bounded attempts separated by an exponential backoff with jitter, so that the members retrying after the same
+    # opening instant do not hit the club in lockstep
+    _DEFAULT_MAX_ATTEMPTS = 3
+    _DEFAULT_BASE_DELAY = 0.5
+    _DEFAULT_MAX_DELAY = 4.0
+    _DEFAULT_JITTER = 0.5
+
+    def __init__(self,
+                 max_attempts: Optional[int] = None,
+                 base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None,
+                 jitter: Optional[float] = None,
+                 rng: Optional[random.Random] = None):
+        self._max_attempts = max_attempts if max_attempts is not None else RetryPolicy._DEFAULT_MAX_ATTEMPTS
+        self._base_delay = base_delay if base_delay is not None else RetryPolicy._DEFAULT_BASE_DELAY
+        self._max_delay = max_delay if max_delay is not None else RetryPolicy._DEFAULT_MAX_DELAY
+        # Fraction of every delay that is randomised
+        self._jitter = jitter if jitter is not None else RetryPolicy._DEFAULT_JITTER
+        self._rng = rng if rng is not None else random.Random()
+
+    def get_max_attempts(self) -> int:
+        return self._max_attempts
+
+    def get_delay(self, attempt: int) -> float:
+        # Delay after the given failed attempt (1-based)
+        delay = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+        return delay * (1 - self._jitter) + self._rng.uniform(0, delay * self._jitter)
+
+    def run(self, operation: Callable, is_retryable: Optional[Callable] = None):
+        # Calls operation(attempt) until it succeeds, fails with a non retryable error or runs out of attempts
+        is_retryable = is_retryable if is_retryable is not None else lambda e: isinstance(e, RetryableError)
+        attempt = 1
+        while True:
+            try:
+                return operation(attempt)
+            except Exception as e:
+                if attempt >= self._max_attempts or not is_retryable(e):
+                    raise e
+                delay = self.get_delay(attempt)
+                _LOGGER.info("Attempt %s of %s failed, retrying in %.2fs", attempt, self._max_attempts, delay)
+                _LOGGER.debug(e)
+                time.sleep(delay)
+                attempt += 1
+
+
+def parse_fallbacks(text: Optional[str]) -> list:  # (game_start_time, game_duration)
+    # text is a comma separated list of "HH:MM DURATION" (e.g. "13:30 60m, 14:00 90m"). Raises on invalid entries
+    fallbacks = []
+    for entry in (text or "").split(","):
+        if not entry.strip():
+            continue
+        fields = entry.split()
+        if len(fields) != 2:
+            raise Exception("ERROR: Invalid fallback " + entry.strip())
+        game_start_time, game_duration = fields
+        hour, _, minute = game_start_time.partition(":")
+        if not hour.isdigit() or not _MIN_HOUR <= int(hour) <= _MAX_HOUR or minute not in _AVAILABLE_MINUTES \
+                or game_duration not in _AVAILABLE_DURATIONS:
+            raise Exception("ERROR: Invalid fallback " + entry.strip())
+        fallbacks.append((str(int(hour)) + ":" + minute, game_duration))
+    return fallbacks
+
+
+def format_fallbacks(fallbacks: list) -> str:
+    return ", ".join(game_start_time + " " + game_duration for game_start_time, game_duration in fallbacks)
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+import datetime
+
+from crons.availability_grid import get_slot_index
+from crons.availability_grid import parse_grid
+from tests.mock_club_server import MockClubServer
+
+_DATE = datetime.date(2021, 10, 14)
+_COURT_PRIORITY = [2, 4, 1, 3, 6, 8, 10, 5, 7, 9]
+
+
+def _render_grid(occupied: set) -> str:
+    server = MockClubServer()
+    server.set_occupied_slots(_DATE, occupied)
+    html = server._render_booking(_DATE, "")
+    start = html.index("<g id=\"CuerpoTabla\">")
+    return html[start:html.index("<g id=\"groupButtons\"", start)]
+
+
+def test_parse_grid():
+    # 13:00 is hour index 6, court 4 has 13:30 taken and court 2 has 13:00 taken
+    grid = parse_grid(_render_grid({(6, 4, 1), (6, 2, 0)}))
+
+    assert grid.get_num_courts() == 10
+    assert grid.get_num_slots() == 30
+    assert not grid.is_free(2, get_slot_index(6, 2), 2)
+    assert not grid.is_free(4, get_slot_index(6, 2), 2)
+    assert grid.is_free(4, get_slot_index(6, 2), 1)
+    assert grid.find_free_courts(get_slot_index(6, 2), 2, _COURT_PRIORITY, max_courts=2) == [1, 3]
+
+
+def test_contiguous_slots_and_alternatives():
+    # Only court 1 is open, from 13:30 to 15:00
+    occupied = {(hour, court, half) for hour in range(1, 16) for court in range(1, 11) for half in (0, 1)}
+    occupied -= {(6, 1, 1), (7, 1, 0), (7, 1, 1)}
+    grid = parse_grid(_render_grid(occupied))
+
+    assert grid.find_free_courts(get_slot_index(6, 2), 2, _COURT_PRIORITY) == []
+    assert grid.is_free(1, get_slot_index(6, 3), 3)
+    assert not grid.is_free(1, get_slot_index(6, 3), 4)
+    assert grid.suggest_alternatives(get_slot_index(6, 2), 2, _COURT_PRIORITY) == [
+        (get_slot_index(6, 3), 1),
+        (get_slot_index(7, 2), 1)
+    ]
+
+
+if __name__ == "__main__":
+    test_parse_grid()
+    test_contiguous_slots_and_alternatives()
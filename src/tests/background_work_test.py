@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+import threading
+import time
+
+from bots.telegram.background_work import BackgroundWork
+
+
+def test_bounded_queue():
+    background_work = BackgroundWork(max_workers=1, max_queue_depth=2)
+    release = threading.Event()
+
+    def blocked_operation(value: int):
+        def run():
+            release.wait(5.0)
+            return value
+        return run
+
+    first = background_work.submit("first", blocked_operation(1))
+    second = background_work.submit("second", blocked_operation(2))
+    assert first is not None and second is not None
+    assert background_work.get_queue_depth() == 2
+
+    # A full queue rejects new keys but still coalesces the requests in flight
+    assert background_work.submit("third", blocked_operation(3)) is None
+    assert background_work.submit("first", blocked_operation(4)) is first
+
+    release.set()
+    assert first.result(5.0) == 1
+    assert second.result(5.0) == 2
+    # The done callbacks may run right after result() returns
+    for _ in range(100):
+        if background_work.get_queue_depth() == 0:
+            break
+        time.sleep(0.01)
+    assert background_work.get_queue_depth() == 0
+
+    # Once drained, the queue accepts new requests again
+    third = background_work.submit("third", blocked_operation(3))
+    assert third is not None and third.result(5.0) == 3
+    background_work.shutdown()
+
+
+if __name__ == "__main__":
+    test_bounded_queue()
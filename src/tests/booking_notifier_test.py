@@ -0,0 +1,77 @@
+#!/usr/bin/python
+
+import datetime
+import threading
+
+from bots.telegram.booking_notifier import BookingNotifier
+from bots.telegram.booking_notifier import format_booking_results
+from crons.booking_result import BOOKING_RESULT_TOPIC
+from crons.booking_result import BookingResult
+from crons.reservation import book
+from utils.event_bus import EventBus
+
+
+def _result(chat_id: int, cron_id: int, court) -> BookingResult:
+    result = BookingResult("thursday", "13:00", "60m")
+    result.game_date = datetime.date(2021, 10, 21)
+    result.court = court
+    result.error = None if court is not None else "ERROR: There is not any timeslot available"
+    result.step_timings = [("navigate", 0.5), ("date_jump", 0.25)]
+    result.duration = 1.5
+    result.cron_id = cron_id
+    result.chat_id = chat_id
+    return result
+
+
+def test_batching():
+    event_bus = EventBus()
+    messages = []
+    sent = threading.Event()
+
+    def send_message(chat_id: int, text: str) -> None:
+        messages.append((chat_id, text))
+        if len(messages) == 2:
+            sent.set()
+
+    notifier = BookingNotifier(send_message, batch_window=0.2, event_bus=event_bus)
+    notifier.start()
+    event_bus.publish(BOOKING_RESULT_TOPIC, _result(10, 1, 2))
+    event_bus.publish(BOOKING_RESULT_TOPIC, _result(20, 2, 4))
+    event_bus.publish(BOOKING_RESULT_TOPIC, _result(10, 3, None))
+    assert sent.wait(5)
+    notifier.stop()
+
+    # One message per chat, with all the results that finished together
+    messages = dict(messages)
+    assert sorted(messages) == [10, 20]
+    assert "Booked Thursday 21/10 13:00 (60m) [cron 1] on court 2 in 1.50s" in messages[10]
+    assert "Could not book Thursday 21/10 13:00 (60m) [cron 3]: ERROR: There is not any timeslot" in messages[10]
+    assert "Steps: navigate 0.50s, date_jump 0.25s" in messages[10]
+    assert "[cron 3]" not in messages[20]
+
+
+def test_fallback_result():
+    result = _result(10, 1, 3)
+    result.booked_start_time = "14:00"
+    result.booked_duration = "90m"
+    result.attempts = 2
+    text = format_booking_results([result])
+
+    assert result.is_fallback()
+    assert "Booked fallback 14:00 (90m) for Thursday 21/10 13:00 (60m) [cron 1] on court 3" in text
+    assert "Attempts: 2" in text
+
+
+def test_failed_booking_result():
+    # Failures are reported in the result instead of being raised
+    result = book("someday", "13:00", "60m", disabled_for_testing=True)
+
+    assert not result.is_success()
+    assert "Invalid game_day" in result.error
+    assert result.duration is not None
+
+
+if __name__ == "__main__":
+    test_batching()
+    test_fallback_result()
+    test_failed_booking_result()
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+
+from typing import Optional
+
+from utils.browser_session_pool import BrowserSessionPool
+
+
+class _FakeSession:
+    # Stands in for a BrowserSessionManager: no browser, the login state is set by the tests
+    def __init__(self, account: Optional[str] = None):
+        self.account = account
+        self.logged_in = False
+        self.can_login = True
+        self.num_logins = 0
+        self.closed = False
+
+    def login(self) -> None:
+        if not self.can_login:
+            raise Exception("ERROR: Cannot log in")
+        self.num_logins += 1
+        self.logged_in = True
+
+    def is_logged_in(self) -> bool:
+        return self.logged_in
+
+    def keep_alive(self) -> None:
+        pass
+
+    def quit(self) -> None:
+        self.closed = True
+
+
+def _pool() -> BrowserSessionPool:
+    return BrowserSessionPool(max_size=2, keep_alive_interval=60.0, account="alice", factory=_FakeSession)
+
+
+def test_acquire_warm_session():
+    pool = _pool()
+    pool.warm_up(3)
+    assert pool.get_num_ready_sessions() == 2
+    assert pool.get_num_started_sessions() == 2
+
+    session = pool.acquire(timeout=0)
+    assert session.account == "alice"
+    assert session.is_logged_in() and session.num_logins == 1
+    assert pool.get_num_ready_sessions() == 1
+    pool.close()
+
+
+def test_acquire_expired_session():
+    pool = _pool()
+    pool.warm_up(2)
+    expired, broken = [session for session, _ in pool._idle_sessions]
+
+    # An expired session is logged in again when it is checked out
+    expired.logged_in = False
+    assert pool.acquire(timeout=0) is expired
+    assert expired.is_logged_in() and expired.num_logins == 2
+
+    # One that cannot log in any more is dropped
+    broken.logged_in = False
+    broken.can_login = False
+    assert pool.acquire(timeout=0) is None
+    assert broken.closed
+    assert pool.get_num_started_sessions() == 0
+    pool.close()
+
+
+def test_close():
+    pool = _pool()
+    pool.warm_up(2)
+    sessions = [session for session, _ in pool._idle_sessions]
+    pool.close()
+
+    assert all(session.closed for session in sessions)
+    assert pool.acquire(timeout=0) is None
+
+
+if __name__ == "__main__":
+    test_acquire_warm_session()
+    test_acquire_expired_session()
+    test_close()
@@ -0,0 +1,113 @@
+#!/usr/bin/python
+
+import datetime
+
+from crons.availability_grid import AvailabilityGrid
+from crons.booking_result import BOOKING_RESULT_TOPIC
+from crons.cancellation_watcher import CancellationWatcher
+from utils.event_bus import EventBus
+
+# 13:00 is slot 10, so a 60m game takes slots 10 and 11
+_FULL_GRID = AvailabilityGrid([0, 0], 30)
+_FREED_GRID = AvailabilityGrid([0, 0b11 << 10], 30)
+
+
+def _watcher(grids: list, reads: list, bookings: list, results: list) -> CancellationWatcher:
+    event_bus = EventBus()
+    event_bus.subscribe(BOOKING_RESULT_TOPIC, results.append)
+
+    def read_grid(session, game_date: datetime.date) -> AvailabilityGrid:
+        reads.append((session, game_date))
+        return grids[min(len(reads), len(grids)) - 1]
+
+    def book_slot(session, game_day: str, game_date: datetime.date, options: list, _) -> tuple:
+        bookings.append((session, game_day, game_date, options))
+        return 2, options[0][0], options[0][1]
+
+    return CancellationWatcher(
+        min_interval=0,
+        max_interval=0,
+        event_bus=event_bus,
+        run_in_session=lambda account, operation: operation("session of " + str(account)),
+        read_grid=read_grid,
+        book_slot=book_slot
+    )
+
+
+def test_book_freed_slot():
+    game_date = datetime.date.today() + datetime.timedelta(days=3)
+    reads = []
+    bookings = []
+    results = []
+    watcher = _watcher([_FULL_GRID, _FULL_GRID, _FREED_GRID], reads, bookings, results)
+    watcher.watch(1, 10, "alice", "thursday", game_date, [("13:00", "60m")])
+    watcher.watch(2, 20, "alice", "thursday", game_date, [("19:00", "60m")])
+
+    # Both watches of the date share every grid read and nothing is booked while no slot frees up
+    watcher.poll_due()
+    watcher.poll_due()
+    assert reads == [("session of alice", game_date)] * 2
+    assert bookings == []
+
+    watcher.poll_due()
+    assert bookings == [("session of alice", "thursday", game_date, [("13:00", "60m")])]
+    assert [w.cron_id for w in watcher.get_watches()] == [2]
+    assert len(results) == 1
+    assert results[0].is_success()
+    assert (results[0].cron_id, results[0].chat_id, results[0].court) == (1, 10, 2)
+
+
+def test_expired_watch():
+    reads = []
+    bookings = []
+    results = []
+    watcher = _watcher([_FREED_GRID], reads, bookings, results)
+    watcher.watch(1, 10, None, "monday", datetime.date.today() - datetime.timedelta(days=1), [("13:00", "60m")])
+    watcher.poll_due()
+
+    assert reads == [] and bookings == []
+    assert not watcher.is_watching(1)
+    assert len(results) == 1
+    assert "No court freed up" in results[0].error
+
+
+
+def test_rerun_after_relogin():
+    # Like the shared session, the operation runs again after a re-login when it raises on a logged out session
+    game_date = datetime.date.today() + datetime.timedelta(days=3)
+    reads = []
+    bookings = []
+    results = []
+    watcher = _watcher([_FREED_GRID], reads, bookings, results)
+    is_logged_in = [True]
+    read_grid = watcher._read_grid
+
+    def run_in_session(account, operation):
+        try:
+            return operation("session of " + str(account))
+        except Exception:
+            if is_logged_in[0]:
+                raise
+            return operation("session of " + str(account))
+
+    def read_grid_logged_out_after_booking(session, game_date: datetime.date) -> AvailabilityGrid:
+        if bookings and is_logged_in[0]:
+            # The session expires right after the booking is confirmed
+            is_logged_in[0] = False
+            raise Exception("ERROR: Session expired")
+        return read_grid(session, game_date)
+
+    watcher._run_in_session = run_in_session
+    watcher._read_grid = read_grid_logged_out_after_booking
+    watcher.watch(1, 10, "alice", "thursday", game_date, [("13:00", "60m")])
+    watcher.poll_due()
+
+    assert bookings == [("session of alice", "thursday", game_date, [("13:00", "60m")])]
+    assert not watcher.is_watching(1)
+    assert len(results) == 1
+    assert results[0].is_success()
+
+if __name__ == "__main__":
+    test_book_freed_slot()
+    test_expired_watch()
+    test_rerun_after_relogin()
@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+import os
+
+from bots.telegram.chat_states import ChatStates
+from utils.secret_loader import get_account_secret_name
+from utils.secret_loader import get_secret_store
+from utils.secret_loader import load_account_secret
+
+
+def test_chat_states():
+    chat_states = ChatStates()
+    state = chat_states.get(10)
+    state.is_activated = True
+    state.balance_alert = 5
+
+    assert chat_states.get(10) is state
+    assert chat_states.get(20).is_activated is False
+    assert chat_states.get(20).balance_alert is None
+    assert sorted(s.chat_id for s in chat_states.get_all()) == [10, 20]
+
+
+def test_accounts():
+    assert get_account_secret_name("web_username.txt", 10) == "web_username_10.txt"
+
+    secret_store = get_secret_store()
+    os.environ[secret_store.get_env_var_name("web_username_10.txt")] = "user10"
+    os.environ[secret_store.get_env_var_name("web_password_10.txt")] = "password10"
+    secret_store.request_reload()
+    try:
+        chat_states = ChatStates()
+        # Chats with credentials of their own use them, the rest share the default account
+        assert chat_states.get(10).get_account() == "10"
+        assert chat_states.get(20).get_account() is None
+        assert load_account_secret("web_username.txt", "10") == "user10"
+        assert load_account_secret("web_password.txt", "10") == "password10"
+    finally:
+        del os.environ[secret_store.get_env_var_name("web_username_10.txt")]
+        del os.environ[secret_store.get_env_var_name("web_password_10.txt")]
+        secret_store.request_reload()
+
+
+if __name__ == "__main__":
+    test_chat_states()
+    test_accounts()
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+import random
+import time
+
+from tests.mock_club_server import MockClubServer
+from utils.clock_sync import ClockSync
+from utils.clock_sync import estimate_offset
+from utils.clock_sync import sleep_until
+
+
+def test_estimate_offset():
+    # Server clock 2.3s ahead, 20ms round trips spread over the second
+    rng = random.Random(0)
+    samples = []
+    for i in range(10):
+        send_time = 1000.0 + i * 0.11
+        server_time = send_time + rng.uniform(0, 0.02) + 2.3
+        samples.append((send_time, send_time + 0.02, float(int(server_time))))
+    offset, error = estimate_offset(samples)
+
+    assert abs(offset - 2.3) <= error
+    assert error < 0.1
+
+
+def test_sleep_until():
+    deadline = time.time() + 0.2
+    lateness = sleep_until(deadline)
+
+    assert time.time() >= deadline
+    assert 0 <= lateness < 0.05
+
+
+def test_mock_server_offset():
+    server = MockClubServer()
+    server.start()
+    try:
+        clock_sync = ClockSync(endpoint=server.get_endpoint())
+        offset = clock_sync.get_offset()
+    finally:
+        server.stop()
+
+    # Both clocks are the local one
+    assert abs(offset) < 0.2
+    assert clock_sync.get_error() < 0.2
+
+
+if __name__ == "__main__":
+    test_estimate_offset()
+    test_sleep_until()
+    test_mock_server_offset()
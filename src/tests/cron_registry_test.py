@@ -0,0 +1,63 @@
+#!/usr/bin/python
+
+import datetime
+
+import schedule
+
+from bots.telegram.cron_registry import CronJob
+from bots.telegram.cron_registry import CronRegistry
+
+
+def _make_registry() -> CronRegistry:
+    cron_registry = CronRegistry()
+    cron_registry.add(CronJob(1, 10, "friday", "00:01", "thursday", "13:00", "60m"))
+    cron_registry.add(CronJob(2, 20, "monday", "00:01", "sunday", "10:00", "90m"))
+    cron_registry.add(CronJob(3, 10, "friday", "00:01", "thursday", "19:00", "60m"))
+    return cron_registry
+
+
+def test_indexes():
+    cron_registry = _make_registry()
+    cron_registry.remove(1)
+
+    assert len(cron_registry) == 2
+    assert [c.cron_id for c in cron_registry.get_by_run_day("friday")] == [3]
+    assert [c.cron_id for c in cron_registry.get_by_game_day("SUNDAY")] == [2]
+    assert [c.cron_id for c in cron_registry.get_by_chat(10)] == [3]
+    assert [c.cron_id for c in cron_registry.clear(chat_id=20)] == [2]
+    assert [c.cron_id for c in cron_registry.get_all()] == [3]
+
+
+def test_job_index():
+    cron_registry = CronRegistry()
+    job = schedule.Scheduler().every().friday.at("00:01").do(print)
+    warm_up_job = schedule.Scheduler().every().thursday.at("23:56").do(print)
+    cron_registry.add(CronJob(1, 10, "friday", "00:01", "thursday", "13:00", "60m", job, warm_up_job, priority=3))
+
+    assert cron_registry.get_by_job(job).priority == 3
+    assert cron_registry.get_by_job(warm_up_job).cron_id == 1
+    cron_registry.remove(1)
+    assert cron_registry.get_by_job(job) is None
+
+
+def test_next_fire():
+    cron_registry = _make_registry()
+    # Thursday 2021-10-14 at noon: the Friday crons fire next
+    now = datetime.datetime(2021, 10, 14, 12, 0)
+    assert [c.cron_id for c in cron_registry.get_next(now)] == [1, 3]
+    assert cron_registry.get_next_fire_time(now) == datetime.datetime(2021, 10, 15, 0, 1)
+
+    # Saturday wraps around to Monday
+    now = datetime.datetime(2021, 10, 16, 12, 0)
+    assert [c.cron_id for c in cron_registry.get_next(now)] == [2]
+    assert cron_registry.get_next_fire_time(now) == datetime.datetime(2021, 10, 18, 0, 1)
+
+    # Monday right after the run waits for the Friday crons
+    now = datetime.datetime(2021, 10, 18, 0, 1)
+    assert cron_registry.get_next_fire_time(now) == datetime.datetime(2021, 10, 22, 0, 1)
+
+
+if __name__ == "__main__":
+    test_indexes()
+    test_job_index()
+    test_next_fire()
@@ -0,0 +1,54 @@
+#!/usr/bin/python
+
+import os
+import tempfile
+import time
+
+from bots.telegram.cron_store import CronStore
+
+
+def test_persist_crons():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "crons.db")
+        cron_store = CronStore(db_file=db_file)
+        first_id = cron_store.add("thursday", "13:00", "60m")
+        second_id = cron_store.add("sunday", "10:30", "90m", chat_id=42)
+        cron_store.mark_fired(second_id, fired_at=123.0)
+        cron_store.set_priority(second_id, 5)
+        cron_store.set_fallbacks(second_id, "11:00 90m, 12:00 60m")
+        cron_store.set_watch(second_id, True)
+        cron_store.delete(first_id)
+        cron_store.close()
+
+        # Reopened as after a restart
+        cron_store = CronStore(db_file=db_file)
+        crons = cron_store.load_all()
+        cron_store.clear()
+        remaining = cron_store.load_all()
+        cron_store.close()
+
+    assert second_id > first_id
+    assert [cron[:6] for cron in crons] == [(second_id, 42, "sunday", "10:30", "90m", 5)]
+    assert crons[0][7] == 123.0
+    assert crons[0][8] == "11:00 90m, 12:00 60m"
+    assert crons[0][9] == 1
+    assert remaining == []
+
+
+def test_bulk_load():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cron_store = CronStore(db_file=os.path.join(tmp_dir, "crons.db"))
+        for i in range(500):
+            cron_store.add("monday", "{}:00".format(8 + i % 14), "60m")
+        start = time.perf_counter()
+        crons = cron_store.load_all()
+        elapsed = time.perf_counter() - start
+        cron_store.close()
+
+    assert len(crons) == 500
+    assert elapsed < 0.5
+
+
+if __name__ == "__main__":
+    test_persist_crons()
+    test_bulk_load()
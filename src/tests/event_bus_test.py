@@ -0,0 +1,25 @@
+#!/usr/bin/python
+
+from utils.event_bus import EventBus
+
+
+def test_publish():
+    event_bus = EventBus()
+    received = []
+
+    def failing_handler(event):
+        raise Exception("ERROR: Handler failure")
+
+    event_bus.subscribe("topic", failing_handler)
+    event_bus.subscribe("topic", received.append)
+
+    # A failing handler does not prevent the delivery to the others
+    assert event_bus.publish("topic", 1) == 2
+    assert event_bus.publish("other_topic", 2) == 0
+    event_bus.unsubscribe("topic", failing_handler)
+    assert event_bus.publish("topic", 3) == 1
+    assert received == [1, 3]
+
+
+if __name__ == "__main__":
+    test_publish()
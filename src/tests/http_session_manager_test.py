@@ -0,0 +1,95 @@
+#!/usr/bin/python
+
+import datetime
+
+from bots.telegram.reservations_table import Reservation
+from bots.telegram.reservations_table import parse_reservations
+from bots.telegram.web_interactions import _BALANCE_CELL_ID
+from bots.telegram.web_interactions import _RESERVATIONS_TABLE_ID
+from bots.telegram.web_interactions import _navigate_balance_control
+from bots.telegram.web_interactions import _navigate_intranet
+from bots.telegram.web_interactions import _navigate_reservations
+from bots.telegram.web_interactions import _parse_balance
+from tests.mock_club_server import MockClubServer
+from utils.http_session_manager import HttpSessionManager
+
+
+def _logged_session(server: MockClubServer) -> HttpSessionManager:
+    http_session_manager = HttpSessionManager(endpoint=server.get_endpoint())
+    http_session_manager.login(server.username, server.password)
+    return http_session_manager
+
+
+def test_get_balance():
+    server = MockClubServer(balance="12,75")
+    server.start()
+    try:
+        http_session_manager = _logged_session(server)
+        _navigate_intranet(http_session_manager)
+        _navigate_balance_control(http_session_manager)
+        balance = _parse_balance(http_session_manager.get_element_html(_BALANCE_CELL_ID))
+        http_session_manager.quit()
+    finally:
+        server.stop()
+
+    assert balance == 12.75
+
+
+def test_get_reservations():
+    server = MockClubServer(reservations=[("12/10/2021", "13:00", "14:00", "4")])
+    server.start()
+    try:
+        http_session_manager = _logged_session(server)
+        _navigate_intranet(http_session_manager)
+        _navigate_reservations(http_session_manager)
+        reservations = parse_reservations(http_session_manager.get_element_html(_RESERVATIONS_TABLE_ID))
+        http_session_manager.quit()
+    finally:
+        server.stop()
+
+    assert reservations == [Reservation("12/10/2021", "13:00", "14:00", "Pista 4")]
+
+
+def test_login_failure():
+    server = MockClubServer()
+    server.start()
+    try:
+        http_session_manager = HttpSessionManager(endpoint=server.get_endpoint())
+        try:
+            http_session_manager.login(server.username, "wrong")
+            logged = True
+        except Exception:
+            logged = False
+        http_session_manager.quit()
+    finally:
+        server.stop()
+
+    assert not logged
+
+
+def test_booking_grid_occupancy():
+    server = MockClubServer(occupancy=0.5, seed=1)
+    server.start()
+    try:
+        http_session_manager = _logged_session(server)
+        _navigate_intranet(http_session_manager)
+        http_session_manager.navigate(
+            "ctl00_ctl00_ContentPlaceHolderContenido_WUCMenuLateralIzquierdaIntranet_LiBuscadorReservas"
+        )
+        http_session_manager.navigate("ctl00_ContentPlaceHolderContenido_ButtonSiguiente")
+        page = http_session_manager.get_page()
+        http_session_manager.quit()
+    finally:
+        server.stop()
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    assert page.find(id="ctl00_ContentPlaceHolderContenido_TextBoxFecha")["value"] == tomorrow.strftime("%d/%m/%Y")
+    free_slots = len(page.find(id="CuerpoTabla").find_all("rect"))
+    assert free_slots == 15 * 10 * 2 - len(server.get_occupied_slots(tomorrow))
+
+
+if __name__ == "__main__":
+    test_get_balance()
+    test_get_reservations()
+    test_login_failure()
+    test_booking_grid_occupancy()
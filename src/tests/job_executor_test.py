@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+import datetime
+import os
+import threading
+import time
+
+from utils import job_executor
+from utils.job_executor import JobExecutor
+from utils.job_executor import get_max_parallel_browsers
+
+
+def test_parallel_start():
+    executor = JobExecutor(max_workers=4)
+    started = []
+    done = threading.Semaphore(0)
+
+    def job(name: str):
+        def run():
+            started.append((name, time.perf_counter()))
+            time.sleep(0.2)
+            done.release()
+        return run
+
+    start = time.perf_counter()
+    executor.submit_batch([(job(str(i)), str(i), 0) for i in range(4)])
+    for _ in range(4):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    executor.stop()
+
+    # All the jobs due at the same instant start together instead of one after the other
+    assert elapsed < 0.6
+    assert max(t for _, t in started) - start < 0.1
+    assert len(executor.get_skews()) == 4
+
+
+def test_priority_and_capacity():
+    executor = JobExecutor(max_workers=4, get_capacity=lambda: 1)
+    order = []
+    done = threading.Semaphore(0)
+
+    def job(name: str):
+        def run():
+            order.append(name)
+            time.sleep(0.05)
+            done.release()
+        return run
+
+    scheduled_time = datetime.datetime.now()
+    executor.submit_batch([(job("low"), "low", 0), (job("high"), "high", 9), (job("mid"), "mid", 5)], scheduled_time)
+    for _ in range(3):
+        done.acquire()
+    executor.stop()
+
+    assert executor.get_capacity() == 1
+    assert order == ["high", "mid", "low"]
+    skews = executor.get_skews()
+    assert [(name, priority) for name, priority, _, _ in skews] == [("high", 9), ("mid", 5), ("low", 0)]
+    # Waiting for the only slot shows up in the skew
+    assert skews[0][3] < skews[2][3]
+    assert all(s[2] == scheduled_time for s in skews)
+
+
+def test_max_parallel_browsers():
+    assert get_max_parallel_browsers() >= 1
+
+
+def test_max_parallel_browsers_with_started_browsers():
+    get_available_memory_kb = job_executor.get_available_memory_kb
+    try:
+        # The pre-warmed browsers took the memory: the host has room for a single new one
+        job_executor.get_available_memory_kb = lambda: job_executor._BROWSER_MEMORY_KB
+        max_browsers = (os.cpu_count() or 1) * job_executor._BROWSERS_PER_CPU
+        assert get_max_parallel_browsers() == 1
+        assert get_max_parallel_browsers(num_started_browsers=3) == min(max_browsers, 4)
+
+        job_executor.get_available_memory_kb = lambda: 0
+        assert get_max_parallel_browsers() == 1
+        assert get_max_parallel_browsers(num_started_browsers=2) == min(max_browsers, 2)
+    finally:
+        job_executor.get_available_memory_kb = get_available_memory_kb
+
+
+if __name__ == "__main__":
+    test_parallel_start()
+    test_priority_and_capacity()
+    test_max_parallel_browsers()
+    test_max_parallel_browsers_with_started_browsers()
@@ -0,0 +1,288 @@
+#!/usr/bin/python
+
+import datetime
+import os
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from string import Template
+from urllib.parse import parse_qs
+
+#
+# STATIC ATTRIBUTES
+#
+_RESOURCES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "resources", "club")
+_TEMPLATES = ("login", "home", "intranet", "balance", "booking", "booking_confirmation", "booking_result")
+_SESSION_COOKIE = "ASP.NET_SessionId"
+_LOGIN_BUTTON = "ctl00$ContentPlaceHolderContenido$Login1$LoginButton"
+_USERNAME_FIELD = "ctl00$ContentPlaceHolderContenido$Login1$UserName"
+_PASSWORD_FIELD = "ctl00$ContentPlaceHolderContenido$Login1$Password"
+_MENU_PREFIX = "ctl00$ctl00$ContentPlaceHolderContenido$WUCMenuLateralIzquierdaIntranet$"
+_INTRANET_TARGET = "ctl00$ctl00$LinkButtonAcessoIntranet"
+_BALANCE_TARGET = _MENU_PREFIX + "LinkButtonMenuControlSaldo"
+_RESERVATIONS_TARGET = _MENU_PREFIX + "LinkButtonMenuReservas"
+_BOOKING_TARGET = _MENU_PREFIX + "LinkButtonBuscadorReservas"
+_PREVIOUS_DAY_BUTTON = "ctl00$ContentPlaceHolderContenido$ButtonAnterior"
+_NEXT_DAY_BUTTON = "ctl00$ContentPlaceHolderContenido$ButtonSiguiente"
+_DATE_FIELD = "ctl00$ContentPlaceHolderContenido$TextBoxFecha"
+_SLOT_FIELD = "ctl00$ContentPlaceHolderContenido$HiddenFieldHueco"
+_DURATION_FIELD = "ctl00$ContentPlaceHolderContenido$HiddenFieldDuracion"
+_PAY_BUTTON = "ctl00$ContentPlaceHolderContenido$ButtonPagoSaldo"
+_CONFIRM_BUTTON = "ctl00$ContentPlaceHolderContenido$ButtonConfirmar"
+_DATE_FORMAT = "%d/%m/%Y"
+_FIRST_HOUR = 8
+_NUM_HOURS = 15
+_NUM_COURTS = 10
+_DURATION_CODE_TO_HALF_HOURS = {1: 2, 2: 3}
+_ROW_HEIGHT = 20
+_COURT_WIDTH = 64
+
+
+def _load_template(name: str) -> Template:
+    with open(os.path.join(_RESOURCES_DIR, name), mode='r') as f:
+        return Template(f.read())
+
+
+def render_reservations_table(reservations: list) -> str:  # (day, start_time, end_time, court)
+    row = _load_template("reservation_row.html")
+    rows = "".join(
+        row.substitute(day=day, start_time=start_time, end_time=end_time, court=court)
+        for day, start_time, end_time, court in reservations
+    )
+    return _load_template("reservations.html").substitute(rows=rows)
+
+
+class MockClubServer:
+    # Local stand-in for the club website that replays the recorded pages and enforces the ASP.NET postback
+    # contract: every POST must carry back the __VIEWSTATE issued by the previous response.
+    # Court occupancy is drawn per date with the given probability (seeded) and every request can be delayed by
+    # latency seconds
+
+    def __init__(self,
+                 username: str = "user",
+                 password: str = "password",
+                 balance: str = "23,50",
+                 reservations: list = None,  # (day, start_time, end_time, court)
+                 latency: float = 0.0,
+                 occupancy: float = 0.0,
+                 seed: int = 0):
+        self.username = username
+        self.password = password
+        self.balance = balance
+        self.reservations = reservations if reservations is not None else []
+        self.latency = latency
+        self.occupancy = occupancy
+        self.seed = seed
+        self.num_requests = 0
+        self.bookings = []  # (date, hour_index, court, half, duration_code)
+
+        self._templates = {name: _load_template(name + ".html") for name in _TEMPLATES}
+        self._occupied = {}  # date -> set of (hour_index, court, half)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self) -> None:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server._handle(self, None)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                server._handle(self, {k: v[0] for k, v in parse_qs(body, keep_blank_values=True).items()})
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def expire_sessions(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session["logged"] = False
+
+    def get_endpoint(self) -> str:
+        return "http://127.0.0.1:" + str(self._server.server_port) + "/Default.aspx"
+
+    def get_occupied_slots(self, date: datetime.date) -> set:  # (hour_index, court, half)
+        with self._lock:
+            if date not in self._occupied:
+                rnd = random.Random(str(self.seed) + date.isoformat())
+                self._occupied[date] = {
+                    (hour_index, court, half)
+                    for hour_index in range(1, _NUM_HOURS + 1)
+                    for court in range(1, _NUM_COURTS + 1)
+                    for half in (0, 1)
+                    if rnd.random() < self.occupancy
+                }
+            return self._occupied[date]
+
+    def set_occupied_slots(self, date: datetime.date, occupied: set) -> None:
+        with self._lock:
+            self._occupied[date] = set(occupied)
+
+    #
+    # Request handling
+    #
+    def _handle(self, handler: BaseHTTPRequestHandler, form: dict) -> None:
+        with self._lock:
+            self.num_requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        cookie = SimpleCookie(handler.headers.get("Cookie", ""))
+        session_id = cookie[_SESSION_COOKIE].value if _SESSION_COOKIE in cookie else None
+        with self._lock:
+            if session_id not in self._sessions:
+                session_id = secrets.token_hex(12)
+                self._sessions[session_id] = {"logged": False, "viewstate": None, "day": None, "selection": None}
+            session = self._sessions[session_id]
+
+        if form is not None and form.get("__VIEWSTATE") != session["viewstate"]:
+            self._reply(handler, session_id, 500, "Validation of viewstate MAC failed")
+            return
+
+        page = self._route(session, form)
+        session["viewstate"] = secrets.token_urlsafe(32)
+        html = page.safe_substitute(
+            viewstate=session["viewstate"],
+            event_validation=secrets.token_urlsafe(16)
+        )
+        self._reply(handler, session_id, 200, html)
+
+    def _route(self, session: dict, form: dict) -> Template:
+        if form is not None and _LOGIN_BUTTON in form:
+            session["logged"] = form.get(_USERNAME_FIELD) == self.username \
+                and form.get(_PASSWORD_FIELD) == self.password
+            return self._templates["home"] if session["logged"] else self._templates["login"]
+
+        if not session["logged"]:
+            return self._templates["login"]
+        if form is None:
+            return self._templates["home"]
+
+        target = form.get("__EVENTTARGET", "")
+        if target == _BALANCE_TARGET:
+            content = self._templates["balance"].substitute(date="01/01/2021", balance=self.balance)
+        elif target == _RESERVATIONS_TARGET:
+            content = render_reservations_table(self.reservations)
+        elif target == _INTRANET_TARGET:
+            content = ""
+        elif target == _BOOKING_TARGET:
+            session["day"] = datetime.date.today()
+            content = self._render_booking(session["day"], "")
+        elif session["day"] is not None and _PREVIOUS_DAY_BUTTON in form:
+            session["day"] -= datetime.timedelta(days=1)
+            content = self._render_booking(session["day"], "")
+        elif session["day"] is not None and _NEXT_DAY_BUTTON in form:
+            session["day"] += datetime.timedelta(days=1)
+            content = self._render_booking(session["day"], "")
+        elif session["day"] is not None and target == _DATE_FIELD:
+            try:
+                session["day"] = datetime.datetime.strptime(form.get(_DATE_FIELD, ""), _DATE_FORMAT).date()
+                status = ""
+            except ValueError:
+                status = "Fecha incorrecta"
+            content = self._render_booking(session["day"], status)
+        elif session["day"] is not None and _PAY_BUTTON in form:
+            content = self._pay(session, form)
+        elif session["selection"] is not None and _CONFIRM_BUTTON in form:
+            content = self._confirm(session)
+        else:
+            return self._templates["home"]
+
+        return Template(self._templates["intranet"].safe_substitute(content=content))
+
+    def _render_booking(self, date: datetime.date, status: str) -> str:
+        occupied = self.get_occupied_slots(date)
+        rows = []
+        for hour_index in range(1, _NUM_HOURS + 1):
+            courts = []
+            for court in range(1, _NUM_COURTS + 1):
+                x = (court - 1) * _COURT_WIDTH
+                slots = ["<text x=\"2\" y=\"14\">" + str(court) + "</text>"]
+                for half in (0, 1):
+                    slot_x = half * _COURT_WIDTH // 2
+                    if (hour_index, court, half) in occupied:
+                        slots.append("<line x1=\"{}\" y1=\"0\" x2=\"{}\" y2=\"{}\"/>".format(
+                            slot_x, slot_x + _COURT_WIDTH // 2, _ROW_HEIGHT))
+                    else:
+                        slots.append(
+                            "<rect x=\"{}\" y=\"0\" width=\"{}\" height=\"{}\" fill=\"#9d9\" "
+                            "onclick=\"seleccionarHueco({},{},{})\"/>".format(
+                                slot_x, _COURT_WIDTH // 2 - 2, _ROW_HEIGHT - 2, hour_index, court, half))
+                courts.append("<g transform=\"translate({},0)\">{}</g>".format(x, "".join(slots)))
+            rows.append("<g transform=\"translate(0,{})\">{}</g>".format(
+                (hour_index - 1) * _ROW_HEIGHT, "".join(courts)))
+        return self._templates["booking"].substitute(
+            date=date.strftime(_DATE_FORMAT),
+            status=status,
+            rows="".join(rows)
+        )
+
+    @staticmethod
+    def _get_slots(hour_index: int, court: int, half: int, duration_code: int) -> list:  # (hour_index, court, half)
+        first = (hour_index - 1) * 2 + half
+        return [
+            ((first + i) // 2 + 1, court, (first + i) % 2) for i in range(_DURATION_CODE_TO_HALF_HOURS[duration_code])
+        ]
+
+    def _pay(self, session: dict, form: dict) -> str:
+        try:
+            hour_index, court, half = [int(value) for value in form.get(_SLOT_FIELD, "").split(",")]
+            duration_code = int(form.get(_DURATION_FIELD, ""))
+            slots = self._get_slots(hour_index, court, half, duration_code)
+        except (ValueError, KeyError):
+            return self._render_booking(session["day"], "Seleccione un horario")
+
+        occupied = self.get_occupied_slots(session["day"])
+        with self._lock:
+            if any(slot in occupied for slot in slots):
+                return self._render_booking(session["day"], "Horario no disponible")
+
+        session["selection"] = (session["day"], hour_index, court, half, duration_code)
+        minutes = (hour_index - 1 + _FIRST_HOUR) * 60 + half * 30
+        return self._templates["booking_confirmation"].substitute(
+            court=court,
+            date=session["day"].strftime(_DATE_FORMAT),
+            start_time="{}:{:02d}".format(minutes // 60, minutes % 60),
+            duration=_DURATION_CODE_TO_HALF_HOURS[duration_code] * 30
+        )
+
+    def _confirm(self, session: dict) -> str:
+        date, hour_index, court, half, duration_code = session["selection"]
+        session["selection"] = None
+        slots = self._get_slots(hour_index, court, half, duration_code)
+
+        occupied = self.get_occupied_slots(date)
+        with self._lock:
+            if any(slot in occupied for slot in slots):
+                return self._templates["booking_result"].substitute(result="Horario no disponible")
+            occupied.update(slots)
+            self.bookings.append((date, hour_index, court, half, duration_code))
+        return self._templates["booking_result"].substitute(result="Reserva confirmada")
+
+    @staticmethod
+    def _reply(handler: BaseHTTPRequestHandler, session_id: str, status: int, html: str) -> None:
+        body = html.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Set-Cookie", _SESSION_COOKIE + "=" + session_id + "; path=/; HttpOnly")
+        handler.end_headers()
+        handler.wfile.write(body)
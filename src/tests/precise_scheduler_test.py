@@ -0,0 +1,60 @@
+#!/usr/bin/python
+
+import datetime
+import threading
+
+import schedule
+
+from utils.precise_scheduler import PreciseScheduler
+
+# Same bound as the lateness of sleep_until
+_TOLERANCE = 0.05
+
+
+def test_due_job_fires_on_time():
+    scheduler = schedule.Scheduler()
+    fired = []
+    done = threading.Event()
+
+    def run():
+        fired.append(datetime.datetime.now())
+        done.set()
+
+    job = scheduler.every().monday.at("08:00").do(run)
+    scheduled_time = datetime.datetime.now() + datetime.timedelta(seconds=0.2)
+    job.next_run = scheduled_time
+
+    precise_scheduler = PreciseScheduler(scheduler=scheduler, max_workers=1)
+    precise_scheduler.start()
+    try:
+        assert done.wait(5.0)
+    finally:
+        precise_scheduler.stop()
+
+    assert len(fired) == 1
+    assert 0 <= (fired[0] - scheduled_time).total_seconds() < _TOLERANCE
+    [(fired_job, fired_time, jitter)] = precise_scheduler.get_jitters()
+    assert fired_job is job and fired_time == scheduled_time
+    assert 0 <= jitter < _TOLERANCE
+    # The next run is a whole period later
+    assert job.next_run == scheduled_time + datetime.timedelta(weeks=1)
+
+
+def test_late_job_keeps_its_time():
+    scheduler = schedule.Scheduler()
+    job = scheduler.every().monday.at("08:00").do(lambda: None)
+    scheduled_time = job.next_run
+    job.next_run = scheduled_time - datetime.timedelta(weeks=3)
+
+    precise_scheduler = PreciseScheduler(scheduler=scheduler, max_workers=1)
+    precise_scheduler._run_due_jobs()
+    precise_scheduler.stop()
+
+    # Missed runs are skipped, not fired one after another
+    assert len(precise_scheduler.get_jitters()) == 1
+    assert job.next_run == scheduled_time
+
+
+if __name__ == "__main__":
+    test_due_job_fires_on_time()
+    test_late_job_keeps_its_time()
@@ -1,5 +1,8 @@
 #!/usr/bin/python
 
+import datetime
+
+from crons.reservation import _get_game_date
 from crons.reservation import do_reservation
 
 
@@ -15,5 +18,12 @@ def test_reservation():
     )
 
 
+def test_game_date_across_midnight():
+    # A strike prepared on monday 23:59 for the tuesday 00:00 opening books next monday, not the one ending
+    strike_time = datetime.datetime(2026, 10, 20, 0, 0, 0)
+    assert _get_game_date("monday", strike_time) == datetime.date(2026, 10, 26)
+
+
 if __name__ == "__main__":
     test_reservation()
+    test_game_date_across_midnight()
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+from bots.telegram.reservations_table import Reservation
+from bots.telegram.reservations_table import parse_reservations
+
+_TABLE = """
+<table id="ctl00_ContentPlaceHolderContenido_GridViewReservas">
+  <tr><th>Id</th><th>Day</th><th>Time</th><th>Court</th></tr>
+  <tr><td>1</td><td> 23/10/2026 </td><td>13:00 - 14:00</td><td>Pista 2 Videopista</td></tr>
+  <tr><td>2<td>24/10/2026<td>19:30-21:00<td>Pista &amp; 5 - UnoPadel
+</table>
+"""
+
+
+def test_parse_reservations():
+    reservations = parse_reservations(_TABLE)
+
+    assert reservations == [
+        Reservation("23/10/2026", "13:00", "14:00", "Pista 2"),
+        Reservation("24/10/2026", "19:30", "21:00", "Pista & 5")
+    ]
+    day, start_time, end_time, court = reservations[0]
+    assert (day, start_time, end_time, court) == ("23/10/2026", "13:00", "14:00", "Pista 2")
+    assert reservations[1].court == "Pista & 5"
+    assert len(set(reservations + [Reservation("23/10/2026", "13:00", "14:00", "Pista 2")])) == 2
+
+
+def test_parse_empty_table():
+    assert parse_reservations("") == []
+    assert parse_reservations("<table><tr><th>Id</th><th>Day</th><th>Time</th><th>Court</th></tr></table>") == []
+
+
+def test_parse_malformed_rows():
+    table = """
+    <table>
+      <tr><td>1</td><td>23/10/2026</td></tr>
+      <tr><td colspan="4">No reservations</td></tr>
+      <td>cell outside any row</td>
+      <tr><td>3</td><td>25/10/2026</td><td>10:00</td><td>Pista 1</td><td>extra</td></tr>
+    </table>
+    """
+
+    # Short rows are skipped and a time without end leaves it empty
+    assert parse_reservations(table) == [Reservation("25/10/2026", "10:00", "", "Pista 1")]
+
+
+if __name__ == "__main__":
+    test_parse_reservations()
+    test_parse_empty_table()
+    test_parse_malformed_rows()
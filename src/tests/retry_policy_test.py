@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+import random
+
+from crons.retry_policy import RetryableError
+from crons.retry_policy import RetryPolicy
+from crons.retry_policy import format_fallbacks
+from crons.retry_policy import parse_fallbacks
+
+
+def test_delays():
+    retry_policy = RetryPolicy(base_delay=0.5, max_delay=2.0, jitter=0.5, rng=random.Random(1))
+    for attempt, delay in ((1, 0.5), (2, 1.0), (3, 2.0), (6, 2.0)):
+        for _ in range(100):
+            assert delay * 0.5 <= retry_policy.get_delay(attempt) <= delay
+
+
+def test_run():
+    retry_policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.01)
+    attempts = []
+
+    def fail_twice(attempt: int) -> str:
+        attempts.append(attempt)
+        if attempt < 3:
+            raise RetryableError("ERROR: Slot taken")
+        return "booked"
+
+    assert retry_policy.run(fail_twice) == "booked"
+    assert attempts == [1, 2, 3]
+
+    # Out of attempts
+    attempts.clear()
+    try:
+        retry_policy.run(lambda attempt: fail_twice(0))
+        assert False
+    except RetryableError:
+        assert attempts == [0, 0, 0]
+
+    # Not retryable, e.g. after the payment
+    attempts.clear()
+
+    def fail(attempt: int) -> None:
+        attempts.append(attempt)
+        raise Exception("ERROR: Confirmation failed")
+
+    try:
+        retry_policy.run(fail)
+        assert False
+    except Exception as e:
+        assert str(e) == "ERROR: Confirmation failed"
+        assert attempts == [1]
+
+
+def test_parse_fallbacks():
+    fallbacks = parse_fallbacks("13:30 60m, 09:00 90m,")
+    assert fallbacks == [("13:30", "60m"), ("9:00", "90m")]
+    assert format_fallbacks(fallbacks) == "13:30 60m, 9:00 90m"
+    assert parse_fallbacks("") == []
+    for text in ("13:15 60m", "23:00 60m", "13:00 45m", "13:00", "noon 60m"):
+        try:
+            parse_fallbacks(text)
+            assert False
+        except Exception as e:
+            assert str(e).startswith("ERROR: Invalid fallback")
+
+
+if __name__ == "__main__":
+    test_delays()
+    test_run()
+    test_parse_fallbacks()
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+
+import os
+import tempfile
+
+from utils.secret_loader import SecretStore
+
+_ENV_PREFIX = "SECRET_LOADER_TEST_"
+
+
+def _write(file_path: str, content: str) -> None:
+    with open(file_path, mode='w') as f:
+        f.write(content)
+
+
+def test_env_var_override():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write(os.path.join(tmp_dir, "web_username.txt"), "file_user\n")
+        _write(os.path.join(tmp_dir, "web_password.txt"), "file_password\n")
+        secret_store = SecretStore(secrets_dir=tmp_dir, env_prefix=_ENV_PREFIX)
+        assert secret_store.get_env_var_name("web_password.txt") == "SECRET_LOADER_TEST_WEB_PASSWORD"
+
+        os.environ[secret_store.get_env_var_name("web_password.txt")] = "env_password"
+        os.environ[secret_store.get_env_var_name("web_endpoint.txt")] = "http://127.0.0.1:8080/"
+        try:
+            assert secret_store.get("web_username.txt") == "file_user"
+            assert secret_store.get("web_password.txt") == "env_password"
+            # Secrets without a file can come from the environment only
+            assert secret_store.get("web_endpoint.txt") == "http://127.0.0.1:8080/"
+            assert not secret_store.has("missing.txt")
+        finally:
+            del os.environ[secret_store.get_env_var_name("web_password.txt")]
+            del os.environ[secret_store.get_env_var_name("web_endpoint.txt")]
+
+
+def test_request_reload():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "web_username.txt")
+        _write(file_path, "old_user")
+        secret_store = SecretStore(secrets_dir=tmp_dir, env_prefix=_ENV_PREFIX)
+        assert secret_store.get("web_username.txt") == "old_user"
+
+        # The values are served from memory until a reload is requested
+        _write(file_path, "new_user")
+        assert secret_store.get("web_username.txt") == "old_user"
+        secret_store.request_reload()
+        assert secret_store.get("web_username.txt") == "new_user"
+
+        os.remove(file_path)
+        secret_store.request_reload()
+        assert not secret_store.has("web_username.txt")
+
+
+if __name__ == "__main__":
+    test_env_var_override()
+    test_request_reload()
@@ -0,0 +1,54 @@
+#!/usr/bin/python
+
+from bots.telegram.web_interactions import _get_balance_http
+from tests.mock_club_server import MockClubServer
+from utils.http_session_manager import HttpSessionManager
+from utils.session_registry import SessionRegistry
+
+
+def _registry(server: MockClubServer) -> SessionRegistry:
+    class MockHttpSessionManager(HttpSessionManager):
+        def __init__(self):
+            super().__init__(endpoint=server.get_endpoint())
+
+        def login(self, username_key: str = None, password_key: str = None) -> None:
+            super().login(server.username, server.password)
+
+    return SessionRegistry(MockHttpSessionManager)
+
+
+def test_session_reuse():
+    server = MockClubServer(balance="10,00")
+    server.start()
+    try:
+        registry = _registry(server)
+        first_balance = registry.run(_get_balance_http)
+        num_requests = server.num_requests
+        second_balance = registry.run(_get_balance_http)
+        registry.close()
+    finally:
+        server.stop()
+
+    assert first_balance == second_balance == 10.0
+    # No new GET of the login page nor login postback for the second query
+    assert server.num_requests - num_requests == 2
+
+
+def test_session_expiry():
+    server = MockClubServer(balance="10,00")
+    server.start()
+    try:
+        registry = _registry(server)
+        registry.run(_get_balance_http)
+        server.expire_sessions()
+        balance = registry.run(_get_balance_http)
+        registry.close()
+    finally:
+        server.stop()
+
+    assert balance == 10.0
+
+
+if __name__ == "__main__":
+    test_session_reuse()
+    test_session_expiry()
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+
+import json
+import os
+import tempfile
+import threading
+
+from utils.tracing import Tracer
+from utils.tracing import compute_percentile
+
+
+def test_spans_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spans_file = os.path.join(tmp_dir, "logs", "spans.jsonl")
+        tracer = Tracer(spans_file=spans_file)
+        with tracer.span("reservation", game_day="monday"):
+            with tracer.span("login"):
+                pass
+            try:
+                with tracer.span("submit"):
+                    raise Exception("ERROR: Submit failure")
+            except Exception:
+                pass
+        tracer.set_spans_file(None)
+
+        with open(spans_file, mode='r') as f:
+            records = [json.loads(line) for line in f]
+
+    # Children finish, and are written, before their parent
+    assert [record["name"] for record in records] == ["login", "submit", "reservation"]
+    login, submit, reservation = records
+    assert reservation["parent_id"] is None
+    assert reservation["attributes"] == {"game_day": "monday"}
+    assert login["parent_id"] == reservation["span_id"] and submit["parent_id"] == reservation["span_id"]
+    assert len({record["trace_id"] for record in records}) == 1
+    assert (login["status"], submit["status"], reservation["status"]) == ("ok", "error", "ok")
+    assert submit["error"] == "ERROR: Submit failure"
+    assert all(record["duration"] >= 0 for record in records)
+
+
+def test_bound_spans():
+    tracer = Tracer(spans_file=None)
+    with tracer.span("reservation"):
+        with tracer.collect() as records:
+            def run():
+                with tracer.span("attempt"):
+                    pass
+            thread = threading.Thread(target=tracer.bind(run))
+            thread.start()
+            thread.join()
+
+    # Spans opened on another thread through a bound function join the trace
+    assert [record["name"] for record in records] == ["attempt"]
+
+
+def test_percentiles():
+    assert compute_percentile([], 50) == 0.0
+    values = [float(value) for value in range(1, 101)]
+    assert compute_percentile(values, 50) == 50.0
+    assert compute_percentile(values, 95) == 95.0
+    assert compute_percentile(values, 99) == 99.0
+    assert compute_percentile(values, 0) == 1.0
+    assert compute_percentile([1.0, 2.0, 3.0], 50) == 2.0
+    assert compute_percentile([1.0, 2.0, 3.0], 99) == 3.0
+
+    tracer = Tracer(spans_file=None)
+    for _ in range(3):
+        with tracer.span("login"):
+            pass
+    summary = tracer.get_summary()
+    assert summary["login"]["count"] == 3
+    assert summary["login"]["p50"] <= summary["login"]["p95"] <= summary["login"]["p99"]
+    assert "login | 3 |" in tracer.format_summary()
+
+    tracer.reset()
+    assert tracer.format_summary() == "No timings recorded yet"
+
+
+if __name__ == "__main__":
+    test_spans_file()
+    test_bound_spans()
+    test_percentiles()
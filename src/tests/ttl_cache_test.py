@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+import threading
+import time
+
+from utils.ttl_cache import TTLCache
+
+
+def _wait_for_refresh(cache: TTLCache) -> None:
+    deadline = time.monotonic() + 5.0
+    while cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not cache._refreshing
+
+
+def test_hit_within_ttl():
+    cache = TTLCache(ttl=60.0)
+    loads = []
+
+    def loader():
+        loads.append(len(loads))
+        return len(loads)
+
+    assert cache.get("key", loader) == 1
+    assert cache.get("key", loader) == 1
+    assert cache.get("other_key", loader) == 2
+    assert loads == [0, 1]
+
+
+def test_stale_while_reloading():
+    cache = TTLCache(ttl=0.05, stale_ttl=60.0)
+    release = threading.Event()
+    assert cache.get("key", lambda: "old") == "old"
+    time.sleep(0.1)
+
+    def slow_loader():
+        release.wait(5.0)
+        return "new"
+
+    # The stale value is served right away while a single background reload runs
+    assert cache.get("key", slow_loader) == "old"
+    assert cache.get("key", slow_loader) == "old"
+    assert cache._refreshing == {"key"}
+    release.set()
+    _wait_for_refresh(cache)
+    assert cache.get("key", lambda: "unused") == "new"
+
+
+def test_invalidate_during_load():
+    cache = TTLCache(ttl=60.0)
+    assert cache.get("other_key", lambda: "other") == "other"
+
+    def invalidated_loader():
+        # The cached value is invalidated while it is being loaded
+        cache.invalidate("key")
+        return "outdated"
+
+    assert cache.get("key", invalidated_loader) == "outdated"
+    assert cache.get("key", lambda: "fresh") == "fresh"
+
+    def other_invalidated_loader():
+        cache.invalidate("other_key")
+        return "value"
+
+    # Invalidating another key does not discard the load
+    assert cache.get("third_key", other_invalidated_loader) == "value"
+    assert cache.get("third_key", lambda: "unused") == "value"
+    assert cache.get("other_key", lambda: "reloaded") == "reloaded"
+
+
+def test_failed_reload():
+    cache = TTLCache(ttl=0.05, stale_ttl=60.0)
+    assert cache.get("key", lambda: "old") == "old"
+    time.sleep(0.1)
+
+    def failing_loader():
+        raise Exception("ERROR: Loader failure")
+
+    assert cache.get("key", failing_loader) == "old"
+    _wait_for_refresh(cache)
+    assert cache.get("key", failing_loader) == "old"
+    _wait_for_refresh(cache)
+
+
+if __name__ == "__main__":
+    test_hit_within_ttl()
+    test_stale_while_reloading()
+    test_invalidate_during_load()
+    test_failed_reload()
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+import os
+import tempfile
+
+from bots.telegram.users_whitelist import UsersWhitelist
+
+
+def _write(file_path: str, content: str, mtime_ns: int) -> None:
+    with open(file_path, mode='w') as f:
+        f.write(content)
+    os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+
+def test_reload_on_mtime_change():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "users_whitelist.txt")
+        mtime_ns = 1_700_000_000 * 10 ** 9
+        _write(file_path, "111\n222\n", mtime_ns)
+        users_whitelist = UsersWhitelist(file_path, check_interval=0)
+        assert users_whitelist.is_authorised("111")
+        assert not users_whitelist.is_authorised("333")
+
+        # Same inode, size and mtime: the file is not read again
+        _write(file_path, "333\n222\n", mtime_ns)
+        assert users_whitelist.is_authorised("111")
+        assert not users_whitelist.is_authorised("333")
+
+        _write(file_path, "333\n222\n", mtime_ns + 10 ** 9)
+        assert not users_whitelist.is_authorised("111")
+        assert users_whitelist.is_authorised("333")
+
+
+def test_request_reload():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "users_whitelist.txt")
+        mtime_ns = 1_700_000_000 * 10 ** 9
+        _write(file_path, "111\n", mtime_ns)
+        users_whitelist = UsersWhitelist(file_path, check_interval=3600)
+        assert users_whitelist.is_authorised("111")
+
+        # Changes are not checked before check_interval unless a reload is requested
+        _write(file_path, "222\n", mtime_ns + 10 ** 9)
+        assert users_whitelist.is_authorised("111")
+        users_whitelist.request_reload()
+        assert users_whitelist.is_authorised("222")
+        assert not users_whitelist.is_authorised("111")
+
+
+if __name__ == "__main__":
+    test_reload_on_mtime_change()
+    test_request_reload()
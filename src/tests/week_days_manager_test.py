@@ -0,0 +1,39 @@
+#!/usr/bin/python
+
+import datetime
+
+from utils.week_days_manager import compute_game_date
+from utils.week_days_manager import compute_lead_schedule
+
+# A monday
+_MONDAY = datetime.date(2026, 10, 19)
+
+
+def test_game_date_same_day():
+    assert compute_game_date("monday", _MONDAY) == _MONDAY
+    assert compute_game_date("Thursday", _MONDAY) == datetime.date(2026, 10, 22)
+
+
+def test_game_date_week_wrap_around():
+    assert compute_game_date("sunday", _MONDAY) == datetime.date(2026, 10, 25)
+    assert compute_game_date("monday", _MONDAY + datetime.timedelta(days=1)) == datetime.date(2026, 10, 26)
+    assert compute_game_date("saturday", datetime.date(2026, 10, 25)) == datetime.date(2026, 10, 31)
+
+
+def test_lead_schedule():
+    assert compute_lead_schedule("tuesday", "08:00", 90) == ("tuesday", "07:58:30")
+    assert compute_lead_schedule("tuesday", "08:00:30", 30) == ("tuesday", "08:00:00")
+
+
+def test_lead_schedule_across_midnight():
+    assert compute_lead_schedule("tuesday", "00:00", 60) == ("monday", "23:59:00")
+    assert compute_lead_schedule("Monday", "00:00:10", 20) == ("sunday", "23:59:50")
+    # Leads longer than a day step back several days
+    assert compute_lead_schedule("wednesday", "01:00", 2 * 24 * 3600) == ("monday", "01:00:00")
+
+
+if __name__ == "__main__":
+    test_game_date_same_day()
+    test_game_date_week_wrap_around()
+    test_lead_schedule()
+    test_lead_schedule_across_midnight()
@@ -0,0 +1,106 @@
+# !/usr/bin/python
+
+import os
+import threading
+from typing import Optional
+
+from selenium import webdriver
+
+#
+# STATIC ATTRIBUTES
+#
+_CWD = os.path.dirname(os.path.realpath(__file__))
+_DEFAULT_PROFILES_DIR = str(_CWD) + "/../../chrome_profiles/"
+_CSS_URL_PATTERNS = ["*.css"]
+_FONT_URL_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+_PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+
+
+class BrowserProfile:
+    # Chrome launch configuration. Every concurrent session gets its own slot directory inside profiles_dir (Chrome
+    # locks its user data directory) and slots are reused so that the cache survives between runs
+
+    def __init__(self,
+                 name: str = "default",
+                 headless: bool = True,
+                 block_images: bool = True,
+                 block_css: bool = False,
+                 block_fonts: bool = True,
+                 disable_extensions: bool = True,
+                 disable_background_networking: bool = True,
+                 page_load_strategy: str = "eager",
+                 profiles_dir: Optional[str] = _DEFAULT_PROFILES_DIR):
+        if page_load_strategy not in _PAGE_LOAD_STRATEGIES:
+            raise Exception("ERROR: Invalid page load strategy " + str(page_load_strategy))
+
+        self.name = name
+        self.headless = headless
+        self.block_images = block_images
+        self.block_css = block_css
+        self.block_fonts = block_fonts
+        self.disable_extensions = disable_extensions
+        self.disable_background_networking = disable_background_networking
+        self.page_load_strategy = page_load_strategy
+        self.profiles_dir = profiles_dir
+
+        self._slots_lock = threading.Lock()
+        self._busy_slots = set()
+
+    def get_blocked_url_patterns(self) -> list:
+        patterns = []
+        if self.block_css:
+            patterns.extend(_CSS_URL_PATTERNS)
+        if self.block_fonts:
+            patterns.extend(_FONT_URL_PATTERNS)
+        return patterns
+
+    def acquire_slot(self) -> Optional[int]:
+        if self.profiles_dir is None:
+            return None
+        with self._slots_lock:
+            slot = 0
+            while slot in self._busy_slots:
+                slot += 1
+            self._busy_slots.add(slot)
+            return slot
+
+    def release_slot(self, slot: Optional[int]) -> None:
+        if slot is None:
+            return
+        with self._slots_lock:
+            self._busy_slots.discard(slot)
+
+    def get_user_data_dir(self, slot: Optional[int], account: Optional[str] = None) -> Optional[str]:
+        # Every account gets its own directories so that a cached login cookie is never reused for another account
+        if slot is None:
+            return None
+        account_dir = "account-" + str(account) if account is not None else ""
+        return os.path.realpath(os.path.join(self.profiles_dir, self.name, account_dir, "slot-" + str(slot)))
+
+    def to_chrome_options(self, slot: Optional[int] = None, account: Optional[str] = None) -> webdriver.ChromeOptions:
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.headless = True
+            options.add_argument("--disable-gpu")
+        if self.disable_extensions:
+            options.add_argument("--disable-extensions")
+            options.add_argument("--disable-component-extensions-with-background-pages")
+        if self.disable_background_networking:
+            options.add_argument("--disable-background-networking")
+            options.add_argument("--disable-sync")
+            options.add_argument("--disable-default-apps")
+            options.add_argument("--no-first-run")
+            options.add_argument("--metrics-recording-only")
+        if self.block_images:
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.add_argument("--disable-dev-shm-usage")
+
+        user_data_dir = self.get_user_data_dir(slot, account)
+        if user_data_dir is not None:
+            options.add_argument("--user-data-dir=" + user_data_dir)
+
+        options.set_capability("pageLoadStrategy", self.page_load_strategy)
+        return options
+
+
+DEFAULT_PROFILE = BrowserProfile()
@@ -1,44 +1,156 @@
 # !/usr/bin/python
 
+import logging
 import time
+from typing import Optional
 
 from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
 
+from utils.browser_profile import BrowserProfile
+from utils.browser_profile import DEFAULT_PROFILE
+from utils.process_memory import get_process_tree_memory_kb
+from utils.secret_loader import load_account_secret
 from utils.secret_loader import load_from_secret_file
 
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
 
 class BrowserSessionManager:
-    _WEB_ENDPOINT = load_from_secret_file("web_endpoint.txt")
+    _DEFAULT_TIMEOUT = 10.0
+    _DEFAULT_POLL_INTERVAL = 0.05
+    _LOGIN_TIMEOUT = 15.0
+
+    def __init__(self,
+                 timeout: Optional[float] = None,
+                 poll_interval: Optional[float] = None,
+                 profile: Optional[BrowserProfile] = None,
+                 account: Optional[str] = None):
+        self._timeout = timeout if timeout is not None else BrowserSessionManager._DEFAULT_TIMEOUT
+        self._poll_interval = poll_interval if poll_interval is not None \
+            else BrowserSessionManager._DEFAULT_POLL_INTERVAL
+        self._profile = profile if profile is not None else DEFAULT_PROFILE
+        self._account = account
+
+        start_time = time.monotonic()
+        self._profile_slot = self._profile.acquire_slot()
+        try:
+            self._browser = webdriver.Chrome(options=self._profile.to_chrome_options(self._profile_slot, self._account))
+        except Exception:
+            self._profile.release_slot(self._profile_slot)
+            raise
+        blocked_url_patterns = self._profile.get_blocked_url_patterns()
+        if blocked_url_patterns:
+            self._browser.execute_cdp_cmd("Network.enable", {})
+            self._browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns})
+        self._startup_time = time.monotonic() - start_time
 
-    def __init__(self):
-        self._browser = webdriver.Chrome()
-        time.sleep(1.0)
-        self._browser.get(BrowserSessionManager._WEB_ENDPOINT)
-        time.sleep(2.0)
+        self._browser.get(load_from_secret_file("web_endpoint.txt"))
+
+        rss, peak_rss = self.get_memory_usage_kb()
+        _LOGGER.info(
+            "Browser session started: Profile = %s, StartupTime = %.3fs, RSS = %s KB, PeakRSS = %s KB",
+            self._profile.name,
+            self._startup_time,
+            rss,
+            peak_rss
+        )
+
+    def get_account(self) -> Optional[str]:
+        return self._account
 
     def get_browser(self) -> webdriver.Chrome:
         return self._browser
 
-    def navigate(self, element_id: str) -> None:
-        button = self._browser.find_element_by_id(element_id)
+    def get_startup_time(self) -> float:
+        return self._startup_time
+
+    def get_memory_usage_kb(self) -> (int, int):  # (rss, peak_rss) of chromedriver and the browser processes
+        try:
+            return get_process_tree_memory_kb(self._browser.service.process.pid)
+        except Exception:
+            return 0, 0
+
+    #
+    # Explicit waits
+    #
+    def _wait(self, timeout: Optional[float] = None) -> WebDriverWait:
+        return WebDriverWait(
+            self._browser,
+            timeout if timeout is not None else self._timeout,
+            poll_frequency=self._poll_interval
+        )
+
+    def wait_for_presence(self, by: str, value: str, timeout: Optional[float] = None) -> WebElement:
+        return self._wait(timeout).until(
+            expected_conditions.presence_of_element_located((by, value))
+        )
+
+    def wait_for_clickable(self, by: str, value: str, timeout: Optional[float] = None) -> WebElement:
+        return self._wait(timeout).until(
+            expected_conditions.element_to_be_clickable((by, value))
+        )
+
+    def wait_for_staleness(self, element: WebElement, timeout: Optional[float] = None) -> None:
+        self._wait(timeout).until(
+            expected_conditions.staleness_of(element)
+        )
+
+    #
+    # Page interactions
+    #
+    def navigate(self, element_id: str, timeout: Optional[float] = None) -> None:
+        # Every navigation element triggers an ASP.NET postback, so the current document becomes stale once the
+        # server has answered
+        page = self._browser.find_element_by_tag_name("html")
+        button = self.wait_for_clickable(By.ID, element_id, timeout=timeout)
         button.click()
-        time.sleep(1.0)
+        self.wait_for_staleness(page, timeout=timeout)
 
     def login(self) -> None:
-        username_key = load_from_secret_file("web_username.txt")
-        username = self._browser.find_element_by_id("ctl00_ContentPlaceHolderContenido_Login1_UserName")
+        # The warmed profile may still hold a valid authentication cookie
+        if self.is_logged_in():
+            return
+
+        username_key = load_account_secret("web_username.txt", self._account)
+        username = self.wait_for_presence(By.ID, "ctl00_ContentPlaceHolderContenido_Login1_UserName")
         username.send_keys(username_key)
 
-        password_key = load_from_secret_file("web_password.txt")
-        password = self._browser.find_element_by_id("ctl00_ContentPlaceHolderContenido_Login1_Password")
+        password_key = load_account_secret("web_password.txt", self._account)
+        password = self.wait_for_presence(By.ID, "ctl00_ContentPlaceHolderContenido_Login1_Password")
         password.send_keys(password_key)
 
-        time.sleep(1.0)
+        self.navigate(
+            "ctl00_ContentPlaceHolderContenido_Login1_LoginButton",
+            timeout=BrowserSessionManager._LOGIN_TIMEOUT
+        )
 
-        login_button = self._browser.find_element_by_id("ctl00_ContentPlaceHolderContenido_Login1_LoginButton")
-        login_button.click()
+    def is_logged_in(self) -> bool:
+        # The login form is only displayed when the server session does not exist or has expired
+        return not self._browser.find_elements_by_id("ctl00_ContentPlaceHolderContenido_Login1_UserName")
 
-        time.sleep(3.0)
+    def keep_alive(self) -> None:
+        # Light GET of the current page to keep the server side session alive
+        self._browser.get(self._browser.current_url)
 
     def quit(self) -> None:
-        self._browser.quit()
+        _, peak_rss = self.get_memory_usage_kb()
+        _LOGGER.debug("Browser session closed: Profile = %s, PeakRSS = %s KB", self._profile.name, peak_rss)
+        try:
+            self._browser.quit()
+        finally:
+            self._profile.release_slot(self._profile_slot)
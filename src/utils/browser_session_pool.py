@@ -0,0 +1,181 @@
+# !/usr/bin/python
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+from typing import Optional
+
+from utils.browser_session_manager import BrowserSessionManager
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+class BrowserSessionPool:
+    _DEFAULT_MAX_SIZE = 4
+    _DEFAULT_LEAD_TIME = 300.0
+    _DEFAULT_KEEP_ALIVE_INTERVAL = 60.0
+    _DEFAULT_MAX_IDLE_TIME = 900.0
+
+    def __init__(self,
+                 max_size: Optional[int] = None,
+                 lead_time: Optional[float] = None,
+                 keep_alive_interval: Optional[float] = None,
+                 max_idle_time: Optional[float] = None,
+                 account: Optional[str] = None,
+                 factory: Optional[Callable] = None):
+        self._max_size = max_size if max_size is not None else BrowserSessionPool._DEFAULT_MAX_SIZE
+        self._lead_time = lead_time if lead_time is not None else BrowserSessionPool._DEFAULT_LEAD_TIME
+        self._keep_alive_interval = keep_alive_interval if keep_alive_interval is not None \
+            else BrowserSessionPool._DEFAULT_KEEP_ALIVE_INTERVAL
+        self._max_idle_time = max_idle_time if max_idle_time is not None \
+            else BrowserSessionPool._DEFAULT_MAX_IDLE_TIME
+        self._account = account
+        # factory(account=account) creates a session that is not logged in yet
+        self._factory = factory if factory is not None else BrowserSessionManager
+
+        self._condition = threading.Condition()
+        self._idle_sessions = deque()  # (session, ready_time)
+        self._num_refreshing = 0
+        self._num_warming = 0
+        self._stop_event = threading.Event()
+        self._keep_alive_thread = None
+
+    def get_account(self) -> Optional[str]:
+        return self._account
+
+    def get_lead_time(self) -> float:
+        return self._lead_time
+
+    def get_num_ready_sessions(self) -> int:
+        with self._condition:
+            return len(self._idle_sessions)
+
+    def get_num_started_sessions(self) -> int:
+        # Browsers the pool has already started: ready, being refreshed or warming up
+        with self._condition:
+            return len(self._idle_sessions) + self._num_refreshing + self._num_warming
+
+    def warm_up(self, num_sessions: int = 1) -> None:
+        # Tops the pool up to num_sessions sessions (ready, being refreshed or warming up), so that the jobs sharing
+        # the pool can all ask for the sessions they need without warming more than that
+        target = min(num_sessions, self._max_size)
+        for _ in range(target):
+            with self._condition:
+                if len(self._idle_sessions) + self._num_refreshing + self._num_warming >= target:
+                    break
+                self._num_warming += 1
+
+            session = None
+            try:
+                session = self._factory(account=self._account)
+                session.login()
+            except Exception as e:
+                _LOGGER.error("ERROR: Cannot warm up browser session")
+                _LOGGER.error(e)
+                if session is not None:
+                    session.quit()
+                session = None
+            finally:
+                with self._condition:
+                    self._num_warming -= 1
+                    if session is not None:
+                        self._idle_sessions.append((session, time.monotonic()))
+                    self._condition.notify_all()
+
+        self._ensure_keep_alive_thread()
+        _LOGGER.debug("Session pool warmed up: %s ready sessions", self.get_num_ready_sessions())
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[BrowserSessionManager]:
+        # Returns a logged-in session, waiting for sessions that are still warming up. Returns None when the pool
+        # cannot provide a session so that the caller can fall back to a fresh one. The server may have expired an
+        # idle session: it is logged in again, or dropped when that fails
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            session = self._checkout(deadline)
+            if session is None:
+                return None
+            try:
+                if not session.is_logged_in():
+                    _LOGGER.debug("Logging in pooled browser session again")
+                    session.login()
+                return session
+            except Exception as e:
+                _LOGGER.warning("WARN: Dropping expired browser session from pool")
+                _LOGGER.warning(e)
+                session.quit()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        with self._condition:
+            sessions = [session for session, _ in self._idle_sessions]
+            self._idle_sessions.clear()
+        for session in sessions:
+            session.quit()
+
+    def _checkout(self, deadline: Optional[float]) -> Optional[BrowserSessionManager]:
+        with self._condition:
+            while not self._idle_sessions and (self._num_warming > 0 or self._num_refreshing > 0):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            if not self._idle_sessions:
+                return None
+            session, _ = self._idle_sessions.popleft()
+            return session
+
+    def _ensure_keep_alive_thread(self) -> None:
+        with self._condition:
+            if self._keep_alive_thread is not None and self._keep_alive_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._keep_alive_thread = threading.Thread(
+                target=self._keep_alive_loop,
+                name="BrowserSessionPoolKeepAlive",
+                daemon=True
+            )
+            self._keep_alive_thread.start()
+
+    def _keep_alive_loop(self) -> None:
+        while not self._stop_event.wait(self._keep_alive_interval):
+            with self._condition:
+                if not self._idle_sessions:
+                    # Nothing to keep alive, the thread is restarted on the next warm up
+                    self._keep_alive_thread = None
+                    return
+                candidates = list(self._idle_sessions)
+                self._idle_sessions.clear()
+                self._num_refreshing += len(candidates)
+
+            for session, ready_time in candidates:
+                alive = False
+                if time.monotonic() - ready_time < self._max_idle_time:
+                    try:
+                        session.keep_alive()
+                        alive = True
+                    except Exception as e:
+                        _LOGGER.warning("WARN: Dropping broken browser session from pool")
+                        _LOGGER.warning(e)
+                else:
+                    _LOGGER.debug("Dropping idle browser session from pool")
+                if not alive:
+                    session.quit()
+
+                with self._condition:
+                    self._num_refreshing -= 1
+                    if alive:
+                        self._idle_sessions.append((session, ready_time))
+                    self._condition.notify_all()
@@ -0,0 +1,125 @@
+# !/usr/bin/python
+
+import logging
+import statistics
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+from utils.secret_loader import load_from_secret_file
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+# time.sleep may oversleep by a scheduler tick, the last stretch before a deadline is spun on perf_counter
+_SPIN_TIME = 0.02
+
+
+def estimate_offset(samples: list) -> (float, float):  # (offset, error) in seconds
+    # samples are (local_send_time, local_receive_time, server_date). The server stamped server_date (whole seconds)
+    # at some point between sending and receiving, so every sample bounds offset = server_time - local_time to
+    # [server_date - receive_time, server_date + 1 - send_time]. Samples taken at different phases of the second are
+    # intersected down to a fraction of a second
+    if not samples:
+        raise Exception("ERROR: No clock samples")
+
+    low = max(server_date - receive_time for _, receive_time, server_date in samples)
+    high = min(server_date + 1 - send_time for send_time, _, server_date in samples)
+    if low <= high:
+        return (low + high) / 2, (high - low) / 2
+
+    # Inconsistent samples (the server clock stepped or a response was cached): best effort from the midpoints
+    offsets = [server_date + 0.5 - (send_time + receive_time) / 2 for send_time, receive_time, server_date in samples]
+    return statistics.median(offsets), 0.5 + (max(offsets) - min(offsets)) / 2
+
+
+def sleep_until(deadline: float) -> float:
+    # Sleeps until the local time.time() reaches deadline with sub-millisecond precision. Returns how late it woke up
+    target = time.perf_counter() + (deadline - time.time())
+    remaining = target - time.perf_counter()
+    while remaining > _SPIN_TIME:
+        time.sleep(remaining - _SPIN_TIME)
+        remaining = target - time.perf_counter()
+    while time.perf_counter() < target:
+        pass
+    return time.time() - deadline
+
+
+class ClockSync:
+    # Offset of the local clock from the club server clock (server_time = local_time + offset), measured from the
+    # Date header of its HTTP responses. Measurements are kept for max_age seconds
+    _DEFAULT_NUM_SAMPLES = 10
+    _DEFAULT_MAX_AGE = 600.0
+    _DEFAULT_TIMEOUT = 5.0
+
+    def __init__(self,
+                 endpoint: Optional[str] = None,
+                 num_samples: Optional[int] = None,
+                 max_age: Optional[float] = None,
+                 timeout: Optional[float] = None):
+        self._endpoint = endpoint
+        self._num_samples = num_samples if num_samples is not None else ClockSync._DEFAULT_NUM_SAMPLES
+        self._max_age = max_age if max_age is not None else ClockSync._DEFAULT_MAX_AGE
+        self._timeout = timeout if timeout is not None else ClockSync._DEFAULT_TIMEOUT
+
+        self._lock = threading.Lock()
+        self._offset = None
+        self._error = None
+        self._measured_at = None
+
+    def get_offset(self) -> float:
+        # Never fails: without a measurement the local clock is trusted
+        with self._lock:
+            if self._measured_at is None or time.monotonic() - self._measured_at > self._max_age:
+                try:
+                    self._measure()
+                except Exception as e:
+                    _LOGGER.warning("WARN: Cannot measure the club server clock offset")
+                    _LOGGER.warning(e)
+            return self._offset if self._offset is not None else 0.0
+
+    def get_error(self) -> Optional[float]:
+        return self._error
+
+    def to_local_time(self, server_time: float) -> float:
+        # Local time.time() at which the server clock shows server_time
+        return server_time - self.get_offset()
+
+    def _measure(self) -> None:
+        endpoint = self._endpoint if self._endpoint is not None else load_from_secret_file("web_endpoint.txt")
+        samples = []
+        with requests.Session() as session:
+            # Spread the samples over a little more than a second so that they hit different phases of the Date
+            # second. The first request also opens the connection, so it is not timed
+            session.get(endpoint, timeout=self._timeout).close()
+            interval = 1.0 / self._num_samples + 0.01
+            for _ in range(self._num_samples):
+                send_time = time.time()
+                response = session.get(endpoint, timeout=self._timeout)
+                receive_time = time.time()
+                response.close()
+                samples.append((send_time, receive_time, parsedate_to_datetime(response.headers["Date"]).timestamp()))
+                time.sleep(interval)
+
+        self._offset, self._error = estimate_offset(samples)
+        self._measured_at = time.monotonic()
+        _LOGGER.info("Club server clock offset: %.3fs (+/- %.3fs)", self._offset, self._error)
+
+
+_CLOCK_SYNC = ClockSync()
+
+
+def get_clock_sync() -> ClockSync:
+    return _CLOCK_SYNC
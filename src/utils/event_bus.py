@@ -0,0 +1,59 @@
+# !/usr/bin/python
+
+import logging
+import threading
+from typing import Callable
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+class EventBus:
+    # In-process publish/subscribe. Handlers run on the publishing thread, in subscription order, and a failing
+    # handler never reaches the publisher nor the other handlers. Handlers that need to do slow work must hand it off
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}  # topic -> (handler, ...)
+
+    def subscribe(self, topic: str, handler: Callable) -> None:
+        with self._lock:
+            self._handlers[topic] = self._handlers.get(topic, ()) + (handler,)
+
+    def unsubscribe(self, topic: str, handler: Callable) -> None:
+        with self._lock:
+            handlers = tuple(h for h in self._handlers.get(topic, ()) if h != handler)
+            if handlers:
+                self._handlers[topic] = handlers
+            else:
+                self._handlers.pop(topic, None)
+
+    def publish(self, topic: str, event) -> int:
+        # Returns the number of handlers the event was delivered to
+        handlers = self._handlers.get(topic, ())
+        if not handlers:
+            _LOGGER.debug("No subscribers for %s event", topic)
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                _LOGGER.error("ERROR: Handler of %s event failed", topic)
+                _LOGGER.error(e)
+        return len(handlers)
+
+
+_EVENT_BUS = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    return _EVENT_BUS
@@ -0,0 +1,144 @@
+# !/usr/bin/python
+
+import re
+from typing import Optional
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from utils.secret_loader import load_account_secret
+from utils.secret_loader import load_from_secret_file
+
+#
+# STATIC ATTRIBUTES
+#
+_POSTBACK_PATTERNS = [
+    re.compile(r"__doPostBack\(\s*'([^']*)'\s*,\s*'([^']*)'\s*\)"),
+    re.compile(r"WebForm_PostBackOptions\(\s*\"([^\"]*)\"\s*,\s*\"([^\"]*)\""),
+]
+_SUBMIT_INPUT_TYPES = ("submit", "image", "button")
+
+
+class HttpSessionManager:
+    # Drives the ASP.NET WebForms site with plain HTTP requests: every postback carries the hidden form state
+    # (__VIEWSTATE, __EVENTVALIDATION, ...) returned by the previous response
+    _POOL_CONNECTIONS = 4
+    _POOL_MAXSIZE = 8
+    _DEFAULT_TIMEOUT = 10.0
+
+    def __init__(self, endpoint: Optional[str] = None, timeout: Optional[float] = None, account: Optional[str] = None):
+        self._account = account
+        self._endpoint = endpoint if endpoint is not None else load_from_secret_file("web_endpoint.txt")
+        self._timeout = timeout if timeout is not None else HttpSessionManager._DEFAULT_TIMEOUT
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HttpSessionManager._POOL_CONNECTIONS,
+            pool_maxsize=HttpSessionManager._POOL_MAXSIZE
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._url = None
+        self._page = None
+        self._load(self._session.get(self._endpoint, timeout=self._timeout))
+
+    def get_account(self) -> Optional[str]:
+        return self._account
+
+    def get_page(self) -> BeautifulSoup:
+        return self._page
+
+    def get_url(self) -> str:
+        return self._url
+
+    def get_element_html(self, element_id: str) -> str:
+        element = self._find(element_id)
+        return element.decode_contents()
+
+    def navigate(self, element_id: str) -> None:
+        element = self._find(element_id)
+
+        if element.name == "input" and element.get("type", "").lower() in _SUBMIT_INPUT_TYPES:
+            self._submit({element["name"]: element.get("value", "")})
+            return
+
+        # Labels and list items are clicked through their enclosing (or inner) link
+        link = element if element.name == "a" else element.find_parent("a") or element.find("a")
+        if link is None:
+            raise Exception("ERROR: Element " + str(element_id) + " cannot be navigated")
+
+        script = (link.get("href") or "") + " " + (link.get("onclick") or "")
+        for pattern in _POSTBACK_PATTERNS:
+            match = pattern.search(script)
+            if match is not None:
+                self._submit({"__EVENTTARGET": match.group(1), "__EVENTARGUMENT": match.group(2)})
+                return
+
+        href = link.get("href")
+        if not href or href.startswith("javascript:"):
+            raise Exception("ERROR: Element " + str(element_id) + " has no postback nor link")
+        self._load(self._session.get(urljoin(self._url, href), timeout=self._timeout))
+
+    def login(self, username_key: Optional[str] = None, password_key: Optional[str] = None) -> None:
+        if username_key is None:
+            username_key = load_account_secret("web_username.txt", self._account)
+        if password_key is None:
+            password_key = load_account_secret("web_password.txt", self._account)
+
+        username = self._find("ctl00_ContentPlaceHolderContenido_Login1_UserName")
+        password = self._find("ctl00_ContentPlaceHolderContenido_Login1_Password")
+        login_button = self._find("ctl00_ContentPlaceHolderContenido_Login1_LoginButton")
+        self._submit({
+            username["name"]: username_key,
+            password["name"]: password_key,
+            login_button["name"]: login_button.get("value", "")
+        })
+
+        if not self.is_logged_in():
+            raise Exception("ERROR: Login failed")
+
+    def is_logged_in(self) -> bool:
+        # The login form is only displayed when the server session does not exist or has expired
+        return self._page.find(id="ctl00_ContentPlaceHolderContenido_Login1_UserName") is None
+
+    def quit(self) -> None:
+        self._session.close()
+
+    def _find(self, element_id: str):
+        element = self._page.find(id=element_id)
+        if element is None:
+            raise Exception("ERROR: Element " + str(element_id) + " not found")
+        return element
+
+    def _load(self, response: requests.Response) -> None:
+        response.raise_for_status()
+        self._url = response.url
+        self._page = BeautifulSoup(response.text, "html.parser")
+
+    def _get_form_fields(self) -> (str, dict):
+        form = self._page.find("form")
+        if form is None:
+            raise Exception("ERROR: Page has no form to post back")
+
+        fields = {}
+        for field in form.find_all("input"):
+            name = field.get("name")
+            field_type = field.get("type", "text").lower()
+            if not name or field_type in _SUBMIT_INPUT_TYPES:
+                continue
+            if field_type in ("checkbox", "radio") and not field.has_attr("checked"):
+                continue
+            fields[name] = field.get("value", "")
+        fields.setdefault("__EVENTTARGET", "")
+        fields.setdefault("__EVENTARGUMENT", "")
+
+        action = urljoin(self._url, form.get("action") or self._url)
+        return action, fields
+
+    def _submit(self, values: dict) -> None:
+        action, fields = self._get_form_fields()
+        fields.update(values)
+        self._load(self._session.post(action, data=fields, timeout=self._timeout))
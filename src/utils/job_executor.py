@@ -0,0 +1,153 @@
+# !/usr/bin/python
+
+import datetime
+import heapq
+import itertools
+import logging
+import os
+import threading
+from collections import deque
+from typing import Callable
+from typing import Optional
+
+from utils.process_memory import get_available_memory_kb
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+# Resident memory of a logged-in headless Chrome showing the booking grid, renderer and GPU processes included
+_BROWSER_MEMORY_KB = 300 * 1024
+# Browsers spend most of the booking waiting for the club, so a CPU can drive more than one
+_BROWSERS_PER_CPU = 2
+
+
+def get_max_parallel_browsers(num_started_browsers: int = 0) -> int:
+    # Browsers the host can run at once without swapping or starving them of CPU, at least one. num_started_browsers
+    # are already running (e.g. pre-warmed in a pool) and will be reused: their memory is not available any more but
+    # still counts towards the cap, so only the launches of new browsers are limited by the available memory
+    max_browsers = (os.cpu_count() or 1) * _BROWSERS_PER_CPU
+    available_memory_kb = get_available_memory_kb()
+    if available_memory_kb is not None:
+        max_browsers = min(max_browsers, num_started_browsers + available_memory_kb // _BROWSER_MEMORY_KB)
+    return max(1, max_browsers)
+
+
+class JobExecutor:
+    # Runs the jobs due at the same instant in parallel. Pending jobs start by descending priority (ties in submission
+    # order) and no more than get_capacity() of them run at once, the capacity being evaluated on every submission.
+    # The delay between the time a job was scheduled at and the time it actually starts (its skew) is recorded
+    _SKEW_HISTORY_SIZE = 256
+
+    def __init__(self, max_workers: int, get_capacity: Optional[Callable[[], int]] = None):
+        self._max_workers = max_workers
+        self._get_capacity = get_capacity
+
+        self._condition = threading.Condition()
+        self._queue = []  # (-priority, sequence, scheduled_time, name, function)
+        self._sequence = itertools.count()
+        self._capacity = max_workers
+        self._num_running = 0
+        self._threads = []
+        self._stopped = False
+        self._skews = deque(maxlen=JobExecutor._SKEW_HISTORY_SIZE)  # (name, priority, scheduled_time, skew)
+
+    def submit(self,
+               function: Callable,
+               name: Optional[str] = None,
+               priority: int = 0,
+               scheduled_time: Optional[datetime.datetime] = None) -> None:
+        self.submit_batch([(function, name, priority)], scheduled_time)
+
+    def submit_batch(self, jobs: list, scheduled_time: Optional[datetime.datetime] = None) -> None:
+        # jobs is a list of (function, name, priority). They are queued together so that the priority order holds
+        # even when the first ones could start right away
+        scheduled_time = scheduled_time if scheduled_time is not None else datetime.datetime.now()
+        capacity = self._compute_capacity()
+        with self._condition:
+            if self._stopped:
+                raise Exception("ERROR: Job executor is stopped")
+            for function, name, priority in jobs:
+                name = name if name is not None else getattr(function, "__name__", str(function))
+                heapq.heappush(self._queue, (-priority, next(self._sequence), scheduled_time, name, function))
+            self._capacity = capacity
+            self._ensure_workers()
+            self._condition.notify_all()
+
+        if len(jobs) > capacity:
+            _LOGGER.info("%s jobs due at %s, running %s at a time", len(jobs), scheduled_time, capacity)
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_num_running(self) -> int:
+        with self._condition:
+            return self._num_running
+
+    def get_num_pending(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    def get_skews(self) -> list:  # (name, priority, scheduled_time, skew_in_seconds)
+        with self._condition:
+            return list(self._skews)
+
+    def stop(self) -> None:
+        # Pending jobs are dropped, running ones are left to finish
+        with self._condition:
+            self._stopped = True
+            num_dropped = len(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+        if num_dropped:
+            _LOGGER.warning("WARN: Job executor stopped with %s pending jobs", num_dropped)
+
+    def _compute_capacity(self) -> int:
+        if self._get_capacity is None:
+            return self._max_workers
+        try:
+            return max(1, min(self._max_workers, self._get_capacity()))
+        except Exception as e:
+            _LOGGER.warning("WARN: Cannot compute job executor capacity, using %s", self._max_workers)
+            _LOGGER.warning(e)
+            return self._max_workers
+
+    def _ensure_workers(self) -> None:
+        # Called with the condition held. All workers are started at once so that a burst never waits for threads
+        if self._threads:
+            return
+        for position in range(self._max_workers):
+            thread = threading.Thread(target=self._work, name="ScheduledJob_" + str(position), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._queue or self._num_running >= self._capacity):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                negative_priority, _, scheduled_time, name, function = heapq.heappop(self._queue)
+                self._num_running += 1
+                skew = (datetime.datetime.now() - scheduled_time).total_seconds()
+                self._skews.append((name, -negative_priority, scheduled_time, skew))
+
+            _LOGGER.info("Starting job %s (priority = %s, skew = %.3fs)", name, -negative_priority, skew)
+            try:
+                function()
+            except Exception as e:
+                _LOGGER.error("ERROR: Job %s failed", name)
+                _LOGGER.error(e)
+            finally:
+                with self._condition:
+                    self._num_running -= 1
+                    self._condition.notify_all()
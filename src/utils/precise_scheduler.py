@@ -0,0 +1,149 @@
+# !/usr/bin/python
+
+import datetime
+import functools
+import logging
+import threading
+from collections import deque
+from typing import Callable
+from typing import Optional
+
+import schedule
+
+from utils.job_executor import JobExecutor
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+class PreciseScheduler:
+    _DEFAULT_MAX_WORKERS = 4
+    _MAX_SLEEP_TIME = 60.0
+    _JITTER_HISTORY_SIZE = 256
+
+    def __init__(self,
+                 scheduler: Optional[schedule.Scheduler] = None,
+                 max_workers: Optional[int] = None,
+                 get_priority: Optional[Callable[[schedule.Job], int]] = None,
+                 get_capacity: Optional[Callable[[], int]] = None):
+        self._scheduler = scheduler if scheduler is not None else schedule.default_scheduler
+        # Jobs due at the same instant are started together, by descending get_priority(job)
+        self._get_priority = get_priority
+        self._executor = JobExecutor(
+            max_workers=max_workers if max_workers is not None else PreciseScheduler._DEFAULT_MAX_WORKERS,
+            get_capacity=get_capacity
+        )
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._jitters_lock = threading.Lock()
+        self._jitters = deque(maxlen=PreciseScheduler._JITTER_HISTORY_SIZE)  # (job, scheduled_time, jitter)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="PreciseScheduler", daemon=True)
+        self._thread.start()
+        _LOGGER.info("Scheduler started")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.stop()
+        _LOGGER.info("Scheduler stopped")
+
+    def wake(self) -> None:
+        # Must be called whenever jobs are added or removed so that the next deadline is recomputed
+        self._wake_event.set()
+
+    def submit(self, function, *args, **kwargs) -> None:
+        # Runs a one-off function on the job workers (e.g. a job whose run was missed)
+        self._executor.submit(functools.partial(function, *args, **kwargs), name=function.__name__)
+
+    def get_next_run_times(self) -> list:  # (job, next_run)
+        return [(job, job.next_run) for job in sorted(list(self._scheduler.jobs), key=lambda j: j.next_run)]
+
+    def get_jitters(self) -> list:  # (job, scheduled_time, jitter_in_seconds)
+        with self._jitters_lock:
+            return list(self._jitters)
+
+    def get_skews(self) -> list:  # (job_name, priority, scheduled_time, skew_in_seconds)
+        # Unlike the jitter, the skew includes the time a job waited for a free worker
+        return self._executor.get_skews()
+
+    def _seconds_until_next_run(self) -> Optional[float]:
+        jobs = list(self._scheduler.jobs)
+        if not jobs:
+            return None
+        next_run = min(job.next_run for job in jobs)
+        return (next_run - datetime.datetime.now()).total_seconds()
+
+    def _loop(self) -> None:
+        while not self._stop_event.is_set():
+            self._run_due_jobs()
+
+            idle_seconds = self._seconds_until_next_run()
+            if idle_seconds is None or idle_seconds > PreciseScheduler._MAX_SLEEP_TIME:
+                idle_seconds = PreciseScheduler._MAX_SLEEP_TIME
+            if idle_seconds > 0:
+                self._wake_event.wait(idle_seconds)
+            self._wake_event.clear()
+
+    def _run_due_jobs(self) -> None:
+        due_jobs = {}  # scheduled_time -> [(function, name, priority)]
+        for job in list(self._scheduler.jobs):
+            if not job.should_run:
+                continue
+
+            now = datetime.datetime.now()
+            scheduled_time = job.next_run
+            jitter = (now - scheduled_time).total_seconds()
+            with self._jitters_lock:
+                self._jitters.append((job, scheduled_time, jitter))
+            _LOGGER.info("Firing job %s (scheduled at %s, jitter = %.3fs)", job, scheduled_time, jitter)
+
+            # Reschedule before running so that a long job is not fired twice. Whole periods are skipped from the
+            # scheduled time, which keeps the job at its at-time however late this tick is
+            job.last_run = now
+            period = datetime.timedelta(**{job.unit: job.interval})
+            while job.next_run <= now:
+                job.next_run += period
+            priority = self._get_job_priority(job)
+            due_jobs.setdefault(scheduled_time, []).append((functools.partial(self._run_job, job), str(job), priority))
+
+        for scheduled_time, jobs in sorted(due_jobs.items()):
+            self._executor.submit_batch(jobs, scheduled_time)
+
+    def _get_job_priority(self, job: schedule.Job) -> int:
+        if self._get_priority is None:
+            return 0
+        try:
+            return self._get_priority(job)
+        except Exception as e:
+            _LOGGER.warning("WARN: Cannot get priority of job %s", job)
+            _LOGGER.warning(e)
+            return 0
+
+    def _run_job(self, job: schedule.Job) -> None:
+        try:
+            ret = job.job_func()
+            if isinstance(ret, schedule.CancelJob) or ret is schedule.CancelJob:
+                self._scheduler.cancel_job(job)
+                self.wake()
+        except Exception as e:
+            _LOGGER.error("ERROR: Scheduled job %s failed", job)
+            _LOGGER.error(e)
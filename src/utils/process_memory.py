@@ -0,0 +1,69 @@
+# !/usr/bin/python
+
+import os
+from typing import Optional
+
+#
+# STATIC ATTRIBUTES
+#
+_PROC_DIR = "/proc"
+
+
+def _get_children_map() -> dict:  # ppid -> [pid]
+    children = {}
+    for entry in os.listdir(_PROC_DIR):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(_PROC_DIR + "/" + entry + "/stat", mode='r') as f:
+                # The process name may contain spaces, the fields after it are space separated
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def _get_memory_kb(pid: int) -> (int, int):  # (rss, peak_rss)
+    rss = 0
+    peak_rss = 0
+    try:
+        with open(_PROC_DIR + "/" + str(pid) + "/status", mode='r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    peak_rss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, peak_rss
+
+
+def get_process_tree_memory_kb(root_pid: int) -> (int, int):  # (rss, peak_rss) of root_pid and its descendants
+    # Only available on Linux, returns (0, 0) elsewhere
+    if not os.path.isdir(_PROC_DIR):
+        return 0, 0
+
+    children = _get_children_map()
+    total_rss = 0
+    total_peak_rss = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        rss, peak_rss = _get_memory_kb(pid)
+        total_rss += rss
+        total_peak_rss += peak_rss
+        pending.extend(children.get(pid, []))
+    return total_rss, total_peak_rss
+
+
+def get_available_memory_kb() -> Optional[int]:
+    # MemAvailable of /proc/meminfo, None when it cannot be read (e.g. not on Linux)
+    try:
+        with open(_PROC_DIR + "/meminfo", mode='r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1])
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
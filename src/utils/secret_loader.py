@@ -2,6 +2,8 @@
 
 import logging
 import os
+import threading
+from typing import Optional
 
 #
 # Enable logging
@@ -16,10 +18,107 @@ logging.basicConfig(
 #
 _LOGGER = logging.getLogger(__name__)
 _CWD = os.path.dirname(os.path.realpath(__file__))
+_SECRETS_DIR = str(_CWD) + "/../../secrets/"
+_ENV_PREFIX = "RESERVATION_CRON_"
+_USERNAME_SECRET = "web_username.txt"
+
+
+class SecretStore:
+    # Loads every secret file once and serves the values from memory. A secret can be overridden with an environment
+    # variable named after its file (e.g. web_username.txt -> RESERVATION_CRON_WEB_USERNAME)
+
+    def __init__(self, secrets_dir: Optional[str] = None, env_prefix: Optional[str] = None):
+        self._secrets_dir = secrets_dir if secrets_dir is not None else _SECRETS_DIR
+        self._env_prefix = env_prefix if env_prefix is not None else _ENV_PREFIX
+
+        self._lock = threading.Lock()
+        self._secrets = None
+        self._reload_requested = False
+
+    def get(self, file_name: str) -> str:
+        secrets = self._secrets
+        if secrets is None or self._reload_requested:
+            secrets = self.reload()
+
+        if file_name not in secrets:
+            raise Exception("ERROR: Secret " + str(file_name) + " not found")
+        return secrets[file_name]
+
+    def has(self, file_name: str) -> bool:
+        secrets = self._secrets
+        if secrets is None or self._reload_requested:
+            secrets = self.reload()
+        return file_name in secrets
+
+    def get_env_var_name(self, file_name: str) -> str:
+        return self._env_prefix + os.path.splitext(file_name)[0].upper()
+
+    def request_reload(self) -> None:
+        # Safe to call from a signal handler, the secrets are reloaded on the next access
+        self._reload_requested = True
+
+    def reload(self) -> dict:
+        with self._lock:
+            self._reload_requested = False
+            secrets = {}
+
+            _LOGGER.info("Loading secrets from " + str(self._secrets_dir))
+            if os.path.isdir(self._secrets_dir):
+                for file_name in os.listdir(self._secrets_dir):
+                    file_path = os.path.join(self._secrets_dir, file_name)
+                    if not os.path.isfile(file_path):
+                        continue
+                    with open(file_path, mode='r') as f:
+                        # Trailing newlines would end up typed into forms
+                        secrets[file_name] = f.read().rstrip("\r\n")
+
+            prefix_length = len(self._env_prefix)
+            for env_var, value in os.environ.items():
+                if env_var.startswith(self._env_prefix) and len(env_var) > prefix_length:
+                    overridden = [name for name in secrets if self.get_env_var_name(name) == env_var]
+                    for file_name in overridden or [env_var[prefix_length:].lower() + ".txt"]:
+                        _LOGGER.info("Secret " + str(file_name) + " overridden by " + str(env_var))
+                        secrets[file_name] = value
+
+            self._secrets = secrets
+            return secrets
+
+
+_SECRET_STORE = SecretStore()
+
+
+def get_secret_store() -> SecretStore:
+    return _SECRET_STORE
+
+
+def get_secret_file_path(file_name: str) -> str:
+    return _SECRETS_DIR + file_name
 
 
 def load_from_secret_file(file_name: str) -> str:
-    file_path = str(_CWD) + "/../../secrets/" + file_name
-    _LOGGER.info("Loading secret from " + str(file_path))
-    with open(file_path, mode='r') as f:
-        return f.read()
+    return _SECRET_STORE.get(file_name)
+
+
+def load_optional_secret(file_name: str) -> Optional[str]:
+    return _SECRET_STORE.get(file_name) if _SECRET_STORE.has(file_name) else None
+
+
+def get_account_secret_name(file_name: str, account: str) -> str:
+    # Per-account secrets are suffixed with the account (e.g. web_username.txt -> web_username_12345.txt)
+    stem, extension = os.path.splitext(file_name)
+    return stem + "_" + str(account) + extension
+
+
+def load_account_secret(file_name: str, account: Optional[str] = None) -> str:
+    # account None stands for the shared club account
+    if account is None:
+        return load_from_secret_file(file_name)
+    return _SECRET_STORE.get(get_account_secret_name(file_name, account))
+
+
+def get_account(chat_id) -> Optional[str]:
+    # Club account used on behalf of a chat: its own one when it has credentials, the shared one (None) otherwise
+    account = str(chat_id)
+    if _SECRET_STORE.has(get_account_secret_name(_USERNAME_SECRET, account)):
+        return account
+    return None
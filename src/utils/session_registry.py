@@ -0,0 +1,138 @@
+# !/usr/bin/python
+
+import functools
+import logging
+import threading
+import time
+from typing import Callable
+from typing import Optional
+
+from utils.tracing import get_tracer
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+_TRACER = get_tracer()
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+class SessionRegistry:
+    # Keeps one authenticated session (BrowserSessionManager or HttpSessionManager) alive across operations.
+    # Operations run with exclusive access to the session, which is logged in again when the server has expired it
+    # and closed after idle_ttl seconds without use
+    _DEFAULT_IDLE_TTL = 300.0
+
+    def __init__(self, factory: Callable, idle_ttl: Optional[float] = None, name: Optional[str] = None):
+        self._factory = factory
+        self._name = name if name is not None else factory.__name__
+        self._idle_ttl = idle_ttl if idle_ttl is not None else SessionRegistry._DEFAULT_IDLE_TTL
+
+        self._lock = threading.RLock()
+        self._session = None
+        self._last_used = None
+        self._reaper = None
+
+    def has_session(self) -> bool:
+        with self._lock:
+            return self._session is not None
+
+    def run(self, operation: Callable):
+        with self._lock:
+            session = self._get_session()
+            try:
+                return operation(session)
+            except Exception as e:
+                if self._is_logged_in(session):
+                    raise e
+
+                # The server expired the session: log in again and retry once
+                _LOGGER.info("Session expired, logging in again")
+                try:
+                    session.login()
+                except Exception:
+                    self._discard()
+                    raise
+                return operation(session)
+            finally:
+                if self._session is not None:
+                    self._release()
+
+    def adopt(self, session) -> None:
+        # Takes ownership of an already logged-in session so that the next operation does not log in again
+        with self._lock:
+            self._discard()
+            self._session = session
+            self._release()
+
+    def close(self) -> None:
+        with self._lock:
+            self._discard()
+
+    def _get_session(self):
+        if self._session is None:
+            _LOGGER.debug("Creating new shared session")
+            with _TRACER.span("session_create", factory=self._name):
+                session = self._factory()
+            try:
+                with _TRACER.span("login", factory=self._name):
+                    session.login()
+            except Exception:
+                session.quit()
+                raise
+            self._session = session
+        return self._session
+
+    @staticmethod
+    def _is_logged_in(session) -> bool:
+        try:
+            return session.is_logged_in()
+        except Exception:
+            return False
+
+    def _release(self) -> None:
+        self._last_used = time.monotonic()
+        if self._reaper is not None:
+            self._reaper.cancel()
+        self._reaper = threading.Timer(self._idle_ttl, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        with self._lock:
+            if self._session is not None and time.monotonic() - self._last_used >= self._idle_ttl:
+                _LOGGER.debug("Closing idle shared session")
+                self._discard()
+
+    def _discard(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        if self._session is not None:
+            try:
+                self._session.quit()
+            except Exception as e:
+                _LOGGER.warning("WARN: Cannot close shared session")
+                _LOGGER.warning(e)
+            self._session = None
+
+
+def get_session_registry(factory: Callable, account: Optional[str] = None) -> SessionRegistry:
+    # One shared registry per session type and club account (None being the shared account)
+    key = (factory, account)
+    with _REGISTRIES_LOCK:
+        if key not in _REGISTRIES:
+            if account is None:
+                _REGISTRIES[key] = SessionRegistry(factory)
+            else:
+                _REGISTRIES[key] = SessionRegistry(functools.partial(factory, account=account), name=factory.__name__)
+        return _REGISTRIES[key]
@@ -0,0 +1,181 @@
+# !/usr/bin/python
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+from typing import Optional
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+_CWD = os.path.dirname(os.path.realpath(__file__))
+_DEFAULT_SPANS_FILE = str(_CWD) + "/../../logs/spans.jsonl"
+_PERCENTILES = (50, 95, 99)
+
+
+def compute_percentile(sorted_values: list, percentile: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percentile / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Tracer:
+    # Records timed spans, emits them as JSON lines and keeps the latest durations per span name in memory to
+    # summarise them as percentiles. Nested spans share the trace id of the outermost one, also across the threads
+    # running bound functions
+    _HISTORY_SIZE = 1024
+
+    def __init__(self, spans_file: Optional[str] = _DEFAULT_SPANS_FILE):
+        self._spans_file = spans_file
+
+        self._lock = threading.Lock()
+        self._output = None
+        self._durations = {}  # name -> deque of durations in seconds
+        self._collectors = {}  # trace_id -> [list of span records]
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        stack = self._get_stack()
+        trace_id = stack[-1]["trace_id"] if stack else uuid.uuid4().hex
+        record = {
+            "name": name,
+            "trace_id": trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": stack[-1]["span_id"] if stack else None,
+            "start": time.time(),
+            "attributes": attributes,
+        }
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record["attributes"]
+            record["status"] = "ok"
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+            raise
+        finally:
+            record["duration"] = time.perf_counter() - start
+            stack.pop()
+            self._record(record)
+
+    def bind(self, function: Callable) -> Callable:
+        # Wraps function so that the spans it opens, on whatever thread it runs, are children of the innermost span
+        # open on the calling thread
+        stack = self._get_stack()
+        context = stack[-1] if stack else None
+
+        def bound(*args, **kwargs):
+            function_stack = self._get_stack()
+            if context is not None:
+                function_stack.append(context)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                if context is not None:
+                    function_stack.pop()
+
+        return bound
+
+    @contextmanager
+    def collect(self):
+        # Yields a list that receives the records of the spans of the current trace as they finish, from any thread
+        stack = self._get_stack()
+        if not stack:
+            raise Exception("ERROR: Spans can only be collected within a span")
+        trace_id = stack[-1]["trace_id"]
+        records = []
+        with self._lock:
+            self._collectors.setdefault(trace_id, []).append(records)
+        try:
+            yield records
+        finally:
+            with self._lock:
+                collectors = self._collectors[trace_id]
+                collectors.remove(records)
+                if not collectors:
+                    del self._collectors[trace_id]
+
+    def set_spans_file(self, spans_file: Optional[str]) -> None:
+        with self._lock:
+            if self._output is not None:
+                self._output.close()
+                self._output = None
+            self._spans_file = spans_file
+
+    def reset(self) -> None:
+        # Forgets the recorded durations, the spans already written are kept
+        with self._lock:
+            self._durations = {}
+
+    def get_summary(self) -> dict:  # name -> {"count": n, "p50": s, "p95": s, "p99": s}
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+
+        summary = {}
+        for name, values in durations.items():
+            summary[name] = {"count": len(values)}
+            for percentile in _PERCENTILES:
+                summary[name]["p" + str(percentile)] = compute_percentile(values, percentile)
+        return summary
+
+    def format_summary(self) -> str:
+        summary = self.get_summary()
+        if not summary:
+            return "No timings recorded yet"
+        lines = [" STEP | COUNT | P50 | P95 | P99 (seconds)"]
+        for name in sorted(summary):
+            stats = summary[name]
+            lines.append(
+                " {} | {} | {:.3f} | {:.3f} | {:.3f}".format(name, stats["count"], stats["p50"], stats["p95"],
+                                                            stats["p99"])
+            )
+        return "\n".join(lines)
+
+    def _get_stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, record: dict) -> None:
+        with self._lock:
+            self._durations.setdefault(record["name"], deque(maxlen=Tracer._HISTORY_SIZE)).append(record["duration"])
+            for records in self._collectors.get(record["trace_id"], ()):
+                records.append(record)
+            if self._spans_file is None:
+                return
+            try:
+                if self._output is None:
+                    os.makedirs(os.path.dirname(self._spans_file), exist_ok=True)
+                    self._output = open(self._spans_file, mode='a')
+                self._output.write(json.dumps(record, default=str) + "\n")
+                self._output.flush()
+            except Exception as e:
+                _LOGGER.warning("WARN: Cannot write span " + str(record["name"]))
+                _LOGGER.warning(e)
+
+
+_TRACER = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _TRACER
@@ -0,0 +1,85 @@
+# !/usr/bin/python
+
+import logging
+import threading
+import time
+from typing import Callable
+from typing import Hashable
+from typing import Optional
+
+#
+# Enable logging
+#
+logging.basicConfig(
+    format="[%(levelname)s][%(asctime)s - %(name)s] %(message)s",
+    level=logging.DEBUG
+)
+
+#
+# STATIC ATTRIBUTES
+#
+_LOGGER = logging.getLogger(__name__)
+
+
+class TTLCache:
+    # Values are fresh for ttl seconds. For stale_ttl more seconds the stale value is still returned while a
+    # background thread reloads it (stale-while-revalidate). Failed loads are never cached
+
+    def __init__(self, ttl: float, stale_ttl: Optional[float] = 0.0):
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl if stale_ttl is not None else 0.0
+
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (value, load_time)
+        self._refreshing = set()
+        self._generations = {}  # key -> number of invalidations
+
+    def get(self, key: Hashable, loader: Callable):
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generations.setdefault(key, 0)
+            if entry is not None:
+                value, load_time = entry
+                age = time.monotonic() - load_time
+                if age < self._ttl:
+                    return value
+                if age < self._ttl + self._stale_ttl:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh,
+                            args=(key, loader, generation),
+                            name="TTLCacheRefresh",
+                            daemon=True
+                        ).start()
+                    return value
+
+        value = loader()
+        self._store(key, value, generation)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            # Loads of the key started before the invalidation must not store their (possibly outdated) values
+            if key is None:
+                for generation_key in self._generations:
+                    self._generations[generation_key] += 1
+                self._entries.clear()
+            else:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+    def _store(self, key: Hashable, value, generation: int) -> None:
+        with self._lock:
+            if generation == self._generations.get(key, 0):
+                self._entries[key] = (value, time.monotonic())
+
+    def _refresh(self, key: Hashable, loader: Callable, generation: int) -> None:
+        try:
+            self._store(key, loader(), generation)
+        except Exception as e:
+            _LOGGER.warning("WARN: Cannot refresh cached value for %s", key)
+            _LOGGER.warning(e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -1,5 +1,7 @@
 #!/usr/bin/python
 
+import datetime
+
 _NUM_TO_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
 
 
@@ -11,3 +13,56 @@ def compute_run_day(game_day: str) -> str:
     game_day_int = _NUM_TO_DAYS.index(game_day)
     run_day_int = (game_day_int + 1) % 7
     return _NUM_TO_DAYS[run_day_int]
+
+
+def compute_previous_day(day: str) -> str:
+    day = day.lower()
+    if day not in _NUM_TO_DAYS:
+        raise Exception("ERROR: Invalid day")
+
+    day_int = _NUM_TO_DAYS.index(day)
+    return _NUM_TO_DAYS[(day_int - 1) % 7]
+
+
+def compute_lead_schedule(run_day: str, run_time: str, lead_time: float) -> (str, str):
+    # Returns the (day, "HH:MM:SS") at which something must run lead_time seconds before run_day at run_time
+    fields = [int(field) for field in run_time.split(":")] + [0]
+    lead_seconds = fields[0] * 3600 + fields[1] * 60 + fields[2] - int(lead_time)
+    lead_day = run_day.lower()
+    while lead_seconds < 0:
+        lead_seconds += 24 * 3600
+        lead_day = compute_previous_day(lead_day)
+
+    lead_hour, lead_seconds = divmod(lead_seconds, 3600)
+    lead_minute, lead_second = divmod(lead_seconds, 60)
+    return lead_day, "{:02d}:{:02d}:{:02d}".format(lead_hour, lead_minute, lead_second)
+
+
+def compute_game_date(game_day: str, today: datetime.date) -> datetime.date:
+    # Next date falling on game_day, today included
+    game_day = game_day.lower()
+    if game_day not in _NUM_TO_DAYS:
+        raise Exception("ERROR: Invalid game_day")
+
+    days_ahead = (_NUM_TO_DAYS.index(game_day) - today.weekday()) % 7
+    return today + datetime.timedelta(days=days_ahead)
+
+
+def compute_previous_run(run_day: str, run_time: str, now: datetime.datetime) -> datetime.datetime:
+    # Latest datetime not after now falling on run_day at run_time ("HH:MM" or "HH:MM:SS")
+    run_day = run_day.lower()
+    if run_day not in _NUM_TO_DAYS:
+        raise Exception("ERROR: Invalid run_day")
+
+    fields = [int(field) for field in run_time.split(":")]
+    run = now.replace(hour=fields[0], minute=fields[1], second=fields[2] if len(fields) > 2 else 0, microsecond=0)
+    run -= datetime.timedelta(days=(now.weekday() - _NUM_TO_DAYS.index(run_day)) % 7)
+    if run > now:
+        run -= datetime.timedelta(days=7)
+    return run
+
+
+def compute_next_run(run_day: str, run_time: str, now: datetime.datetime) -> datetime.datetime:
+    # Earliest datetime not before now falling on run_day at run_time ("HH:MM" or "HH:MM:SS")
+    run = compute_previous_run(run_day, run_time, now)
+    return run if run == now else run + datetime.timedelta(days=7)